@@ -15,13 +15,16 @@ const ConversationsPage: React.FC = () => {
 
   const [page, setPage] = useState(1);
   const [limit] = useState(20);
+  // cursors[i] is the next_cursor that opens page i + 1 (page 1 needs none). Later
+  // pages are fetched by keyset; only the first page reports the total.
+  const [cursors, setCursors] = useState<(string | undefined)[]>([undefined]);
 
   const [data, setData] = useState<Conversation[]>([]);
   const [total, setTotal] = useState(0);
   const [loading, setLoading] = useState(false);
   const [err, setErr] = useState<string | null>(null);
 
-  const load = async () => {
+  const load = async (p = page, known = cursors) => {
     setLoading(true);
     setErr(null);
     try {
@@ -33,11 +36,13 @@ const ConversationsPage: React.FC = () => {
         status: (status || undefined) as Status | undefined,
         date_from: from || undefined,
         date_to: to || undefined,
-        page,
+        page: p,
         limit,
+        cursor: known[p - 1],
       });
       setData(res.items);
-      setTotal(res.total);
+      if (p === 1 || res.total !== null) setTotal(res.total ?? res.items.length);
+      setCursors([...known.slice(0, p), res.next_cursor ?? undefined]);
     } catch (e: any) {
       setErr(e?.message || "Failed to load conversations");
     } finally {
@@ -50,6 +55,13 @@ const ConversationsPage: React.FC = () => {
 
   }, [page, limit]);
 
+  const restart = () => {
+    const fresh = [undefined];
+    setCursors(fresh);
+    if (page === 1) load(1, fresh);
+    else setPage(1);
+  };
+
   const pages = useMemo(() => Math.max(1, Math.ceil(total / limit)), [total, limit]);
 
   const exportCsv = () => {
@@ -78,8 +90,8 @@ const ConversationsPage: React.FC = () => {
         <input className="input" type="date" value={from} onChange={(e) => setFrom(e.target.value)} />
         <input className="input" type="date" value={to} onChange={(e) => setTo(e.target.value)} />
         <div className="col-span-1 sm:col-span-2 lg:col-span-6 flex gap-2">
-          <button className="btn" onClick={() => { setPage(1); load(); }}>Apply</button>
-          <button className="btn ghost" onClick={() => { setQ(""); setDriver(""); setLoadNumber(""); setStatus(""); setFrom(""); setTo(""); setPage(1); load(); }}>
+          <button className="btn" onClick={restart}>Apply</button>
+          <button className="btn ghost" onClick={() => { setQ(""); setDriver(""); setLoadNumber(""); setStatus(""); setFrom(""); setTo(""); restart(); }}>
             Reset
           </button>
           <div className="flex-1" />
@@ -130,7 +142,9 @@ const ConversationsPage: React.FC = () => {
                 const dname = row.driver?.name || "—";
                 const phone = row.driver?.phone_number || "—";
                 const rowStatus = sp.driver_status || row.status || "—";
-                const snippet = (row.transcript || "").split("\n").join(" ").slice(0, 140);
+                const snippet = row.snippet
+                  ? row.snippet.replace(/<\/?mark>/g, "")
+                  : (row.transcript || "").split("\n").join(" ").slice(0, 140);
                 return (
                   <tr key={row.id} className="border-t">
                     <td className="td">{new Date(row.created_at).toLocaleString()}</td>
@@ -152,7 +166,7 @@ const ConversationsPage: React.FC = () => {
       <div className="flex items-center gap-2">
         <button className="btn" disabled={page <= 1} onClick={() => setPage((p) => p - 1)}>Prev</button>
         <div className="text-sm text-gray-500">Page {page} / {pages} (Total {total})</div>
-        <button className="btn" disabled={page >= pages} onClick={() => setPage((p) => p + 1)}>Next</button>
+        <button className="btn" disabled={!cursors[page]} onClick={() => setPage((p) => p + 1)}>Next</button>
       </div>
     </div>
   );
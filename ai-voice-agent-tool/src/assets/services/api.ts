@@ -33,6 +33,9 @@ export type Conversation = {
   transcript: string | null;
   structured_payload: Record<string, any> | null;
   driver?: { name?: string; phone_number?: string } | null;
+  /** Only set for search_mode=fts: highlighted match fragments and ts_rank. */
+  snippet?: string | null;
+  rank?: number | null;
 };
 
 export async function listConversations(params: {
@@ -44,12 +47,21 @@ export async function listConversations(params: {
   date_to?: string;
   page?: number;
   limit?: number;
+  cursor?: string;
+  count?: "exact" | "estimated" | "planned" | "none";
+  search_mode?: "substring" | "fts";
 }) {
   const usp = new URLSearchParams();
   Object.entries(params || {}).forEach(([k, v]) => {
     if (v !== undefined && v !== null && v !== "") usp.set(k, String(v));
   });
-  return getJSON<{ items: Conversation[]; page: number; limit: number; total: number }>(
+  return getJSON<{
+    items: Conversation[];
+    page: number;
+    limit: number;
+    total: number | null;
+    next_cursor: string | null;
+  }>(
     `/api/v1/conversations?${usp.toString()}`,
     { cache: "no-store" },
   );
@@ -1,43 +1,16 @@
 from __future__ import annotations
-import re
 from typing import Any, Dict, List
-
-TIME_RE = re.compile(r"\b(?:at\s*)?(\d{1,2}:\d{2}\s*(?:am|pm)?)\b|\b(?:in\s*)?(\d+)\s*(?:min|mins|minutes|hr|hrs|hours)\b", re.I)
-CITY_HWY_RE = re.compile(r"\b(?:i-\d{1,3}|us-\d{1,3}|hwy\s*\d+|highway\s*\d+|[A-Z][a-z]+(?:,\s*[A-Z]{2})?)\b")
-REASON_RE = re.compile(r"\b(traffic|weather|accident|construction|breakdown|tire|blowout|police|road\s*closure|detour)\b", re.I)
-UNLOAD_RE = re.compile(r"\b(door\s*\d+|in\s*door|waiting\s*for\s*lumper|lumper|detention|unloading|checked\s*in)\b", re.I)
-
-def extract_eta(text: str) -> str | None:
-    m = TIME_RE.search(text or "")
-    return m.group(0) if m else None
-
-def extract_location(text: str) -> str | None:
-    m = CITY_HWY_RE.search(text or "")
-    return m.group(0) if m else None
-
-def extract_delay_reason(text: str) -> str | None:
-    m = REASON_RE.search(text or "")
-    return m.group(1).title() if m else None
-
-def extract_unloading(text: str) -> str | None:
-    m = UNLOAD_RE.search(text or "")
-    if not m: return None
-    val = m.group(0).strip().title()
-    return "In Door" if val.lower().startswith("in door") else val
+from app.services import extraction
+from app.services.extraction import (  # noqa: F401  (re-exported for routers)
+    TIME_RE, CITY_HWY_RE, REASON_RE, UNLOAD_RE,
+    extract_eta, extract_location, extract_delay_reason, extract_unloading,
+)
 
 def classify_status(text: str) -> str:
-    t = (text or "").lower()
-    if any(k in t for k in ["arrived","checked in","docked","at dock","in door"]): return "Arrived"
-    if any(k in t for k in ["unloading","lumper","detention","in door"]):          return "Unloading"
-    if any(k in t for k in ["delay","late","behind","traffic","weather","stuck"]): return "Delayed"
-    return "Driving"
+    return extraction.classify_status(extraction.Features(text))
 
 def detect_emergency(text: str) -> str | None:
-    t = (text or "").lower()
-    if any(k in t for k in ["accident","crash","collision"]): return "Accident"
-    if any(k in t for k in ["blowout","breakdown","flat","engine"]): return "Breakdown"
-    if any(k in t for k in ["medical","injur","bleeding","faint"]):  return "Medical"
-    return None
+    return extraction.detect_emergency(extraction.Features(text))
 
 def is_noisy(text: str) -> bool:
     return len((text or "").strip()) < 3 or "??" in (text or "")
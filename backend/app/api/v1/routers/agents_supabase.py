@@ -2,6 +2,7 @@ from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel, Field
 from typing import Optional, List, Dict, Any
 from app.services.supabase import SupabaseClient
+from app.services.agents_repo import AgentsRepo
 
 router = APIRouter(prefix="/api/v1/agents", tags=["agents"])
 
@@ -28,6 +29,7 @@ async def create_agent(body: AgentIn):
         r = await c.post("/agent", json=body.dict())
         if r.status_code >= 400:
             raise HTTPException(r.status_code, r.text)
+        AgentsRepo.invalidate()
         return r.json()[0]
 
 @router.get("/{agent_id}")
@@ -45,4 +47,5 @@ async def update_agent(agent_id: int, body: AgentIn):
         r = await c.patch("/agent", params={"id": f"eq.{agent_id}"}, json=body.dict())
         if r.status_code >= 400:
             raise HTTPException(r.status_code, r.text)
+        AgentsRepo.invalidate()
         return r.json()[0]
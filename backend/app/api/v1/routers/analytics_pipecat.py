@@ -1,23 +1,22 @@
 from fastapi import APIRouter, HTTPException
-from app.services.supabase import SupabaseClient
+from app.services.rollup_repo import RollupRepo
 
 router = APIRouter(prefix="/api/v1/analytics", tags=["analytics"])
 
 @router.get("/pipecat")
 async def get_pipecat_analytics():
- 
-    query = """
-        select
-            count(*) as total_calls,
-            avg( (extra->>'duration_secs')::numeric ) as avg_duration,
-            count(*) filter (where structured_payload->>'call_outcome' = 'Emergency Escalation') as emergencies,
-            count(*) filter (where structured_payload->>'call_outcome' = 'In-Transit Update') as normal_updates
-        from calllog
-        where provider_call_id like 'pipecat_%';
-    """
+    """Pipecat totals summed from the per-day rollup buckets (see migrations/002)."""
     try:
-        async with SupabaseClient().client() as c:
-            r = await c.rpc("exec_sql", {"sql": query}) if hasattr(c, "rpc") else await c.get("/custom", params={"sql": query})
-            return r.json() if hasattr(r, "json") else r
+        rows = await RollupRepo.read("day", vendor="pipecat")
     except Exception as e:
         raise HTTPException(500, f"Analytics query failed: {e}")
+    if rows is None:
+        raise HTTPException(503, "calllog_rollup is not available")
+
+    t = RollupRepo.totals(rows)
+    return {
+        "total_calls": t["calls"],
+        "avg_duration": round(t["pipecat_duration_secs"] / (t["pipecat_sessions"] or 1), 2),
+        "emergencies": t["emergencies"],
+        "normal_updates": t["in_transit_updates"],
+    }
@@ -3,7 +3,7 @@ from __future__ import annotations
 from fastapi import APIRouter, Query, HTTPException
 from starlette.responses import StreamingResponse, JSONResponse
 from typing import Optional, List, Tuple
-import csv, io, datetime as dt
+import base64, csv, io, json, datetime as dt
 from app.services.supabase import SupabaseClient
 
 router = APIRouter(prefix="/api/v1/conversations", tags=["conversations"])
@@ -30,6 +30,93 @@ def _iso_end(s: Optional[str]) -> Optional[str]:
     except Exception:
         return None
 
+COUNT_MODES = {"exact", "estimated", "planned", "none"}
+
+def _encode_cursor(row: dict) -> Optional[str]:
+    if not row or row.get("created_at") is None or row.get("id") is None:
+        return None
+    raw = json.dumps([row["created_at"], row["id"]], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def _decode_cursor(cursor: str) -> Tuple[str, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, row_id = json.loads(raw)
+        return str(created_at), int(row_id)
+    except Exception:
+        raise HTTPException(400, "invalid cursor")
+
+def _content_range_total(r) -> Optional[int]:
+    cr = r.headers.get("content-range") or ""
+    if "/" in cr:
+        try:
+            return int(cr.split("/")[-1])
+        except Exception:
+            return None
+    return None
+
+async def _search_conversations_fts(
+    q: str,
+    driver_name: Optional[str],
+    load_number: Optional[str],
+    status: Optional[str],
+    date_from: Optional[str],
+    date_to: Optional[str],
+    offset: int,
+    limit: int,
+    count: str,
+):
+    """
+    Ranked full-text search through calllog_search() (migrations/006): GIN index
+    lookup instead of an ilike scan, with highlighted `snippet` and `rank` per row.
+    Pages by rank, so next_cursor is always None (use page).
+    """
+    params: List[Tuple[str, str]] = [
+        ("p_query", q),
+        ("select", "id,created_at,load_number,status,scenario,structured_payload,driver_name,driver_phone,rank,snippet"),
+        ("order", "rank.desc,id.desc"),
+        ("limit", str(limit)),
+    ]
+    if offset:
+        params.append(("offset", str(offset)))
+    if driver_name:
+        params.append(("driver_name", f"ilike.*{driver_name}*"))
+    if load_number:
+        params.append(("load_number", f"eq.{load_number}"))
+    if status:
+        params.append(("driver_status", f"eq.{status}"))
+    since = _iso_start(date_from)
+    until = _iso_end(date_to)
+    if since:
+        params.append(("created_at", f"gte.{since}"))
+    if until:
+        params.append(("created_at", f"lte.{until}"))
+
+    headers = {} if count == "none" else {"Prefer": f"count={count}"}
+    async with SupabaseClient().client() as c:
+        r = await c.get("/rpc/calllog_search", params=params, headers=headers)
+        if r.status_code >= 400:
+            raise HTTPException(r.status_code, r.text)
+        rows = r.json() or []
+
+    items = []
+    for d in rows:
+        items.append({
+            "id": d.get("id"),
+            "created_at": d.get("created_at"),
+            "load_number": d.get("load_number"),
+            "status": d.get("status"),
+            "scenario": d.get("scenario"),
+            "transcript": None,
+            "structured_payload": d.get("structured_payload"),
+            "driver": {"name": d.get("driver_name"), "phone_number": d.get("driver_phone")},
+            "rank": d.get("rank"),
+            "snippet": d.get("snippet"),
+        })
+    if count == "none":
+        return items, None, None
+    return items, (_content_range_total(r) or len(items)), None
+
 async def _fetch_conversations(
     q: Optional[str],
     driver_name: Optional[str],
@@ -39,10 +126,27 @@ async def _fetch_conversations(
     date_to: Optional[str],
     page: int,
     limit: int,
+    cursor: Optional[str] = None,
+    count: str = "exact",
+    search_mode: str = "substring",
 ):
+    """
+    One page of calllog rows, newest first. With `cursor` (the previous page's
+    next_cursor) the page is found by keyset on (created_at, id) instead of
+    OFFSET, so deep pages cost the same as the first one.
+    Returns (rows, total, next_cursor); total is None when count="none" and on
+    cursor pages (the keyset filter would make it count only the remaining
+    rows; the first page's total still holds).
+    """
     page = max(1, page)
     limit = max(1, min(200, limit))
     offset = (page - 1) * limit
+    count = count if count in COUNT_MODES else "exact"
+
+    if q and search_mode == "fts":
+        return await _search_conversations_fts(
+            q, driver_name, load_number, status, date_from, date_to, offset, limit, count
+        )
 
     
     driver_select = "driver:driver_id(name,phone_number)"
@@ -53,10 +157,15 @@ async def _fetch_conversations(
     
     params: List[Tuple[str, str]] = [
         ("select", f"id,created_at,load_number,status,scenario,transcript,structured_payload,{driver_select}"),
-        ("order", "created_at.desc"),
-        ("limit", str(limit)),
-        ("offset", str(offset)),
+        ("order", "created_at.desc,id.desc"),
+        ("limit", str(limit + 1)),  # one extra row tells us whether there is a next page
     ]
+    if cursor:
+        count = "none"
+        after_ts, after_id = _decode_cursor(cursor)
+        params.append(("or", f'(created_at.lt."{after_ts}",and(created_at.eq."{after_ts}",id.lt.{after_id}))'))
+    elif offset:
+        params.append(("offset", str(offset)))
 
     if q:
         params.append(("transcript", f"ilike.*{q}*"))
@@ -75,26 +184,26 @@ async def _fetch_conversations(
         params.append(("created_at", f"lte.{until}"))
 
     
+    prefer = "return=representation" if count == "none" else f"return=representation, count={count}"
     async with SupabaseClient().client() as c:
         r = await c.get(
             "/calllog",
             params=params,
-            headers={"Prefer": "return=representation, count=exact"},
+            headers={"Prefer": prefer},
         )
         if r.status_code >= 400:
             raise HTTPException(r.status_code, r.text)
 
         data = r.json()
-        
-        total = None
-        cr = r.headers.get("content-range") or ""
-        if "/" in cr:
-            try:
-                total = int(cr.split("/")[-1])
-            except Exception:
-                total = None
+        next_cursor = None
+        if len(data) > limit:
+            data = data[:limit]
+            next_cursor = _encode_cursor(data[-1])
 
-        return data, (total or len(data))
+        if count == "none":
+            return data, None, next_cursor
+
+        return data, (_content_range_total(r) or len(data)), next_cursor
 
 @router.get("/")  
 async def list_conversations(
@@ -106,9 +215,121 @@ async def list_conversations(
     date_to: str | None = Query(None, description="YYYY-MM-DD or ISO"),
     page: int = Query(1, ge=1),
     limit: int = Query(20, ge=1, le=200),
+    cursor: str | None = Query(None, description="next_cursor from the previous page; overrides page"),
+    count: str = Query("exact", description="exact|estimated|planned|none"),
+    search_mode: str = Query("substring", description="substring (ilike) | fts (ranked full-text with snippets)"),
 ):
-    items, total = await _fetch_conversations(q, driver_name, load_number, status, date_from, date_to, page, limit)
-    return JSONResponse({"items": items, "page": page, "limit": limit, "total": total})
+    items, total, next_cursor = await _fetch_conversations(
+        q, driver_name, load_number, status, date_from, date_to, page, limit, cursor, count, search_mode
+    )
+    return JSONResponse({"items": items, "page": page, "limit": limit, "total": total, "next_cursor": next_cursor})
+
+EXPORT_HEADER = ["id", "created_at", "driver_name", "driver_phone", "load_number", "driver_status", "scenario", "transcript_snippet"]
+EXPORT_PAGE = 1000
+# calllog_export (migrations/005) flattens the driver join and computes the snippet server-side.
+EXPORT_VIEW_SELECT = "id,created_at,driver_name,driver_phone,load_number,driver_status,scenario,transcript_snippet"
+EXPORT_TABLE_SELECT = "id,created_at,load_number,scenario,transcript,structured_payload,driver:driver_id(name,phone_number)"
+
+def _export_filters(q, driver_name, load_number, status, date_from, date_to, use_view: bool) -> List[Tuple[str, str]]:
+    params: List[Tuple[str, str]] = []
+    if q:
+        params.append(("transcript", f"ilike.*{q}*"))
+    if driver_name:
+        params.append(("driver_name" if use_view else "driver.name", f"ilike.*{driver_name}*"))
+    if load_number:
+        params.append(("load_number", f"eq.{load_number}"))
+    if status:
+        params.append(("driver_status" if use_view else "structured_payload->>driver_status", f"eq.{status}"))
+    since = _iso_start(date_from)
+    until = _iso_end(date_to)
+    if since:
+        params.append(("created_at", f"gte.{since}"))
+    if until:
+        params.append(("created_at", f"lte.{until}"))
+    return params
+
+def _export_row(d: dict) -> list:
+    if "transcript_snippet" in d:
+        return [d.get(k) if d.get(k) is not None else "" for k in EXPORT_HEADER]
+    drv = (d.get("driver") or {}) if isinstance(d.get("driver"), dict) else {}
+    sp = d.get("structured_payload") or {}
+    return [
+        d.get("id"),
+        d.get("created_at"),
+        drv.get("name") or "",
+        drv.get("phone_number") or "",
+        d.get("load_number") or "",
+        sp.get("driver_status") or "",
+        d.get("scenario") or "",
+        (d.get("transcript") or "").replace("\n", " ").strip()[:500],
+    ]
+
+async def _export_page(c, q, driver_name, load_number, status, date_from, date_to,
+                       use_view: bool, page: int, after: Optional[Tuple[str, int]]):
+    """One keyset page of the export; returns the httpx response."""
+    if use_view or not driver_name:
+        select = EXPORT_VIEW_SELECT if use_view else EXPORT_TABLE_SELECT
+    else:
+        select = EXPORT_TABLE_SELECT.replace("driver:driver_id(name,phone_number)", "driver!inner(name,phone_number)")
+    params: List[Tuple[str, str]] = [
+        ("select", select),
+        ("order", "created_at.desc,id.desc"),
+        ("limit", str(page)),
+    ]
+    params += _export_filters(q, driver_name, load_number, status, date_from, date_to, use_view)
+    if after:
+        params.append(("or", f'(created_at.lt."{after[0]}",and(created_at.eq."{after[0]}",id.lt.{after[1]}))'))
+    return await c.get("/calllog_export" if use_view else "/calllog", params=params)
+
+def _csv_chunk(rows: List[list]) -> str:
+    sio = io.StringIO()
+    csv.writer(sio).writerows(rows)
+    return sio.getvalue()
+
+async def _first_export_page(q, driver_name, load_number, status, date_from, date_to, limit: Optional[int]):
+    """(use_view, page size, rows) for the first page; HTTPException before anything is sent."""
+    page = EXPORT_PAGE if limit is None else min(EXPORT_PAGE, limit)
+    async with SupabaseClient().client() as c:
+        r = await _export_page(c, q, driver_name, load_number, status, date_from, date_to, True, page, None)
+        use_view = r.status_code < 400
+        if not use_view:
+            # View not installed: read calllog and trim in Python.
+            r = await _export_page(c, q, driver_name, load_number, status, date_from, date_to, False, page, None)
+    if r.status_code >= 400:
+        raise HTTPException(r.status_code, r.text)
+    return use_view, page, r.json() or []
+
+async def _iter_export_csv(q, driver_name, load_number, status, date_from, date_to, limit: Optional[int],
+                           use_view: bool, page: int, rows: List[dict]):
+    """
+    Yield the CSV header and the already fetched first page, then one chunk per
+    keyset page; memory is bounded by a page. The response has started by then,
+    so a failing later page ends the file with an `#ERROR` line instead.
+    """
+    yield _csv_chunk([EXPORT_HEADER])
+    remaining = limit
+    sent = 0
+    async with SupabaseClient().client() as c:
+        while rows:
+            yield _csv_chunk([_export_row(d) for d in rows])
+            sent += len(rows)
+            if len(rows) < page:
+                return
+            if remaining is not None:
+                remaining -= len(rows)
+                if remaining <= 0:
+                    return
+                page = min(EXPORT_PAGE, remaining)
+            after = (rows[-1]["created_at"], int(rows[-1]["id"]))
+            try:
+                r = await _export_page(c, q, driver_name, load_number, status, date_from, date_to, use_view, page, after)
+                error = f"upstream {r.status_code}" if r.status_code >= 400 else None
+            except Exception as e:
+                error = type(e).__name__
+            if error:
+                yield _csv_chunk([[f"#ERROR export truncated after {sent} rows: {error}"]])
+                return
+            rows = r.json() or []
 
 @router.get("/export.csv")
 async def export_conversations_csv(
@@ -118,33 +339,11 @@ async def export_conversations_csv(
     status: str | None = Query(None),
     date_from: str | None = Query(None),
     date_to: str | None = Query(None),
-    limit: int = Query(2000, ge=1, le=10000),
+    limit: int | None = Query(None, ge=1, le=5_000_000, description="Max rows; omit to export everything"),
 ):
-    items, _ = await _fetch_conversations(q, driver_name, load_number, status, date_from, date_to, 1, limit)
-
-    def row(d):
-        drv = (d.get("driver") or {}) if isinstance(d.get("driver"), dict) else {}
-        sp = d.get("structured_payload") or {}
-        return [
-            d.get("id"),
-            d.get("created_at"),
-            drv.get("name") or "",
-            drv.get("phone_number") or "",
-            d.get("load_number") or "",
-            sp.get("driver_status") or "",
-            d.get("scenario") or "",
-            (d.get("transcript") or "").replace("\n", " ").strip()[:500],
-        ]
-
-    sio = io.StringIO()
-    w = csv.writer(sio)
-    w.writerow(["id", "created_at", "driver_name", "driver_phone", "load_number", "driver_status", "scenario", "transcript_snippet"])
-    for d in items:
-        w.writerow(row(d))
-    sio.seek(0)
-
+    use_view, page, rows = await _first_export_page(q, driver_name, load_number, status, date_from, date_to, limit)
     return StreamingResponse(
-        sio,
+        _iter_export_csv(q, driver_name, load_number, status, date_from, date_to, limit, use_view, page, rows),
         media_type="text/csv",
         headers={"Content-Disposition": 'attachment; filename="conversations.csv"'},
     )
@@ -1,6 +1,10 @@
 # app/api/v1/routers/dev_diag.py
 from fastapi import APIRouter
 from app.services.supabase import SupabaseClient
+from app.services.agents_repo import AgentsRepo
+from app.services.drivers_repo import DriversRepo
+from app.services.retell_client import RetellClient
+from app.services import schema
 import time
 
 router = APIRouter(prefix="/api/v1/dev", tags=["dev"])
@@ -23,3 +27,29 @@ async def show_calllog():
     async with SupabaseClient().client() as c:
         r = await c.get("/calllog", params={"select":"*", "order":"id.desc", "limit":"5"})
         return {"status": r.status_code, "rows": r.json()}
+
+@router.get("/supabase-pool")
+async def supabase_pool():
+    return SupabaseClient.stats()
+
+@router.get("/retell-client")
+async def retell_client():
+    return RetellClient.stats()
+
+@router.get("/repo-cache")
+async def repo_cache():
+    return {"agents": AgentsRepo.cache.stats(), "drivers": DriversRepo.cache.stats()}
+
+@router.post("/repo-cache/clear")
+async def repo_cache_clear():
+    AgentsRepo.invalidate()
+    DriversRepo.invalidate()
+    return {"ok": True}
+
+@router.get("/schema")
+async def schema_info():
+    return (await schema.current()).snapshot()
+
+@router.post("/schema/reload")
+async def schema_reload():
+    return (await schema.load(force=True)).snapshot()
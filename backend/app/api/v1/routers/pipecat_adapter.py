@@ -1,8 +1,9 @@
 # app/api/v1/routers/pipecat_adapter.py
 from __future__ import annotations
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel, Field
-from typing import Any, Optional
+from typing import Any, List, Optional
 import datetime as dt
 
 from app.services.supabase import SupabaseClient
@@ -10,6 +11,8 @@ from app.services.postprocess import summarize_transcript
 from app.services.agents_repo import AgentsRepo
 from app.services.drivers_repo import DriversRepo
 from app.services.calllog_repo import CallLogRepo
+from app.services import live_transcript, schema
+from app.services.rollup_repo import RollupRepo, outcome_delta, pipecat_delta
 
 router = APIRouter(prefix="/api/v1/pipecat", tags=["pipecat"])
 
@@ -44,18 +47,61 @@ async def seed_call(body: SeedIn):
     }
     try:
         await CallLogRepo.post(row)
+        live_transcript.forget(body.provider_call_id)
         return {"ok": True}
     except Exception as e:
         # If row already exists (unique constraint), treat as ok
         # or raise if you prefer strict.
         return {"ok": True, "note": f"seed post skipped/failed: {e}"}
 
+# ---- Live transcript ----
+class TranscriptAppendIn(BaseModel):
+    provider_call_id: str
+    seq: int = Field(ge=0)  # index of lines[0] in the call's transcript
+    lines: List[str] = Field(default_factory=list)
+
+@router.post("/transcript/append")
+async def append_transcript(body: TranscriptAppendIn):
+    """
+    Append a transcript delta streamed by the bot. Idempotent on seq: lines
+    already stored are skipped. `next_seq` is where the next delta starts; a 409
+    means lines are missing and carries the same field to resend from.
+    """
+    try:
+        live = await live_transcript.append(body.provider_call_id, body.seq, body.lines)
+    except live_transcript.TranscriptGap as e:
+        return JSONResponse({"ok": False, "reason": "gap", "next_seq": e.expected}, status_code=409)
+    except LookupError as e:
+        raise HTTPException(404, str(e))
+    return {"ok": True, "next_seq": live.seq, "summary": live.conv.summary}
+
+@router.get("/transcript/{provider_call_id}")
+async def get_transcript(provider_call_id: str, since: int = 0):
+    """Live transcript + running summary; `since` returns only lines after that index (polling)."""
+    try:
+        live = await live_transcript.get(provider_call_id)
+    except LookupError as e:
+        raise HTTPException(404, str(e))
+    return {"provider_call_id": provider_call_id, **live.snapshot(since)}
+
 # ---- Finalize (robust) ----
 class FinalizeIn(BaseModel):
     provider_call_id: Optional[str] = Field(default=None)
     transcript: Optional[str] = Field(default=None)
+    # Streamed calls send only what was not yet appended: the lines from transcript_seq on.
+    transcript_seq: Optional[int] = Field(default=None, ge=0)
+    transcript_tail: Optional[List[str]] = Field(default=None)
     extra: dict[str, Any] = Field(default_factory=dict)
 
+async def _record_rollups(pid: str, summary: dict, extra: dict) -> None:
+    await RollupRepo.apply(pid, "outcome", outcome_delta(summary), vendor="pipecat")
+    if extra.get("duration_secs") is not None:
+        await RollupRepo.apply(
+            pid, "pipecat_metrics",
+            pipecat_delta(extra.get("duration_secs"), extra.get("tokens_used", extra.get("tokens_estimated"))),
+            vendor="pipecat",
+        )
+
 async def _find_recent_initiated_pipecat():
     since = (dt.datetime.utcnow() - dt.timedelta(minutes=30)).isoformat() + "Z"
     async with SupabaseClient().client() as c:
@@ -79,9 +125,27 @@ async def _find_recent_initiated_pipecat():
 async def finalize_call(body: FinalizeIn):
     pid = (body.provider_call_id or "").strip()
 
-    # Build the patch from transcript
-    transcript = (body.transcript or "").strip()
-    summary = summarize_transcript(transcript)
+    streamed = False  # transcript already stored by /transcript/append
+    # Streamed call: append the tail, then take the transcript and the
+    # incrementally built summary from the live state (no full re-summarize).
+    if pid and body.transcript is None and body.transcript_seq is not None:
+        try:
+            live = await live_transcript.append(pid, body.transcript_seq, body.transcript_tail or [])
+        except live_transcript.TranscriptGap as e:
+            return JSONResponse({"ok": False, "reason": "gap", "next_seq": e.expected}, status_code=409)
+        except LookupError:
+            live = None
+        if live is not None:
+            live_transcript.forget(pid)
+            streamed = True
+            transcript, summary = live.conv.transcript or "", live.conv.summary
+        else:
+            transcript = "\n".join(body.transcript_tail or [])
+            summary = summarize_transcript(transcript)
+    else:
+        # Build the patch from transcript
+        transcript = (body.transcript or "").strip()
+        summary = summarize_transcript(transcript)
 
     patch = {
         "structured_payload": summary,
@@ -92,14 +156,24 @@ async def finalize_call(body: FinalizeIn):
         "call_outcome": summary.get("call_outcome"),
         "conflicts": {},
     }
-    if body.extra:
-        patch["extra"] = body.extra  # requires 'extra' JSONB column in calllog
+    current = await schema.current()
+    has_extra = current.calllog_extra
+    if body.extra and has_extra:
+        patch["extra"] = body.extra
+    if streamed:
+        del patch["transcript"]
+    elif current.calllog_transcript_seq:
+        patch["transcript_seq"] = len(transcript.splitlines()) if transcript else 0
 
     # 1) Try direct patch by provider_call_id
     if pid:
         ok = await CallLogRepo.patch_by_provider(pid, patch)
         if ok:
+            await _record_rollups(pid, summary, body.extra)
             return {"ok": True, "provider_call_id": pid}
+        if streamed:
+            # The row exists (the tail was just appended); let the bot retry later.
+            raise HTTPException(503, f"calllog patch failed for provider_call_id={pid}")
 
         # 2) Fallback: pick most recent initiated pipecat row
         latest = await _find_recent_initiated_pipecat()
@@ -107,11 +181,12 @@ async def finalize_call(body: FinalizeIn):
             pid2 = latest["provider_call_id"]
             ok2 = await CallLogRepo.patch_by_provider(pid2, patch)
             if ok2:
+                await _record_rollups(pid2, summary, body.extra)
                 return {"ok": True, "provider_call_id": pid2}
 
         # 3) Last resort: create a row so data isn't lost
         try:
-            await CallLogRepo.post({
+            row = {
                 "provider_call_id": pid,
                 "status": "ended",
                 "structured_payload": summary,
@@ -120,8 +195,12 @@ async def finalize_call(body: FinalizeIn):
                 "call_end_time": patch["call_end_time"],
                 "call_outcome": patch["call_outcome"],
                 "conflicts": {},
-                "extra": body.extra or {},
-            })
+            }
+            if has_extra:
+                row["extra"] = body.extra or {}
+            await CallLogRepo.post(row)
+            live_transcript.forget(pid)
+            await _record_rollups(pid, summary, body.extra)
             return {"ok": True, "provider_call_id": pid, "created": True}
         except Exception as e:
             raise HTTPException(404, f"no calllog row for provider_call_id={pid} ({e})")
@@ -132,5 +211,6 @@ async def finalize_call(body: FinalizeIn):
         pid = latest["provider_call_id"]
         ok = await CallLogRepo.patch_by_provider(pid, patch)
         if ok:
+            await _record_rollups(pid, summary, body.extra)
             return {"ok": True, "provider_call_id": pid}
     return {"ok": False, "reason": "no_target_row"}
@@ -3,10 +3,16 @@ from __future__ import annotations
 import asyncio
 import datetime as dt
 import json
-from fastapi import APIRouter, Request, BackgroundTasks
-from app.services.supabase import SupabaseClient
-from app.services.calllog_repo import CallLogRepo
+from fastapi import APIRouter, Request, HTTPException
+from app.core.config import settings
+from app.services.calllog_repo import CallLogRepo, PostgrestError
+from app.services import schema
 from app.services.postprocess import summarize_transcript
+from app.services.rollup_repo import RollupRepo, outcome_delta, pipecat_delta
+from app.services.rtvi_ingest import RtviBatch, RtviIngestQueue, parse_events, validate_event
+from app.services.cache import AsyncTTLCache
+from app.services.spool import PermanentError, Spool
+import os
 import structlog
 
 router = APIRouter(prefix="/api/v1/pipecat", tags=["pipecat-events"])
@@ -17,6 +23,14 @@ logger = structlog.get_logger("pipecat-events")
 
 async def handle_rtvi_event(payload: dict):
     """Handles incoming RTVI event payloads and stores analytics in Supabase."""
+    try:
+        await apply_rtvi_event(payload)
+    except Exception as e:
+        logger.error("RTVI event handling failed", error=str(e), payload=payload)
+
+
+async def apply_rtvi_event(payload: dict):
+    """handle_rtvi_event() without the catch-all: raises when a write fails, so callers can spool it."""
     event_type = payload.get("event")
     call_id = payload.get("provider_call_id") or payload.get("session_id") or "unknown"
     now_iso = dt.datetime.utcnow().isoformat() + "Z"
@@ -28,89 +42,221 @@ async def handle_rtvi_event(payload: dict):
         "timestamp": now_iso,
     }
 
-    try:
-        if event_type == "metrics_final":
-          
-            metrics = payload.get("metrics", {})
-            duration = metrics.get("duration_secs")
-            tokens = metrics.get("tokens_used")
-
-            analytics_data.update({
-                "duration_secs": duration,
-                "tokens_used": tokens,
-                "sentiment": metrics.get("sentiment_final", "neutral")
-            })
-
-            
-            patch = {"extra": analytics_data}
-            await CallLogRepo.patch_by_provider(call_id, patch)
-            logger.info("RTVI metrics_final logged", call_id=call_id)
-
-        elif event_type == "interrupt_detected":
-            await _increment_counter(call_id, "interruptions")
-            logger.info("RTVI interruption detected", call_id=call_id)
-
-        elif event_type == "keyword_detected":
-            keyword = payload.get("keyword")
-            await _log_keyword(call_id, keyword)
-            logger.info("RTVI keyword logged", call_id=call_id, keyword=keyword)
-
-        elif event_type == "sentiment_update":
-            sentiment = payload.get("sentiment")
-            patch = {"extra->>sentiment": sentiment}
-            await CallLogRepo.patch_by_provider(call_id, patch)
-            logger.info("RTVI sentiment updated", call_id=call_id, sentiment=sentiment)
-
-        elif event_type == "transcript_final":
-            transcript = payload.get("transcript") or ""
-            summary = summarize_transcript(transcript)
-            patch = {
-                "structured_payload": summary,
-                "transcript": transcript,
-                "status": "ended",
-                "scenario": "Emergency" if summary.get("call_outcome") == "Emergency Escalation" else "Dispatch"
-            }
-            await CallLogRepo.patch_by_provider(call_id, patch)
-            logger.info("RTVI transcript finalized", call_id=call_id)
-
-        else:
-            logger.debug("RTVI unknown event ignored", event=event_type)
+    if event_type == "metrics_final":
+        metrics = payload.get("metrics", {})
+        duration = metrics.get("duration_secs")
+        tokens = metrics.get("tokens_used")
 
-    except Exception as e:
-        logger.error("RTVI event handling failed", error=str(e), payload=payload)
+        analytics_data.update({
+            "duration_secs": duration,
+            "tokens_used": tokens,
+            "sentiment": metrics.get("sentiment_final", "neutral")
+        })
+
+        if (await schema.current()).calllog_extra:
+            await CallLogRepo.patch_by_provider(call_id, {"extra": analytics_data}, raise_errors=True)
+        await RollupRepo.apply(call_id, "pipecat_metrics", pipecat_delta(duration, tokens), vendor="pipecat")
+        logger.info("RTVI metrics_final logged", call_id=call_id)
+
+    elif event_type == "interrupt_detected":
+        await _increment_counter(call_id, "interruptions")
+        logger.info("RTVI interruption detected", call_id=call_id)
+
+    elif event_type == "keyword_detected":
+        keyword = payload.get("keyword")
+        await _log_keyword(call_id, keyword)
+        logger.info("RTVI keyword logged", call_id=call_id, keyword=keyword)
+
+    elif event_type == "sentiment_update":
+        sentiment = payload.get("sentiment")
+        await CallLogRepo.apply_extra([_extra_item(call_id, 0, [], sentiment)])
+        logger.info("RTVI sentiment updated", call_id=call_id, sentiment=sentiment)
+
+    elif event_type == "transcript_final":
+        transcript = payload.get("transcript") or ""
+        summary = summarize_transcript(transcript)
+        patch = {
+            "structured_payload": summary,
+            "transcript": transcript,
+            "status": "ended",
+            "scenario": "Emergency" if summary.get("call_outcome") == "Emergency Escalation" else "Dispatch"
+        }
+        await CallLogRepo.patch_by_provider(call_id, patch, raise_errors=True)
+        await RollupRepo.apply(call_id, "outcome", outcome_delta(summary), vendor="pipecat")
+        logger.info("RTVI transcript finalized", call_id=call_id)
+
+    else:
+        logger.debug("RTVI unknown event ignored", event=event_type)
 
 
 # Helper async functions
 
 
-async def _increment_counter(call_id: str, field: str):
-    """Increment a numeric counter in Supabase for a given call_id."""
+async def _increment_counter(call_id: str, field: str, delta: int = 1):
+    """Increment a numeric counter in calllog.extra for a given call_id."""
     try:
-        async with SupabaseClient().client() as c:
-            query = f"update calllog set extra = jsonb_set(coalesce(extra, '{{}}'::jsonb), '{{{field}}}', ((coalesce(extra->>'{field}', '0')::int + 1)::text)::jsonb, true) where provider_call_id = '{call_id}';"
-            await c.rpc("exec_sql", {"sql": query})
+        await CallLogRepo.incr_extra(call_id, field, delta)
     except Exception as e:
         logger.warning("Failed to increment counter", error=str(e))
 
 async def _log_keyword(call_id: str, keyword: str):
     """Append a keyword occurrence to calllog.extra.keywords"""
     try:
-        async with SupabaseClient().client() as c:
-            query = f"update calllog set extra = jsonb_set(coalesce(extra, '{{}}'::jsonb), '{{keywords}}', coalesce(extra->'keywords', '[]'::jsonb) || to_jsonb('{keyword}'), true) where provider_call_id = '{call_id}';"
-            await c.rpc("exec_sql", {"sql": query})
+        await CallLogRepo.append_keywords(call_id, [keyword])
     except Exception as e:
         logger.warning("Failed to log keyword", error=str(e))
 
+def _extra_item(call_id: str, interruptions: int, keywords: list[str], sentiment: str | None) -> dict:
+    item: dict = {"pid": call_id}
+    if interruptions:
+        item["incr"] = {"interruptions": int(interruptions)}
+    if keywords:
+        item["keywords"] = keywords
+    if sentiment is not None:
+        item["set"] = {"sentiment": sentiment}
+    return item
+
+# Writes that failed (PostgREST down, 5xx) are spooled to disk and replayed in order.
+rtvi_spool = Spool(
+    os.path.join(settings.spool_dir, "rtvi"),
+    segment_bytes=settings.spool_segment_kb * 1024,
+    max_bytes=settings.spool_max_mb * 1024 * 1024,
+    fsync_interval=settings.spool_fsync_ms / 1000.0,
+    replay_interval=settings.spool_replay_secs,
+    name="rtvi-spool",
+)
+
+def _permanent(e: Exception) -> bool:
+    """A 4xx from PostgREST (bad payload, missing column) or a malformed record: retrying cannot help."""
+    if isinstance(e, PostgrestError):
+        return 400 <= e.status < 500 and e.status not in (408, 429)
+    return isinstance(e, (KeyError, TypeError, ValueError))
+
+async def _replay(apply):
+    try:
+        await apply()
+    except Exception as e:
+        if _permanent(e):
+            raise PermanentError(str(e)) from e
+        raise
+
+async def _replay_extra(body: dict, key: str):
+    await _replay(lambda: CallLogRepo.apply_extra(body["items"]))
+
+async def _replay_event(body: dict, key: str):
+    await _replay(lambda: apply_rtvi_event(body))
+
+rtvi_spool.register("extra", _replay_extra)
+rtvi_spool.register("event", _replay_event)
+
+async def _flush_batches(batches: list[RtviBatch]):
+    """Counters for every call in one calllog_apply_extra() round trip, then the other events in order."""
+    counters = [b for b in batches if b.has_counters]
+    if counters:
+        items = [_extra_item(b.provider_call_id, b.interruptions, b.keywords, b.sentiment) for b in counters]
+        try:
+            await CallLogRepo.apply_extra(items)
+            logger.info(
+                "RTVI counters flushed", calls=len(counters), events=sum(b.events for b in counters),
+                interruptions=sum(b.interruptions for b in counters), keywords=sum(len(b.keywords) for b in counters),
+            )
+        except Exception as e:
+            rtvi_spool.append("extra", {"items": items})
+            logger.warning("RTVI counters spooled", calls=len(counters), error=str(e))
+    for batch in batches:
+        for payload in batch.passthrough:
+            try:
+                await apply_rtvi_event(payload)
+            except Exception as e:
+                rtvi_spool.append("event", payload)
+                logger.warning("RTVI event spooled", call_id=batch.provider_call_id, event=payload.get("event"), error=str(e))
+
+ingest_queue = RtviIngestQueue(
+    _flush_batches,
+    maxsize=settings.rtvi_queue_maxsize,
+    workers=settings.rtvi_workers,
+    window=settings.rtvi_coalesce_ms / 1000.0,
+)
+
 
 #  POST Endpoint for Internal RTVI  Events
 
+# Idempotency-Key -> first response, so a sender retrying (or replaying its own
+# spool) after a lost response does not count the same events twice.
+_idempotent = AsyncTTLCache("rtvi-idempotency", maxsize=100000, ttl=settings.rtvi_idempotency_ttl)
+
+def _replayed(request: Request) -> dict | None:
+    key = request.headers.get("idempotency-key")
+    seen = _idempotent.get(key) if key else None
+    return {**seen, "duplicate": True} if seen else None
+
+def _remember(request: Request, response: dict) -> dict:
+    key = request.headers.get("idempotency-key")
+    if key:
+        _idempotent.set(key, response)
+    return response
 
 @router.post("/rtvi")
-async def pipecat_rtvi_ingest(request: Request, background_tasks: BackgroundTasks):
+async def pipecat_rtvi_ingest(request: Request):
     """
     Ingests RTVI (Real-Time Voice Interaction) events streamed from Pipecat.
-    Does NOT expose new behavior externally — same /pipecat prefix used.
+    Events are queued and coalesced per call; 429 when the queue is full.
+    An Idempotency-Key header makes retries of the same request a no-op.
     """
+    seen = _replayed(request)
+    if seen:
+        return seen
     payload = await request.json()
-    background_tasks.add_task(handle_rtvi_event, payload)
-    return {"ok": True, "received": payload.get("event")}
+    if not ingest_queue.offer(payload):
+        raise HTTPException(429, "RTVI ingest queue is full")
+    return _remember(request, {"ok": True, "received": payload.get("event")})
+
+MAX_BATCH_ERRORS = 20
+
+@router.post("/rtvi/batch")
+async def pipecat_rtvi_ingest_batch(request: Request):
+    """
+    Many RTVI events, possibly for many calls, in one request: a JSON array or
+    NDJSON (application/x-ndjson, one event per line). Each event is checked
+    against rtvi_ingest.EVENT_FIELDS; valid ones are queued grouped by
+    provider_call_id and applied through the same coalescing queue as /rtvi,
+    whose workers write every call's counters in one RPC. Invalid events are
+    rejected individually (first few reasons listed). The valid events are
+    queued all-or-nothing: when they do not all fit the answer is 429 and
+    nothing is cached, so the sender's retry carries the whole batch again.
+    Honours Idempotency-Key like /rtvi.
+    """
+    seen = _replayed(request)
+    if seen:
+        return seen
+    events, errors = parse_events(await request.body(), request.headers.get("content-type", ""))
+    if not events and errors:
+        raise HTTPException(400, errors[0]["error"])
+    bad = {e["index"] for e in errors}
+
+    by_call: dict[str, list[dict]] = {}
+    for i, event in enumerate(events):
+        if i in bad:
+            continue
+        reason = validate_event(event)
+        if reason:
+            errors.append({"index": i, "error": reason})
+            continue
+        by_call.setdefault(event.get("provider_call_id") or event["session_id"], []).append(event)
+
+    valid = [e for group in by_call.values() for e in group]
+    if valid and not ingest_queue.offer_many(valid):
+        raise HTTPException(429, "RTVI ingest queue is full")
+    accepted = len(valid)
+    errors.sort(key=lambda e: (e["index"] is None, e["index"] or 0))
+    return _remember(request, {
+        "ok": True,
+        "accepted": accepted,
+        "rejected": len(events) - accepted,
+        "calls": len(by_call),
+        "errors": errors[:MAX_BATCH_ERRORS],
+    })
+
+@router.get("/rtvi/stats")
+async def pipecat_rtvi_stats():
+    return {**ingest_queue.stats(), "spool": rtvi_spool.stats()}
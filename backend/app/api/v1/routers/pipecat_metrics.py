@@ -1,5 +1,6 @@
 from fastapi import APIRouter, HTTPException
 from app.services.supabase import SupabaseClient
+from app.services.rollup_repo import RollupRepo
 
 router = APIRouter(prefix="/api/v1/pipecat", tags=["pipecat"])
 
@@ -32,4 +33,16 @@ async def get_pipecat_metrics():
                 "tokens_estimated": extra.get("tokens_estimated", 0),
                 "keyword_hits": extra.get("keyword_hits", {}),
             })
-        return {"items": metrics}
+
+    rows = await RollupRepo.read("day", vendor="pipecat")
+    totals = None
+    if rows is not None:
+        t = RollupRepo.totals(rows)
+        totals = {
+            "calls": t["calls"],
+            "sessions": t["pipecat_sessions"],
+            "avg_duration_secs": round(t["pipecat_duration_secs"] / (t["pipecat_sessions"] or 1), 2),
+            "tokens": t["pipecat_tokens"],
+            "emergencies": t["emergencies"],
+        }
+    return {"items": metrics, "totals": totals}
@@ -10,6 +10,8 @@ from app.services.postprocess import summarize_transcript
 from app.services.agents_repo import AgentsRepo
 from app.services.drivers_repo import DriversRepo
 from app.services.calllog_repo import CallLogRepo
+from app.services import schema
+from app.services.rollup_repo import RollupRepo, outcome_delta
 from ._retell_common import pluck_transcript  
 
 router = APIRouter(prefix="/api/v1/retell", tags=["retell"])
@@ -77,12 +79,17 @@ async def retell_webhook(request: Request):
     driver_name = dyn.get("driver_name") or metadata.get("driver_name")
     driver_phone = dyn.get("driver_phone") or metadata.get("driver_phone")
 
+    # Without the column the id can neither be stored nor used as a fallback key.
+    if not (await schema.current()).calllog_retell_call_id:
+        retell_call_id = None
+
     if event == "call_started":
         patch = {
             "retell_call_id": retell_call_id,
             "load_number": load_number,
             "status": "started",
         }
+        patch = {k: v for k, v in patch.items() if v is not None}
         patched = False
         if provider_call_id:
             patched = await _patch_calllog({"provider_call_id": provider_call_id}, patch)
@@ -118,9 +125,14 @@ async def retell_webhook(request: Request):
             updated = await _patch_calllog({"retell_call_id": retell_call_id}, patch)
 
         if not updated:
-            base = {"provider_call_id": provider_call_id, "retell_call_id": retell_call_id, **patch}
+            base = {"provider_call_id": provider_call_id, **patch}
             await _post_calllog(base)
 
+        # call_ended and call_analyzed both land here; the rollup counts the call once, and
+        # call_analyzed (the richer of the two) replaces whatever call_ended recorded.
+        await RollupRepo.apply(provider_call_id or retell_call_id, "outcome", outcome_delta(summary), vendor="retell",
+                               replace=event == "call_analyzed")
+
         return {"ok": True, "finalized": True}
 
     print("ℹUnknown/ignored webhook event:", event)
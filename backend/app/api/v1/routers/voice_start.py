@@ -1,7 +1,11 @@
 from __future__ import annotations
+import json
 from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import Any, Dict
+from typing import Any, Dict, List
+from app.core.config import settings
+from app.services.call_start import check_start, start_batch, start_call
 from app.vendors.factory import get_vendor
 
 router = APIRouter(prefix="/api/v1/voice", tags=["voice"])
@@ -15,10 +19,77 @@ class StartPayload(BaseModel):
     scenario: str | None = None
 
 @router.post("/start")
-async def start_voice(payload: StartPayload, vendor: str | None = Query(None, description="retell|pipecat")):
+async def start_voice(
+    payload: StartPayload,
+    vendor: str | None = Query(None, description="retell|pipecat"),
+    debug: bool = Query(False, description="include per-stage timings"),
+):
+    try:
+        body = check_start(payload.dict())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        v = get_vendor(vendor)
+        started = await start_call(v, body, debug=debug)
+        out: Dict[str, Any] = {"connect_url": started.connect_url, "provider_call_id": started.provider_call_id, "vendor": (vendor or None)}
+        if started.timings is not None:
+            out["timings"] = started.timings
+        return out
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+class StartBatch(BaseModel):
+    items: List[StartPayload]
+
+@router.post("/start-batch")
+async def start_voice_batch(
+    body: StartBatch,
+    vendor: str | None = Query(None, description="retell|pipecat"),
+    concurrency: int | None = Query(None, ge=1, le=100, description="parallel vendor sessions"),
+    rate: float | None = Query(None, ge=0, description="vendor session starts per second (0 = unlimited)"),
+    stream: bool = Query(False, description="NDJSON, one line per call as it finishes"),
+):
+    """
+    Start many calls at once: one bulk driver lookup/insert, one calllog insert,
+    then vendor sessions under the concurrency and rate limits. Items that fail
+    the /start checks (a phone call without both numbers) are reported as failed
+    and get no calllog row. Per-item results
+    carry the request `index`; with stream=true they arrive in completion order
+    followed by a {"summary": ...} line.
+    """
+    if not body.items:
+        raise HTTPException(status_code=400, detail="items is empty")
+    if len(body.items) > settings.batch_start_max_items:
+        raise HTTPException(status_code=413, detail=f"at most {settings.batch_start_max_items} items per batch")
     try:
         v = get_vendor(vendor)
-        connect_url, provider_call_id = await v.start(payload.dict())
-        return {"connect_url": connect_url, "provider_call_id": provider_call_id, "vendor": (vendor or None)}
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    payloads = [p.dict() for p in body.items]
+    results = start_batch(
+        v, payloads,
+        concurrency=concurrency or settings.batch_start_concurrency,
+        rate=settings.batch_start_rate_per_sec if rate is None else rate,
+    )
+
+    if stream:
+        async def lines():
+            ok = failed = 0
+            try:
+                async for item in results:
+                    ok += item["ok"]
+                    failed += not item["ok"]
+                    yield json.dumps(item) + "\n"
+            except Exception as e:
+                yield json.dumps({"error": str(e)}) + "\n"
+            yield json.dumps({"summary": {"vendor": v.name, "ok": ok, "failed": failed}}) + "\n"
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    try:
+        items = [item async for item in results]
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    items.sort(key=lambda i: i["index"])
+    ok = sum(1 for i in items if i["ok"])
+    return {"vendor": v.name, "items": items, "ok": ok, "failed": len(items) - ok}
@@ -22,6 +22,31 @@ class Settings(BaseSettings):
     retell_agent_version: int = Field(
         default=1, validation_alias=AliasChoices("RETELL_AGENT_VERSION", "retell_agent_version")
     )
+    # Shared Retell client (app/services/retell_client.py). create-call sits on the
+    # call-start latency path, so connects fail fast and retries stay short.
+    retell_timeout: float = Field(default=10.0, validation_alias=AliasChoices("RETELL_TIMEOUT", "retell_timeout"))
+    retell_connect_timeout: float = Field(
+        default=2.0, validation_alias=AliasChoices("RETELL_CONNECT_TIMEOUT", "retell_connect_timeout")
+    )
+    retell_pool_timeout: float = Field(
+        default=5.0, validation_alias=AliasChoices("RETELL_POOL_TIMEOUT", "retell_pool_timeout")
+    )
+    retell_pool_max_connections: int = Field(
+        default=20, validation_alias=AliasChoices("RETELL_POOL_MAX_CONNECTIONS", "retell_pool_max_connections")
+    )
+    retell_pool_keepalive_expiry: float = Field(
+        default=30.0, validation_alias=AliasChoices("RETELL_POOL_KEEPALIVE_EXPIRY", "retell_pool_keepalive_expiry")
+    )
+    retell_max_concurrency: int = Field(
+        default=20, validation_alias=AliasChoices("RETELL_MAX_CONCURRENCY", "retell_max_concurrency")
+    )
+    retell_max_retries: int = Field(default=2, validation_alias=AliasChoices("RETELL_MAX_RETRIES", "retell_max_retries"))
+    retell_retry_backoff: float = Field(
+        default=0.25, validation_alias=AliasChoices("RETELL_RETRY_BACKOFF", "retell_retry_backoff")
+    )
+    retell_retry_max_wait: float = Field(
+        default=5.0, validation_alias=AliasChoices("RETELL_RETRY_MAX_WAIT", "retell_retry_max_wait")
+    )
 
  
     supabase_url: str = Field(validation_alias=AliasChoices("SUPABASE_URL", "supabase_url"))
@@ -29,6 +54,69 @@ class Settings(BaseSettings):
         validation_alias=AliasChoices("SUPABASE_SERVICE_KEY", "supabase_service_key")
     )
 
+    supabase_http2: bool = Field(default=False, validation_alias=AliasChoices("SUPABASE_HTTP2", "supabase_http2"))
+    supabase_pool_max_connections: int = Field(
+        default=50, validation_alias=AliasChoices("SUPABASE_POOL_MAX_CONNECTIONS", "supabase_pool_max_connections")
+    )
+    supabase_pool_max_keepalive: int = Field(
+        default=20, validation_alias=AliasChoices("SUPABASE_POOL_MAX_KEEPALIVE", "supabase_pool_max_keepalive")
+    )
+    supabase_pool_keepalive_expiry: float = Field(
+        default=30.0, validation_alias=AliasChoices("SUPABASE_POOL_KEEPALIVE_EXPIRY", "supabase_pool_keepalive_expiry")
+    )
+    supabase_timeout: float = Field(default=10.0, validation_alias=AliasChoices("SUPABASE_TIMEOUT", "supabase_timeout"))
+    supabase_connect_timeout: float = Field(
+        default=3.0, validation_alias=AliasChoices("SUPABASE_CONNECT_TIMEOUT", "supabase_connect_timeout")
+    )
+    supabase_pool_timeout: float = Field(
+        default=5.0, validation_alias=AliasChoices("SUPABASE_POOL_TIMEOUT", "supabase_pool_timeout")
+    )
+
+    # "http" talks to SUPABASE_URL; "fake" uses the in-process PostgREST stand-in
+    # (app/services/fake_postgrest.py) for offline benchmarks and tests.
+    supabase_backend: str = Field(default="http", validation_alias=AliasChoices("SUPABASE_BACKEND", "supabase_backend"))
+    fake_postgrest_latency_ms: float = Field(
+        default=0.0, validation_alias=AliasChoices("FAKE_POSTGREST_LATENCY_MS", "fake_postgrest_latency_ms")
+    )
+    fake_postgrest_jitter_ms: float = Field(
+        default=0.0, validation_alias=AliasChoices("FAKE_POSTGREST_JITTER_MS", "fake_postgrest_jitter_ms")
+    )
+
+    repo_cache_ttl: float = Field(default=300.0, validation_alias=AliasChoices("REPO_CACHE_TTL", "repo_cache_ttl"))
+    repo_cache_maxsize: int = Field(default=4096, validation_alias=AliasChoices("REPO_CACHE_MAXSIZE", "repo_cache_maxsize"))
+
+    rtvi_queue_maxsize: int = Field(default=10000, validation_alias=AliasChoices("RTVI_QUEUE_MAXSIZE", "rtvi_queue_maxsize"))
+    rtvi_workers: int = Field(default=4, validation_alias=AliasChoices("RTVI_WORKERS", "rtvi_workers"))
+    rtvi_coalesce_ms: int = Field(default=250, validation_alias=AliasChoices("RTVI_COALESCE_MS", "rtvi_coalesce_ms"))
+
+    # On-disk spool for RTVI writes that failed while PostgREST was unreachable (app/services/spool.py).
+    spool_dir: str = Field(default=".spool", validation_alias=AliasChoices("SPOOL_DIR", "spool_dir"))
+    spool_max_mb: int = Field(default=256, validation_alias=AliasChoices("SPOOL_MAX_MB", "spool_max_mb"))
+    spool_segment_kb: int = Field(default=4096, validation_alias=AliasChoices("SPOOL_SEGMENT_KB", "spool_segment_kb"))
+    spool_fsync_ms: int = Field(default=200, validation_alias=AliasChoices("SPOOL_FSYNC_MS", "spool_fsync_ms"))
+    spool_replay_secs: float = Field(default=5.0, validation_alias=AliasChoices("SPOOL_REPLAY_SECS", "spool_replay_secs"))
+    rtvi_idempotency_ttl: float = Field(
+        default=3600.0, validation_alias=AliasChoices("RTVI_IDEMPOTENCY_TTL", "rtvi_idempotency_ttl")
+    )
+    live_transcript_ttl: float = Field(
+        default=3600.0, validation_alias=AliasChoices("LIVE_TRANSCRIPT_TTL", "live_transcript_ttl")
+    )
+    live_transcript_max_calls: int = Field(
+        default=5000, validation_alias=AliasChoices("LIVE_TRANSCRIPT_MAX_CALLS", "live_transcript_max_calls")
+    )
+
+    llm_persist_debounce_ms: int = Field(default=1000, validation_alias=AliasChoices("LLM_PERSIST_DEBOUNCE_MS", "llm_persist_debounce_ms"))
+
+    batch_start_concurrency: int = Field(
+        default=10, validation_alias=AliasChoices("BATCH_START_CONCURRENCY", "batch_start_concurrency")
+    )
+    batch_start_rate_per_sec: float = Field(
+        default=10.0, validation_alias=AliasChoices("BATCH_START_RATE_PER_SEC", "batch_start_rate_per_sec")
+    )
+    batch_start_max_items: int = Field(
+        default=1000, validation_alias=AliasChoices("BATCH_START_MAX_ITEMS", "batch_start_max_items")
+    )
+
     voice_vendor: str = Field(default="retell", validation_alias=AliasChoices("VOICE_VENDOR", "voice_vendor"))
     pipecat_client_url: str = Field(default="http://localhost:7860/client/",
                                     validation_alias=AliasChoices("PIPECAT_CLIENT_URL", "pipecat_client_url"))
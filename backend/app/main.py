@@ -1,4 +1,6 @@
 # app/main.py
+from contextlib import asynccontextmanager
+import structlog
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
@@ -21,16 +23,41 @@ from app.middleware.request_timing import RequestTimingMiddleware
 
 from app.api.v1.routers.pipecat_adapter import router as pipecat_router
 from app.api.v1.routers.voice_start import router as voice_router
-from app.api.v1.routers.pipecat_events import router as pipecat_events_router
+from app.api.v1.routers.pipecat_events import (
+    router as pipecat_events_router, ingest_queue as rtvi_ingest_queue, rtvi_spool,
+)
 from app.api.v1.routers.analytics_pipecat import router as analytics_pipecat
 
 from app.api.v1.routers.pipecat_metrics import router as pipecat_metrics
+from app.services.supabase import SupabaseClient
+from app.services.retell_client import RetellClient
+from app.services import schema
 
 
 
 
 setup_logging()
-app = FastAPI(title=settings.app_name)
+logger = structlog.get_logger("app")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await SupabaseClient.startup()
+    try:
+        await schema.load()
+    except Exception as e:
+        # Not fatal: repos load it lazily on first use once PostgREST is reachable.
+        logger.warning("schema introspection at startup failed", error=str(e))
+    await rtvi_spool.start()
+    await rtvi_ingest_queue.start()
+    try:
+        yield
+    finally:
+        await rtvi_ingest_queue.stop()
+        await rtvi_spool.stop()
+        await RetellClient.shutdown()
+        await SupabaseClient.shutdown()
+
+app = FastAPI(title=settings.app_name, lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -1,12 +1,41 @@
 from __future__ import annotations
+from app.core.config import settings
+from app.services.cache import AsyncTTLCache
 from app.services.supabase import SupabaseClient
 
 AGENTS_PATH = "/agent"  
 
 class AgentsRepo:
-    @staticmethod
-    async def ensure_agent_id() -> int:
+    cache = AsyncTTLCache("agents", maxsize=16, ttl=settings.repo_cache_ttl)
+
+    @classmethod
+    async def ensure_agent_id(cls) -> int:
         """Return an integer id from public.agent; create a 'Custom LLM agent' if table is empty."""
+        found = await cls.cache.get_or_load("default", cls._load_agent_id)
+        return found if found is not None else 1
+
+    @classmethod
+    async def get_agent(cls, agent_id: int) -> dict | None:
+        """Agent row (behavior, emergency_triggers, ...) for per-agent dialogue policy; None if missing/unreadable."""
+        async def load() -> dict | None:
+            try:
+                async with SupabaseClient().client() as c:
+                    r = await c.get(AGENTS_PATH, params={"id": f"eq.{agent_id}", "limit": "1"})
+            except Exception:
+                return None
+            if r.status_code >= 400:
+                return None
+            rows = r.json() or []
+            return rows[0] if rows else None
+        return await cls.cache.get_or_load(("agent", agent_id), load)
+
+    @classmethod
+    def invalidate(cls) -> None:
+        """Call after agents are created or updated."""
+        cls.cache.invalidate()
+
+    @staticmethod
+    async def _load_agent_id() -> int | None:
         async with SupabaseClient().client() as c:
             
             r = await c.get(AGENTS_PATH, params={"select":"id", "order":"id.asc", "limit":"1"})
@@ -19,8 +48,8 @@ class AgentsRepo:
             r2 = await c.post(AGENTS_PATH, json={"name": "Custom LLM agent"})
             if r2.status_code >= 400:
                 
-                return 1
+                return None
             rows2 = r2.json() or []
             if rows2 and isinstance(rows2[0].get("id"), int):
                 return int(rows2[0]["id"])
-            return 1
+            return None
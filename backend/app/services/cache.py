@@ -0,0 +1,82 @@
+# app/services/cache.py
+from __future__ import annotations
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+class AsyncTTLCache:
+    """
+    Bounded LRU cache with per-entry TTL for async lookups.
+
+    get_or_load() collapses concurrent misses for the same key into a single
+    in-flight loader call (single-flight); every waiter gets the same result
+    or the same exception. A caller that is cancelled stops waiting without
+    cancelling the load for the rest. Failed loads are not cached.
+    """
+
+    def __init__(self, name: str, maxsize: int = 1024, ttl: float = 300.0):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self._stats = {"hits": 0, "misses": 0, "coalesced": 0, "evictions": 0, "invalidations": 0}
+
+    def get(self, key: Hashable) -> Any | None:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        expires, value = item
+        if expires < time.monotonic():
+            self._data.pop(key, None)
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        value = self.get(key)
+        if value is not None:
+            self._stats["hits"] += 1
+            return value
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self._stats["coalesced"] += 1
+            return await asyncio.shield(pending)
+
+        self._stats["misses"] += 1
+        # The load runs as its own task, so cancelling whichever caller started it
+        # cancels only that caller's wait, not the load the others share.
+        task = asyncio.ensure_future(self._load(key, loader))
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())  # lone failures don't warn
+        self._inflight[key] = task
+        return await asyncio.shield(task)
+
+    async def _load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            value = await loader()
+            if value is not None:
+                self.set(key, value)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+    def invalidate(self, key: Hashable | None = None) -> None:
+        """Drop one key, or everything when key is None."""
+        self._stats["invalidations"] += 1
+        if key is None:
+            self._data.clear()
+        else:
+            self._data.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"name": self.name, "size": len(self._data), "maxsize": self.maxsize, "ttl": self.ttl, **self._stats}
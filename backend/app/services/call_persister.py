@@ -0,0 +1,159 @@
+# app/services/call_persister.py
+from __future__ import annotations
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+import structlog
+
+from app.services.conversation_state import ConversationState
+
+logger = structlog.get_logger("call-persister")
+
+WriteFn = Callable[[Dict[str, Any]], Awaitable[bool]]
+
+
+class LatencySeries:
+    """Recent latency samples (ms) with cheap percentile summaries."""
+
+    def __init__(self, size: int = 2048):
+        self._samples: Deque[float] = deque(maxlen=size)
+        self.count = 0
+        self.max = 0.0
+
+    def add(self, ms: float) -> None:
+        self._samples.append(ms)
+        self.count += 1
+        self.max = max(self.max, ms)
+
+    def summary(self) -> Dict[str, Any]:
+        s = sorted(self._samples)
+        if not s:
+            return {"count": self.count, "p50": None, "p95": None, "p99": None, "max": None}
+        pick = lambda q: round(s[min(len(s) - 1, int(q * len(s)))], 2)
+        return {"count": self.count, "p50": pick(0.50), "p95": pick(0.95), "p99": pick(0.99), "max": round(self.max, 2)}
+
+
+class PersistStats:
+    """Process-wide counters for the LLM websocket: reply latency vs persistence lag."""
+
+    def __init__(self):
+        self.reply_ms = LatencySeries()
+        self.write_ms = LatencySeries()
+        self.lag_ms = LatencySeries()
+        self.counters = {"active_calls": 0, "submitted": 0, "superseded": 0, "writes": 0, "write_errors": 0, "skipped": 0}
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            **self.counters,
+            "reply_ms": self.reply_ms.summary(),
+            "persist_write_ms": self.write_ms.summary(),
+            "persist_lag_ms": self.lag_ms.summary(),
+        }
+
+
+stats = PersistStats()
+
+
+class CallPersister:
+    """
+    Per-call write-behind task for a ConversationState.
+
+    submit() never blocks: it records the latest requested status and wakes the
+    writer. Requests are not queued individually; the writer always snapshots
+    the state as it is when it runs, so a burst of turns during a slow write
+    collapses into one follow-up write (a bounded, latest-only queue of one).
+    Debounced changes are written once the window elapses even if no further
+    messages arrive. close() requests the final "ended" write and waits for it.
+    """
+
+    FINAL_RETRIES = 3
+
+    def __init__(self, conv: ConversationState, write: WriteFn, name: str = ""):
+        self._conv = conv
+        self._write = write
+        self._name = name
+        self._wake = asyncio.Event()
+        self._status: Optional[str] = None
+        self._final = False
+        self._since: Optional[float] = None  # oldest unwritten submit()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> "CallPersister":
+        if self._task is None:
+            stats.counters["active_calls"] += 1
+            self._task = asyncio.create_task(self._run(), name=f"call-persist-{self._name}")
+        return self
+
+    def submit(self, status: Optional[str] = None, final: bool = False) -> None:
+        stats.counters["submitted"] += 1
+        if self._since is None:
+            self._since = time.monotonic()
+        elif not self._final:
+            stats.counters["superseded"] += 1
+        self._status = status or self._status
+        self._final = self._final or final
+        self._wake.set()
+
+    async def close(self, timeout: float = 10.0) -> None:
+        if self._task is None:
+            return
+        self.submit(final=True)
+        try:
+            await asyncio.wait_for(asyncio.shield(self._task), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.error("Final transcript write timed out", call_id=self._name)
+            self._task.cancel()
+
+    async def _wait(self, timeout: Optional[float]) -> None:
+        try:
+            await asyncio.wait_for(self._wake.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _run(self) -> None:
+        failures = 0
+        try:
+            while True:
+                await self._wait(None if not self._since else self._conv.write_due_in(self._status))
+                self._wake.clear()
+                final = self._final
+                patch = self._conv.pending_patch(status=self._status, final=final)
+                if patch is None:
+                    if final:
+                        return
+                    if self._conv.write_due_in(self._status) is None:
+                        self._since = None
+                        stats.counters["skipped"] += 1
+                    continue
+
+                since = self._since or time.monotonic()
+                start = time.perf_counter()
+                try:
+                    ok = await self._write(patch)
+                except Exception as e:
+                    logger.error("Transcript write failed", call_id=self._name, error=str(e))
+                    ok = False
+                stats.write_ms.add((time.perf_counter() - start) * 1000)
+
+                if ok:
+                    failures = 0
+                    self._conv.mark_written(patch)
+                    stats.counters["writes"] += 1
+                    stats.lag_ms.add((time.monotonic() - since) * 1000)
+                    if self._wake.is_set() or self._conv.write_due_in(self._status) is not None:
+                        self._since = time.monotonic()  # changes arrived mid-write
+                    else:
+                        self._since = None
+                    if final:
+                        return
+                    continue
+
+                stats.counters["write_errors"] += 1
+                failures += 1
+                if final and failures >= self.FINAL_RETRIES:
+                    return
+                await self._wait(min(5.0, 0.5 * failures))
+                self._wake.set()
+        finally:
+            stats.counters["active_calls"] -= 1
@@ -0,0 +1,258 @@
+# app/services/call_start.py
+from __future__ import annotations
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Dict, List, Mapping, Optional, Sequence, TypeVar
+
+import structlog
+
+from app.services.agents_repo import AgentsRepo
+from app.services.calllog_repo import CallLogRepo
+from app.services.drivers_repo import DriversRepo
+from app.services import schema
+from app.vendors.base import VoiceVendor
+
+logger = structlog.get_logger("call-start")
+
+T = TypeVar("T")
+
+
+class StageTimer:
+    """Wall-clock offset and duration per named stage, relative to one call start."""
+
+    def __init__(self):
+        self._t0 = time.perf_counter()
+        self.stages: Dict[str, Dict[str, float]] = {}
+
+    async def run(self, name: str, aw: Awaitable[T]) -> T:
+        start = time.perf_counter()
+        try:
+            return await aw
+        finally:
+            end = time.perf_counter()
+            self.stages[name] = {
+                "start_ms": round((start - self._t0) * 1000, 2),
+                "ms": round((end - start) * 1000, 2),
+            }
+
+    def report(self) -> Dict[str, Any]:
+        return {"stages": self.stages, "total_ms": round((time.perf_counter() - self._t0) * 1000, 2)}
+
+
+def check_start(payload: Mapping[str, Any]) -> Dict[str, Any]:
+    """
+    The payload with driver_phone/from_number stripped (blank -> None); ValueError
+    when a phone call lacks either number. Runs before anything is written.
+    """
+    out = dict(payload)
+    out["driver_phone"] = (payload.get("driver_phone") or "").strip() or None
+    out["from_number"] = (payload.get("from_number") or "").strip() or None
+    if (payload.get("call_type") or "web").lower() == "phone" and not (out["driver_phone"] and out["from_number"]):
+        raise ValueError("driver_phone and from_number are required for phone calls")
+    return out
+
+
+@dataclass
+class CallStart:
+    connect_url: str
+    provider_call_id: str
+    vendor: str
+    session: Dict[str, Any] = field(default_factory=dict)
+    calllog_ok: bool = False
+    timings: Optional[Dict[str, Any]] = None
+
+
+async def _log_call(provider_call_id: str, payload: Mapping[str, Any], timer: StageTimer) -> bool:
+    """Resolve agent + driver concurrently, then insert the initiated calllog row (never over an existing one)."""
+    agent_db_id, driver_db_id = await asyncio.gather(
+        timer.run("resolve_agent", AgentsRepo.ensure_agent_id()),
+        timer.run("resolve_driver", DriversRepo.ensure_driver_id(payload.get("driver_name"), payload.get("driver_phone"))),
+    )
+    row = {
+        "provider_call_id": provider_call_id,
+        "load_number": payload.get("load_number"),
+        "status": "initiated",
+        "structured_payload": {},
+        "agent_id": agent_db_id,
+        "driver_id": driver_db_id,
+        "scenario": payload.get("scenario") or "Dispatch",
+    }
+    written = await timer.run("calllog_insert", CallLogRepo.insert_new([row]))
+    if provider_call_id not in written:
+        logger.error("calllog row already exists, not overwritten", provider_call_id=provider_call_id)
+        return False
+    return True
+
+
+async def _calllog_columns(link: Dict[str, Any]) -> Dict[str, Any]:
+    """Keep only the session ids this calllog table can store (e.g. retell_call_id)."""
+    sch = await schema.current()
+    return {k: v for k, v in link.items() if sch.has_column("calllog", k)}
+
+
+async def _link_session(provider_call_id: str, link: Dict[str, Any]) -> None:
+    try:
+        link = await _calllog_columns(link)
+        if not link:
+            return
+        await CallLogRepo.upsert({"provider_call_id": provider_call_id, **link})
+    except Exception as e:
+        logger.error("calllog session link failed", provider_call_id=provider_call_id, error=str(e))
+
+
+async def start_call(vendor: VoiceVendor, payload: Mapping[str, Any], debug: bool = False) -> CallStart:
+    """
+    Start a call with every independent step in flight at once:
+
+        resolve agent ─┐
+                       ├─> insert calllog (provider_call_id)
+        resolve driver ┘
+        vendor.create_session ──────────────> connect_url
+
+    The response waits for the slower branch only. A calllog failure is logged
+    and reported (calllog_ok=False) unless the vendor sets requires_calllog; a
+    vendor failure is raised to the caller. Provider ids returned by the session (e.g.
+    retell_call_id) are linked onto the row before returning, so the vendor's first
+    callbacks keyed by that id find it.
+    """
+    timer = StageTimer()
+    provider_call_id = vendor.new_call_id()
+
+    log_task = asyncio.create_task(_log_call(provider_call_id, payload, timer))
+    try:
+        session = await timer.run("vendor_session", vendor.create_session(payload, provider_call_id))
+    except BaseException:
+        # The row is still written (as before) so the failed attempt shows up in the log.
+        await asyncio.gather(log_task, return_exceptions=True)
+        raise
+
+    try:
+        calllog_ok = await log_task
+    except Exception as e:
+        if vendor.requires_calllog:
+            raise
+        logger.error("calllog upsert failed", provider_call_id=provider_call_id, error=str(e))
+        calllog_ok = False
+    if not calllog_ok and vendor.requires_calllog:
+        raise RuntimeError(f"calllog insert failed for {provider_call_id}")
+
+    link = session.get("calllog_link") or {}
+    if link:
+        await timer.run("calllog_link", _link_session(provider_call_id, link))
+
+    return CallStart(
+        connect_url=session.get("connect_url") or "",
+        provider_call_id=provider_call_id,
+        vendor=vendor.name,
+        session=session,
+        calllog_ok=calllog_ok,
+        timings=timer.report() if debug else None,
+    )
+
+
+class RateLimiter:
+    """Spaces acquire() calls at least 1/rate seconds apart; rate <= 0 disables it."""
+
+    def __init__(self, rate: float):
+        self._interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        if not self._interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            wait = self._next - now
+            self._next = max(now, self._next) + self._interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+async def start_batch(
+    vendor: VoiceVendor,
+    payloads: Sequence[Mapping[str, Any]],
+    concurrency: int = 10,
+    rate: float = 0.0,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Start many calls with shared setup, yielding one result per item as it finishes.
+
+    Every item is checked first (check_start); a bad one fails at once and gets
+    no driver, calllog row or session. The agent is then resolved once, every
+    driver in one DriversRepo.ensure_many(), and all calllog rows are inserted in
+    one request before any vendor session is opened; an item whose
+    provider_call_id is already taken fails without a session. Sessions then fan
+    out under `concurrency` and `rate` (starts/sec). Each item's provider ids are
+    linked before its result is yielded; failures are written back in one upsert
+    at the end.
+    """
+    base_id = vendor.new_call_id()
+    checked: Dict[int, Dict[str, Any]] = {}
+    rejected: List[Dict[str, Any]] = []
+    for i, p in enumerate(payloads):
+        try:
+            checked[i] = check_start(p)
+        except ValueError as e:
+            rejected.append({"index": i, "provider_call_id": None, "ok": False, "error": str(e), "ms": 0.0})
+    pids = {i: f"{base_id}_{i}" for i in checked}
+
+    if checked:
+        agent_db_id, drivers = await asyncio.gather(
+            AgentsRepo.ensure_agent_id(),
+            DriversRepo.ensure_many((p.get("driver_name"), p.get("driver_phone")) for p in checked.values()),
+        )
+        rows = [{
+            "provider_call_id": pids[i],
+            "load_number": p.get("load_number"),
+            "status": "initiated",
+            "structured_payload": {},
+            "agent_id": agent_db_id,
+            "driver_id": drivers.get(DriversRepo.cache_key(p.get("driver_name"), p.get("driver_phone"))),
+            "scenario": p.get("scenario") or "Dispatch",
+        } for i, p in checked.items()]
+        written = await CallLogRepo.insert_new(rows)
+    else:
+        written = set()
+
+    sem = asyncio.Semaphore(max(1, concurrency))
+    limiter = RateLimiter(rate)
+    failed: List[Dict[str, Any]] = []
+
+    async def one(i: int) -> Dict[str, Any]:
+        async with sem:
+            await limiter.acquire()
+            start = time.perf_counter()
+            item: Dict[str, Any] = {"index": i, "provider_call_id": pids[i]}
+            try:
+                session = await vendor.create_session(checked[i], pids[i])
+                item.update(ok=True, connect_url=session.get("connect_url") or "")
+                link = session.get("calllog_link") or {}
+                if link:
+                    await _link_session(pids[i], link)
+            except Exception as e:
+                item.update(ok=False, error=str(e))
+                failed.append({"provider_call_id": pids[i], "status": "failed"})
+            item["ms"] = round((time.perf_counter() - start) * 1000, 2)
+            return item
+
+    for item in rejected:
+        yield item
+    for i, pid in pids.items():
+        if pid not in written:
+            logger.error("calllog row already exists, not overwritten", provider_call_id=pid)
+            yield {"index": i, "provider_call_id": pid, "ok": False, "error": "calllog row already exists", "ms": 0.0}
+
+    tasks = [asyncio.create_task(one(i)) for i, pid in pids.items() if pid in written]
+    try:
+        for fut in asyncio.as_completed(tasks):
+            yield await fut
+    finally:
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        try:
+            await CallLogRepo.upsert_many(failed)
+        except Exception as e:
+            logger.error("calllog batch follow-up failed", error=str(e))
@@ -1,8 +1,27 @@
 from __future__ import annotations
-from typing import Any, Dict, Optional
+import asyncio
+from typing import Any, Dict, List, Optional, Set
+from app.services import schema
 from app.services.supabase import SupabaseClient
 
+def _no_unique_index(r) -> bool:
+    """PostgREST's answer when ?on_conflict= names a column without a unique index (42P10)."""
+    return r.status_code == 400 and "42P10" in r.text
+
+
+class PostgrestError(RuntimeError):
+    """A calllog request PostgREST answered with >= 400; `status` tells a rejected write from an outage."""
+
+    def __init__(self, what: str, r):
+        super().__init__(f"{what} failed: {r.status_code} {r.text}")
+        self.status = r.status_code
+
+
 class CallLogRepo:
+    # Set once an on_conflict write hits 42P10 (migrations/007 not applied yet);
+    # later writes go straight to the plain insert / patch fallback until restart.
+    no_conflict_target = False
+
     @staticmethod
     async def post(row: Dict[str, Any]) -> bool:
         async with SupabaseClient().client() as c:
@@ -10,9 +29,85 @@ class CallLogRepo:
             return r.status_code < 400
 
     @staticmethod
-    async def patch_by_provider(provider_call_id: str, patch: Dict[str, Any]) -> bool:
+    async def insert_new(rows: List[Dict[str, Any]], on_conflict: str = "provider_call_id") -> Set[Any]:
+        """
+        Insert rows whose `on_conflict` key is not taken yet; existing rows are
+        left untouched. Returns the keys that were actually written, so callers
+        can tell a fresh row from a collision.
+        """
+        if not rows:
+            return set()
+        async with SupabaseClient().client() as c:
+            if not CallLogRepo.no_conflict_target:
+                r = await c.post(
+                    "/calllog",
+                    params={"on_conflict": on_conflict, "select": on_conflict},
+                    json=rows,
+                    headers={"Prefer": "return=representation,resolution=ignore-duplicates"},
+                )
+                if _no_unique_index(r):
+                    CallLogRepo.no_conflict_target = True
+            if CallLogRepo.no_conflict_target:
+                # No unique index to collide on: a plain insert (ids are random anyway).
+                r = await c.post("/calllog", params={"select": on_conflict}, json=rows,
+                                 headers={"Prefer": "return=representation"})
+            if r.status_code >= 400:
+                raise RuntimeError(f"calllog insert failed: {r.status_code} {r.text}")
+            return {row.get(on_conflict) for row in r.json() or []}
+
+    @staticmethod
+    async def upsert(row: Dict[str, Any], on_conflict: str = "provider_call_id") -> bool:
+        """
+        Insert-or-merge keyed on a unique column (migrations/007). Only the
+        columns present in `row` are written on conflict. Without the unique
+        index it falls back to patch-then-insert per row.
+        """
+        return await CallLogRepo.upsert_many([row], on_conflict)
+
+    @staticmethod
+    async def upsert_many(rows: List[Dict[str, Any]], on_conflict: str = "provider_call_id") -> bool:
+        """Bulk upsert in one POST. Every row must carry the same keys (PostgREST uses the first row's)."""
+        if not rows:
+            return True
+        async with SupabaseClient().client() as c:
+            if not CallLogRepo.no_conflict_target:
+                r = await c.post(
+                    "/calllog",
+                    params={"on_conflict": on_conflict},
+                    json=rows,
+                    headers={"Prefer": "return=minimal,resolution=merge-duplicates"},
+                )
+                if not _no_unique_index(r):
+                    return r.status_code < 400
+                CallLogRepo.no_conflict_target = True
+
+            async def merge(row: Dict[str, Any]) -> bool:
+                r = await c.patch("/calllog", params={on_conflict: f"eq.{row[on_conflict]}", "select": on_conflict},
+                                  json=row, headers={"Prefer": "return=representation"})
+                if r.status_code >= 400:
+                    return False
+                if r.json():
+                    return True
+                r = await c.post("/calllog", json=[row])
+                return r.status_code < 400
+
+            return all(await asyncio.gather(*(merge(row) for row in rows)))
+
+    @staticmethod
+    async def patch_by_provider(provider_call_id: str, patch: Dict[str, Any], raise_errors: bool = False) -> bool:
+        """True when PostgREST accepted the patch; with raise_errors a failure raises PostgrestError instead."""
         async with SupabaseClient().client() as c:
             r = await c.patch(f"/calllog?provider_call_id=eq.{provider_call_id}", json=patch)
+            if raise_errors and r.status_code >= 400:
+                raise PostgrestError("calllog patch", r)
+            return r.status_code < 400
+
+    @staticmethod
+    async def patch_by_retell(retell_call_id: str, patch: Dict[str, Any]) -> bool:
+        if not (await schema.current()).calllog_retell_call_id:
+            return False
+        async with SupabaseClient().client() as c:
+            r = await c.patch("/calllog", params={"retell_call_id": f"eq.{retell_call_id}"}, json=patch)
             return r.status_code < 400
 
     @staticmethod
@@ -23,3 +118,60 @@ class CallLogRepo:
                 return None
             rows = r.json() or []
             return rows[0] if rows else None
+
+    @staticmethod
+    async def get_by_retell(retell_call_id: str) -> Optional[Dict[str, Any]]:
+        if not (await schema.current()).calllog_retell_call_id:
+            return None
+        async with SupabaseClient().client() as c:
+            r = await c.get("/calllog", params={"retell_call_id": f"eq.{retell_call_id}", "limit": "1"})
+            if r.status_code >= 400:
+                return None
+            rows = r.json() or []
+            return rows[0] if rows else None
+
+    @staticmethod
+    async def apply_extra(items: List[Dict[str, Any]]) -> int:
+        """
+        Bulk, atomic updates of calllog.extra via calllog_apply_extra() (migrations/003).
+        Each item: {"pid", "incr": {field: delta}, "keywords": [...], "set": {...}}.
+        Returns the number of rows updated.
+        """
+        if not items:
+            return 0
+        async with SupabaseClient().client() as c:
+            r = await c.post("/rpc/calllog_apply_extra", json={"p_items": items})
+            if r.status_code >= 400:
+                raise PostgrestError("calllog_apply_extra", r)
+            return int(r.json() or 0)
+
+    @staticmethod
+    async def append_transcript(
+        provider_call_id: str, seq: int, lines: List[str], summary: Optional[Dict[str, Any]] = None
+    ) -> Optional[int]:
+        """
+        Append transcript lines starting at line `seq` via calllog_transcript_append()
+        (migrations/009); lines already stored are skipped, so retries are safe.
+        Returns the stored line count afterwards, or None when there is no row.
+        """
+        async with SupabaseClient().client() as c:
+            r = await c.post(
+                "/rpc/calllog_transcript_append",
+                json={"p_pid": provider_call_id, "p_seq": seq, "p_lines": lines, "p_summary": summary},
+            )
+            if r.status_code >= 400:
+                raise PostgrestError("calllog_transcript_append", r)
+            n = r.json()
+            return None if n is None else int(n)
+
+    @staticmethod
+    async def incr_extra(provider_call_id: str, field: str, delta: int = 1) -> bool:
+        async with SupabaseClient().client() as c:
+            r = await c.post("/rpc/calllog_incr_extra", json={"pid": provider_call_id, "field": field, "delta": delta})
+            return r.status_code < 400
+
+    @staticmethod
+    async def append_keywords(provider_call_id: str, keywords: List[str]) -> bool:
+        async with SupabaseClient().client() as c:
+            r = await c.post("/rpc/calllog_append_keywords", json={"pid": provider_call_id, "keywords": keywords})
+            return r.status_code < 400
@@ -0,0 +1,117 @@
+# app/services/conversation_state.py
+from __future__ import annotations
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.services.extraction import Features, summarize
+
+
+class ConversationState:
+    """
+    Transcript + structured summary for one live Retell LLM websocket.
+
+    ingest() only looks at utterances it has not seen before: each new line is
+    run through the extractor once and folded into the running Features, so the
+    summary is refreshed in O(new text) per turn rather than by re-joining and
+    re-summarizing the whole call.
+
+    pending_patch() implements the write policy: nothing is returned unless the
+    transcript, summary or status changed since the last write, and non-final
+    writes are held back until `debounce` seconds have passed since the previous
+    one. Final writes (end_call / disconnect) always go out.
+    """
+
+    def __init__(self, debounce: float = 1.0):
+        self.debounce = debounce
+        self.lines: List[str] = []
+        self.features = Features().resolve()
+        self.summary: Dict[str, Any] = summarize(self.features)
+        self._seen = 0
+        self._written_lines = 0
+        self._written_summary: Optional[Dict[str, Any]] = None
+        self._written_status: Optional[str] = None
+        self._last_write = 0.0
+        self._staged_lines = 0
+
+    def ingest(self, transcript: Any) -> bool:
+        """Fold new utterances from Retell's cumulative transcript list; True if any were added."""
+        if not isinstance(transcript, list):
+            return False
+        lines = []
+        for utt in transcript[self._seen:]:
+            role = (utt.get("role") or "").lower()
+            content = (utt.get("content") or "").strip()
+            if content and role in {"user", "assistant"}:
+                lines.append(f"{'Driver' if role == 'user' else 'Agent'}: {content}")
+        self._seen = len(transcript)
+        return self.extend(lines)
+
+    def extend(self, lines: List[str], folded: Optional[Tuple[Features, Dict[str, Any]]] = None) -> bool:
+        """
+        Fold already formatted "Driver: ..." / "Agent: ..." lines; True if any were added.
+        `folded` is fold(lines) computed earlier, so the extractor does not run twice.
+        """
+        if folded is None:
+            for line in lines:
+                self.features.merge(Features(line))
+        else:
+            self.features = folded[0]
+        self.lines.extend(lines)
+        if lines:
+            self.summary = folded[1] if folded is not None else summarize(self.features)
+        return bool(lines)
+
+    def fold(self, lines: List[str]) -> Tuple[Features, Dict[str, Any]]:
+        """The features and summary extend(lines) would produce, leaving this state untouched."""
+        features = Features().resolve().merge(self.features)
+        for line in lines:
+            features.merge(Features(line))
+        return features, summarize(features)
+
+    @property
+    def transcript(self) -> Optional[str]:
+        return "\n".join(self.lines).strip() or None
+
+    def _changes(self, status: Optional[str]) -> Tuple[bool, bool, bool]:
+        return (
+            len(self.lines) != self._written_lines,
+            self.summary != self._written_summary,
+            status is not None and status != self._written_status,
+        )
+
+    def write_due_in(self, status: Optional[str] = None, now: Optional[float] = None) -> Optional[float]:
+        """Seconds until a debounced write of unwritten changes is allowed; None if nothing changed."""
+        if not any(self._changes(status)):
+            return None
+        now = time.monotonic() if now is None else now
+        return max(0.0, self.debounce - (now - self._last_write))
+
+    def pending_patch(self, status: Optional[str] = None, final: bool = False,
+                      now: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        now = time.monotonic() if now is None else now
+        if final:
+            status = "ended"
+        changed_lines, changed_summary, changed_status = self._changes(status)
+        if not (changed_lines or changed_summary or changed_status):
+            return None
+        if not final and now - self._last_write < self.debounce:
+            return None
+
+        self._staged_lines = len(self.lines)
+        patch: Dict[str, Any] = {}
+        if changed_lines or final:
+            patch["transcript"] = self.transcript
+        if changed_summary or final:
+            patch["structured_payload"] = self.summary
+        if status:
+            patch["status"] = status
+        return patch
+
+    def mark_written(self, patch: Dict[str, Any], now: Optional[float] = None) -> None:
+        self._last_write = time.monotonic() if now is None else now
+        if "transcript" in patch:
+            self._written_lines = self._staged_lines
+        if "structured_payload" in patch:
+            self._written_summary = patch["structured_payload"]
+        if "status" in patch:
+            self._written_status = patch["status"]
@@ -0,0 +1,348 @@
+# app/services/dialogue_policy.py
+"""
+Declarative dialogue policy for the Retell LLM websocket (draft_reply).
+
+The check-call conversation is described as data (DEFAULT_POLICY): guard rules
+(emergency / noise / uncooperative), the phase each classified driver status
+maps to, the slots a phase fills and asks for, and every prompt. compile_policy()
+turns that into a DialoguePolicy once - lookup tables, bound extractor functions,
+flattened keyword rules - so step() only does the extraction the current turn
+needs: one lowercased copy shared by the emergency and status rules, plus a
+regex per slot that is still empty.
+
+Agents can override any part through `behavior["dialogue_policy"]` and add
+`emergency_triggers` (see agents_supabase.AgentIn); policy_for() caches the
+compiled result per distinct config.
+"""
+from __future__ import annotations
+import copy
+import json
+import re
+import string
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Tuple
+
+from app.services import extraction
+
+DEFAULT_POLICY: Dict[str, Any] = {
+    "emergency": {
+        "reply": "I’m sorry to hear that. Are you safe? Any injuries? Please share exact location and whether the load is secure. I’m connecting you to a dispatcher now.",
+        "end_call": False,
+    },
+    "noise": {
+        "min_chars": 3,
+        "markers": ["??"],
+        "max_retries": 2,
+        "retry": "I’m getting a lot of noise—could you repeat that clearly once more?",
+        "give_up": "Still too much noise. I’ll escalate to a dispatcher now.",
+    },
+    "uncooperative": {
+        "answers": ["yes", "no", "ok", "k", "fine", "later"],
+        "max_retries": 3,
+        "retry": "Could you share your current location and ETA for this load?",
+        "give_up": "I’ll let you go and follow up later. Drive safe.",
+    },
+    # Slots filled from any utterance while still empty, whatever the phase.
+    "capture": ["current_location", "eta"],
+    "slots": {
+        "current_location": "location",
+        "eta": "eta",
+        "delay_reason": "delay_reason",
+        "unloading_status": "unloading",
+    },
+    # classify_status() result -> phase
+    "states": {"Driving": "in_transit", "Delayed": "in_transit", "Arrived": "at_facility", "Unloading": "at_facility"},
+    "phases": {
+        "in_transit": {
+            "outcome": "In-Transit Update",
+            "fill": [{"slot": "delay_reason", "when": ["Delayed"]}],
+            "ask": [
+                {"slot": "current_location", "prompt": "Thanks. What’s your current location? (highway and nearest city)"},
+                # After max_asks the fallback is recorded and the call is confirmed straight away.
+                {"slot": "eta", "prompt": "Got it. What’s your ETA to destination?", "max_asks": 2, "fallback": "Unknown"},
+                {"slot": "delay_reason", "when": ["Delayed"],
+                 "prompt": "Understood. What’s causing the delay—traffic, weather, or something else?"},
+            ],
+        },
+        "at_facility": {
+            "outcome": "Arrival Confirmation",
+            "fill": [{"slot": "unloading_status"}],
+            "defaults": {"pod_ack": False},
+            "ask": [
+                {"slot": "unloading_status",
+                 "prompt": "Thanks for the arrival update. What’s the unloading status (door number / waiting for lumper / detention)?"},
+                # A reminder rather than a question: said once, then the slot is marked done.
+                {"slot": "pod_ack", "prompt": "Please remember to capture the POD after unload. A acknowledged?", "mark": True},
+            ],
+        },
+    },
+    "confirm": {
+        "template": "Thanks. Logging your status: {driver_status}. Location: {current_location}. ETA: {eta}. Delay reason: {delay_reason}. Unloading: {unloading_status}. I’ll update dispatch now.",
+        "defaults": {"driver_status": "Driving", "current_location": "N/A", "eta": "N/A",
+                     "delay_reason": "None", "unloading_status": "N/A"},
+        "default_outcome": "In-Transit Update",
+    },
+    "greeting": "Hi, this is Dispatch checking on your load. Could you give me a quick status update?",
+    "fallback": "Thanks. Anything else I should record?",
+}
+
+EXTRACTORS: Dict[str, Callable[[str], Optional[str]]] = {
+    "location": extraction.extract_location,
+    "eta": extraction.extract_eta,
+    "delay_reason": extraction.extract_delay_reason,
+    "unloading": extraction.extract_unloading,
+}
+
+Reply = Tuple[str, bool, dict]
+
+
+@dataclass(frozen=True)
+class _Fill:
+    slot: str
+    extract: Callable[[str], Optional[str]]
+    when: Optional[FrozenSet[str]]
+
+
+@dataclass(frozen=True)
+class _Ask:
+    slot: str
+    prompt: str
+    when: Optional[FrozenSet[str]]
+    max_asks: int
+    fallback: Optional[str]
+    mark: bool
+
+
+@dataclass(frozen=True)
+class _Phase:
+    outcome: str
+    fill: Tuple[_Fill, ...]
+    defaults: Tuple[Tuple[str, Any], ...]
+    ask: Tuple[_Ask, ...]
+
+
+def _when(spec: Dict[str, Any]) -> Optional[FrozenSet[str]]:
+    w = spec.get("when")
+    return frozenset(w) if w else None
+
+
+def _merge(base: Dict[str, Any], override: Dict[str, Any]) -> Dict[str, Any]:
+    out = copy.deepcopy(base)
+    for k, v in (override or {}).items():
+        if isinstance(v, dict) and isinstance(out.get(k), dict):
+            out[k] = _merge(out[k], v)
+        else:
+            out[k] = copy.deepcopy(v)
+    return out
+
+
+def _text(value: Any, where: str) -> str:
+    """A prompt or reply from the config; ValueError unless it is a string."""
+    if not isinstance(value, str):
+        raise ValueError(f"{where} must be a string, got {type(value).__name__}")
+    return value
+
+
+def _parse_triggers(triggers: List[str]) -> Tuple[Tuple[str, str], ...]:
+    """'fire' -> ('fire', 'Other'); 'jackknife:Accident' -> ('jackknife', 'Accident')."""
+    out = []
+    for t in triggers or []:
+        kw, _, kind = str(t).partition(":")
+        kw = kw.strip().lower()
+        if kw:
+            out.append((kw, kind.strip() or "Other"))
+    return tuple(out)
+
+
+def _check_template(template: str, defaults: Dict[str, Any]) -> None:
+    """
+    Reject a confirm template that could not be rendered at the end of a call:
+    positional or unknown placeholders (every field must be a `defaults` key)
+    and specs that fail on the default values.
+    """
+    try:
+        for _, field, spec, _ in string.Formatter().parse(template):
+            if field is None:
+                continue
+            name = re.split(r"[.\[]", field, maxsplit=1)[0]
+            if not name or name.isdigit():
+                raise ValueError(f"confirm template uses a positional placeholder {{{field}}}")
+            if name not in defaults:
+                raise ValueError(f"confirm template placeholder {{{field}}} is not in confirm.defaults")
+        template.format(**defaults)
+    except (KeyError, IndexError, AttributeError, TypeError) as e:
+        raise ValueError(f"confirm template cannot be rendered: {e!r}") from e
+
+
+class DialoguePolicy:
+    """A compiled policy; step() is the per-turn entry point (same contract as draft_reply)."""
+
+    def __init__(self, cfg: Dict[str, Any], emergency_triggers: List[str] | None = None):
+        slots = cfg["slots"]
+
+        def extractor(slot: str) -> Callable[[str], Optional[str]]:
+            name = slots.get(slot)
+            if name not in EXTRACTORS:
+                raise ValueError(f"slot {slot!r} has no known extractor ({name!r})")
+            return EXTRACTORS[name]
+
+        self._emergency_reply = _text(cfg["emergency"]["reply"], "emergency.reply")
+        self._emergency_end = bool(cfg["emergency"].get("end_call", False))
+        # Same tables and order as extraction.detect_emergency / classify_status,
+        # flattened so a turn is plain substring checks on one lowercased string.
+        self._emergency_rules = (
+            ("Accident", extraction.RETELL_ACCIDENT),
+            ("Breakdown", extraction.RETELL_BREAKDOWN),
+            ("Medical", extraction.RETELL_MEDICAL),
+        ) + tuple((kind, (kw,)) for kw, kind in _parse_triggers(emergency_triggers or []))
+        self._status_rules = (
+            ("Arrived", extraction.RETELL_ARRIVED),
+            ("Unloading", extraction.RETELL_UNLOADING),
+            ("Delayed", extraction.RETELL_DELAYED),
+        )
+
+        noise = cfg["noise"]
+        self._noise_min = int(noise["min_chars"])
+        self._noise_markers = tuple(noise.get("markers") or ())
+        self._noise = (int(noise["max_retries"]), _text(noise["retry"], "noise.retry"),
+                       _text(noise["give_up"], "noise.give_up"))
+
+        unco = cfg["uncooperative"]
+        self._uncoop_answers = frozenset(_text(a, "uncooperative.answers[]").lower() for a in unco["answers"])
+        self._uncoop = (int(unco["max_retries"]), _text(unco["retry"], "uncooperative.retry"),
+                        _text(unco["give_up"], "uncooperative.give_up"))
+
+        self._capture = tuple((s, extractor(s)) for s in cfg["capture"])
+        self._phase_of: Dict[str, str] = dict(cfg["states"])
+        self._phases: Dict[str, _Phase] = {}
+        for name, p in cfg["phases"].items():
+            self._phases[name] = _Phase(
+                outcome=p.get("outcome") or cfg["confirm"]["default_outcome"],
+                fill=tuple(_Fill(f["slot"], extractor(f["slot"]), _when(f)) for f in p.get("fill") or ()),
+                defaults=tuple((p.get("defaults") or {}).items()),
+                ask=tuple(
+                    _Ask(a["slot"], _text(a["prompt"], f"phases.{name}.ask[].prompt"), _when(a), int(a.get("max_asks") or 0),
+                         a.get("fallback"), bool(a.get("mark")))
+                    for a in p.get("ask") or ()
+                ),
+            )
+        for status, phase in self._phase_of.items():
+            if phase not in self._phases:
+                raise ValueError(f"state {status!r} maps to unknown phase {phase!r}")
+
+        confirm = cfg["confirm"]
+        self._confirm_template = _text(confirm["template"], "confirm.template")
+        self._confirm_defaults = dict(confirm["defaults"])
+        _check_template(self._confirm_template, self._confirm_defaults)
+        self._default_outcome = confirm["default_outcome"]
+        self._greeting = _text(cfg["greeting"], "greeting")
+        self._fallback = _text(cfg["fallback"], "fallback")
+
+    # -- per turn ----------------------------------------------------------
+
+    @staticmethod
+    def _first_rule(rules, t: str) -> Optional[str]:
+        for kind, keywords in rules:
+            for k in keywords:
+                if k in t:
+                    return kind
+        return None
+
+    def _confirm(self, state: dict) -> Reply:
+        values = {k: state.get(k) or d for k, d in self._confirm_defaults.items()}
+        phase = self._phases.get(self._phase_of.get(values.get("driver_status"), ""))
+        state["call_outcome"] = phase.outcome if phase else self._default_outcome
+        return self._confirm_template.format(**values), True, state
+
+    def step(self, text: str, state: dict) -> Reply:
+        t = (text or "").lower()
+
+        emerg = self._first_rule(self._emergency_rules, t)
+        if emerg:
+            state.update({"scenario": "Emergency", "emergency_type": emerg})
+            return self._emergency_reply, self._emergency_end, state
+
+        stripped = (text or "").strip()
+        if len(stripped) < self._noise_min or any(m in (text or "") for m in self._noise_markers):
+            limit, retry, give_up = self._noise
+            n = int(state.get("noisy_count", 0)) + 1
+            state["noisy_count"] = n
+            return (give_up, True, state) if n >= limit else (retry, False, state)
+
+        if stripped.lower() in self._uncoop_answers:
+            limit, retry, give_up = self._uncoop
+            s = int(state.get("short_count", 0)) + 1
+            state["short_count"] = s
+            return (give_up, True, state) if s >= limit else (retry, False, state)
+
+        status = self._first_rule(self._status_rules, t) or "Driving"
+        if status and status != state.get("driver_status"):
+            state["driver_status"] = status
+
+        for slot, extract in self._capture:
+            if slot not in state:
+                v = extract(text)
+                if v: state[slot] = v
+
+        phase = self._phases.get(self._phase_of.get(status, ""))
+        if phase is None:
+            if not state.get("opened"):
+                state["opened"] = True
+                return self._greeting, False, state
+            return self._fallback, False, state
+
+        for fill in phase.fill:
+            if fill.slot not in state and (fill.when is None or status in fill.when):
+                v = fill.extract(text)
+                if v: state[fill.slot] = v
+        for k, v in phase.defaults:
+            if k not in state:
+                state[k] = v
+
+        for ask in phase.ask:
+            if ask.when is not None and status not in ask.when:
+                continue
+            if state.get(ask.slot):
+                continue
+            if ask.mark:
+                state[ask.slot] = True
+                return ask.prompt, False, state
+            if ask.max_asks:
+                key = f"{ask.slot}_ask_count"
+                count = int(state.get(key, 0)) + 1
+                state[key] = count
+                if count >= ask.max_asks:
+                    state[ask.slot] = ask.fallback
+                    return self._confirm(state)
+            return ask.prompt, False, state
+
+        return self._confirm(state)
+
+
+def compile_policy(overrides: Dict[str, Any] | None = None,
+                   emergency_triggers: List[str] | None = None) -> DialoguePolicy:
+    """ValueError for a config that does not compile, including a wrong shape (a string where a dict goes)."""
+    try:
+        return DialoguePolicy(_merge(DEFAULT_POLICY, overrides or {}), emergency_triggers)
+    except (KeyError, IndexError, AttributeError, TypeError) as e:
+        raise ValueError(f"malformed dialogue policy: {e!r}") from e
+
+
+@lru_cache(maxsize=256)
+def _compiled(key: str) -> DialoguePolicy:
+    overrides, triggers = json.loads(key)
+    return compile_policy(overrides, triggers)
+
+
+DEFAULT = compile_policy()
+
+
+def policy_for(behavior: Dict[str, Any] | None = None, emergency_triggers: List[str] | None = None) -> DialoguePolicy:
+    """Compiled policy for an agent row; identical configs share one compiled instance."""
+    if behavior is not None and not isinstance(behavior, dict):
+        raise ValueError("behavior must be an object")
+    overrides = (behavior or {}).get("dialogue_policy") or {}
+    if not overrides and not emergency_triggers:
+        return DEFAULT
+    return _compiled(json.dumps([overrides, list(emergency_triggers or [])], sort_keys=True))
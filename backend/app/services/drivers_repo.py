@@ -1,92 +1,165 @@
 # app/services/drivers_repo.py
 from __future__ import annotations
+import re
+from typing import Dict, Iterable, Tuple
+from app.core.config import settings
+from app.services import schema
+from app.services.cache import AsyncTTLCache
+from app.services.calllog_repo import _no_unique_index
 from app.services.supabase import SupabaseClient
 
+_PHONE_NOISE = re.compile(r"[\s\-().]")
+
 class DriversRepo:
-    _cached_path: str | None = None
+    cache = AsyncTTLCache("drivers", maxsize=settings.repo_cache_maxsize, ttl=settings.repo_cache_ttl)
+    # Set once the phone_number upsert hits 42P10 (migrations/008 not applied yet);
+    # drivers with a phone then take the select-then-insert path until restart.
+    no_phone_conflict_target = False
 
     @classmethod
-    async def _path(cls) -> str:
-        """Detect plural/singular path once."""
-        if cls._cached_path:
-            return cls._cached_path
-
-        async with SupabaseClient().client() as c:
-            r = await c.get("/drivers", params={"select": "id", "limit": "1"})
-            if r.status_code == 404:
-                r = await c.get("/driver", params={"select": "id", "limit": "1"})
-                if r.status_code == 404:
-                    raise RuntimeError("Neither table 'driver' nor 'drivers' exists.")
-                cls._cached_path = "/driver"
-            else:
-                cls._cached_path = "/drivers"
-        return cls._cached_path
+    def cache_key(cls, name: str | None, phone: str | None) -> tuple[str, str]:
+        """Phone wins (it is matched first); otherwise the name. Both as _clean() leaves them."""
+        name, phone = cls._clean(name, phone)
+        if phone:
+            return ("phone", phone)
+        return ("name", name or "")
 
-    @staticmethod
-    async def _select_id_by(c, path: str, **eq_filters) -> int | None:
-        params = {"select": "id", "limit": "1"}
-        for k, v in eq_filters.items():
-            if v is not None:
-                params[k] = f"eq.{v}"
-        r = await c.get(path, params=params)
-        if r.status_code >= 400:
-            return None
-        rows = r.json()
-        if rows:
-            try:
-                return int(rows[0]["id"])
-            except Exception:
-                return None
-        return None
+    @classmethod
+    def invalidate(cls, name: str | None = None, phone: str | None = None) -> None:
+        """Drop one driver's cached id, or everything when called without arguments."""
+        if name is None and phone is None:
+            cls.cache.invalidate()
+        else:
+            cls.cache.invalidate(cls.cache_key(name, phone))
 
     @classmethod
     async def ensure_driver_id(cls, name: str | None, phone: str | None) -> int:
         """
-        Return an existing driver's id or create one.
-        Match priority: phone_number (if provided) -> name -> insert.
-        Always ensure a non-empty `name` on insert to satisfy NOT NULL constraints.
+        Return an existing driver's id or create one (ensure_many() for a single driver).
+        Results are cached; concurrent calls for the same driver share one lookup/insert.
         """
-        path = await cls._path()
-        phone = (phone or "").strip() or None
-        name = (name or "").strip() or None
+        key = cls.cache_key(name, phone)
+        return await cls.cache.get_or_load(key, lambda: cls._load_driver_id(key, name, phone))
 
-      
-        async with SupabaseClient().client() as c:
-            if phone:
-                found = await cls._select_id_by(c, path, phone_number=phone)
-                if found is not None:
-                    return found
+    @classmethod
+    async def _load_driver_id(cls, key: Tuple[str, str], name: str | None, phone: str | None) -> int:
+        return (await cls._resolve({key: cls._clean(name, phone)}))[key]
 
-            
-            if name:
-                found = await cls._select_id_by(c, path, name=name)
-                if found is not None:
-                    return found
+    @staticmethod
+    def _clean(name: str | None, phone: str | None) -> Tuple[str | None, str | None]:
+        """
+        The (name, phone) that is both cached and queried/stored: whitespace-collapsed
+        name, phone without spaces, dashes, dots or parentheses. Formats of one number
+        thus share a cache entry and a driver row.
+        """
+        return " ".join((name or "").split()) or None, _PHONE_NOISE.sub("", phone or "") or None
 
-           
-            body = {"name": name or "Unknown"}
-            if phone:
-                body["phone_number"] = phone
+    @classmethod
+    async def ensure_many(cls, drivers: Iterable[Tuple[str | None, str | None]]) -> Dict[Tuple[str, str], int]:
+        """
+        Bulk ensure_driver_id for (name, phone) pairs; returns {cache_key(): id}.
+        Cache hits are served locally and the misses resolved together (see _resolve).
+        """
+        out: Dict[Tuple[str, str], int] = {}
+        todo: Dict[Tuple[str, str], Tuple[str | None, str | None]] = {}
+        for name, phone in drivers:
+            key = cls.cache_key(name, phone)
+            if key in out or key in todo:
+                continue
+            hit = cls.cache.get(key)
+            if hit is not None:
+                out[key] = hit
+            else:
+                todo[key] = cls._clean(name, phone)
+        if todo:
+            resolved = await cls._resolve(todo)
+            for key, driver_id in resolved.items():
+                cls.cache.set(key, driver_id)
+            out.update(resolved)
+        return out
 
-           
-            r = await c.post(path, json=body)
-            if r.status_code >= 400:
-                text = r.text
-               
-                if "42703" in text or "column" in text and "phone_number" in text and "does not exist" in text:
-                    r = await c.post(path, json={"name": body["name"]})
-               
-                if r.status_code >= 400 and ("23502" in text or "null value in column \"name\"" in text):
-                    r = await c.post(path, json={"name": "Unknown"})
+    @classmethod
+    async def _resolve(cls, todo: Dict[Tuple[str, str], Tuple[str | None, str | None]]) -> Dict[Tuple[str, str], int]:
+        """
+        Drivers with a phone are inserted on the unique phone_number (migrations/008)
+        with one POST ?on_conflict=phone_number and resolution=ignore-duplicates: new
+        rows come back with their ids, and the ids of drivers that already existed
+        are read back with one in.(...) select. An existing driver keeps their stored
+        name (a new one without a name is "Unknown"). Name-only drivers are matched
+        by name, then bulk inserted; that is also the path for everyone when the
+        table has no phone_number. Without the unique index, drivers with a phone
+        are matched by phone, then by name, and the rest inserted (the pre-008
+        behaviour).
+        """
+        sch = await schema.current()
+        path = sch.driver_path
+        if not sch.driver_phone_number:
+            todo = {k: (name, None) for k, (name, _) in todo.items()}
+        out: Dict[Tuple[str, str], int] = {}
+        phoned = {k: v for k, v in todo.items() if v[1]}
+        no_phone = {k: v for k, v in todo.items() if not v[1]}
 
-                
-                if r.status_code >= 400:
-                    alt_path = "/driver" if path == "/driver" else "/drivers"
-                    r = await c.post(alt_path, json={"name": body.get("name", "Unknown")})
+        async with SupabaseClient().client() as c:
+            if phoned and not cls.no_phone_conflict_target:
+                by_phone = await cls._insert_by_phone(c, path, phoned)
+                if not cls.no_phone_conflict_target:
+                    missing = {p for _, p in phoned.values() if p not in by_phone}
+                    by_phone.update(await cls._select_ids_in(c, path, "phone_number", missing))
+                out.update((k, by_phone[p]) for k, (_, p) in phoned.items() if p in by_phone)
+            if cls.no_phone_conflict_target:
+                phoned = {k: v for k, v in phoned.items() if k not in out}
+                by_phone = await cls._select_ids_in(c, path, "phone_number", {p for _, p in phoned.values()})
+                out.update((k, by_phone[p]) for k, (_, p) in phoned.items() if p in by_phone)
+                no_phone.update((k, v) for k, v in phoned.items() if k not in out)
 
-                if r.status_code >= 400:
-                    raise RuntimeError(f"{path} insert failed: {r.status_code} {r.text}")
+            if no_phone:
+                by_name = await cls._select_ids_in(c, path, "name", {n for n, _ in no_phone.values() if n})
+                out.update((k, by_name[n]) for k, (n, _) in no_phone.items() if n in by_name)
+                keys = [k for k in no_phone if k not in out]
+                if keys:
+                    body = [{"name": no_phone[k][0] or "Unknown"} for k in keys]
+                    if sch.driver_phone_number:
+                        for row, k in zip(body, keys):
+                            row["phone_number"] = no_phone[k][1]
+                    r = await c.post(path, json=body, headers={"Prefer": "return=representation"})
+                    if r.status_code >= 400:
+                        raise RuntimeError(f"{path} insert failed: {r.status_code} {r.text}")
+                    for key, row in zip(keys, r.json()):
+                        out[key] = int(row["id"])
 
-            rows = r.json()
-            return int(rows[0]["id"])
-        
+        lost = [k for k in todo if k not in out]
+        if lost:
+            raise RuntimeError(f"{path} returned no id for {len(lost)} driver(s)")
+        return out
+
+    @classmethod
+    async def _insert_by_phone(cls, c, path: str,
+                               drivers: Dict[Tuple[str, str], Tuple[str | None, str | None]]) -> Dict[str, int]:
+        """{phone_number: id} for the newly inserted rows; empty (and the flag set) without the unique index."""
+        body = [{"name": name or "Unknown", "phone_number": phone} for name, phone in drivers.values()]
+        r = await c.post(
+            path,
+            params={"on_conflict": "phone_number"},
+            json=body,
+            headers={"Prefer": "resolution=ignore-duplicates,return=representation"},
+        )
+        if _no_unique_index(r):
+            cls.no_phone_conflict_target = True
+            return {}
+        if r.status_code >= 400:
+            raise RuntimeError(f"{path} insert failed: {r.status_code} {r.text}")
+        return {row["phone_number"]: int(row["id"]) for row in r.json() or []}
+
+    @staticmethod
+    async def _select_ids_in(c, path: str, column: str, values: set, chunk: int = 200) -> Dict[str, int]:
+        """{value: id} for rows whose `column` is in `values` (lowest id wins)."""
+        found: Dict[str, int] = {}
+        vals = sorted(values)
+        for i in range(0, len(vals), chunk):
+            quoted = ",".join('"' + v.replace('"', '\\"') + '"' for v in vals[i:i + chunk])
+            r = await c.get(path, params={"select": f"id,{column}", column: f"in.({quoted})", "order": "id.asc"})
+            if r.status_code >= 400:
+                continue
+            for row in r.json() or []:
+                found.setdefault(row.get(column), int(row["id"]))
+        return found
@@ -0,0 +1,220 @@
+# app/services/extraction.py
+"""
+Shared transcript feature extraction.
+
+Every keyword and value pattern used by summarize_transcript and the Retell
+classifiers is declared once here. A Features object lowercases the text once
+and memoizes each keyword / pattern lookup, so a transcript is scanned at most
+once per feature no matter how many classifiers ask for it.
+
+Patterns run case-sensitively against the already-lowercased text instead of
+with re.I: sre can then use its literal/charset prefix scan, which is what
+makes the long-transcript path fast.
+"""
+from __future__ import annotations
+import re
+from typing import Callable, Dict, Optional
+
+# ---- keyword tables (substring semantics, same as the original `in` checks) ----
+
+EMERGENCY_ANY = ("accident", "crash", "collision", "blowout", "breakdown", "medical")
+EMERGENCY_ACCIDENT = ("accident", "crash")
+EMERGENCY_BREAKDOWN = ("blowout", "breakdown")
+SAFE = ("i'm safe", "i am safe")
+UNLOADING = ("unloading", "lumper", "detention")
+ARRIVED = ("arrived", "checked in", "in door")
+DELAYED = ("delay", "late")
+POD_ACK = ("ok", "will do")
+
+# _retell_common classifiers (per-utterance)
+RETELL_ARRIVED = ("arrived", "checked in", "docked", "at dock", "in door")
+RETELL_UNLOADING = ("unloading", "lumper", "detention", "in door")
+RETELL_DELAYED = ("delay", "late", "behind", "traffic", "weather", "stuck")
+RETELL_ACCIDENT = ("accident", "crash", "collision")
+RETELL_BREAKDOWN = ("blowout", "breakdown", "flat", "engine")
+RETELL_MEDICAL = ("medical", "injur", "bleeding", "faint")
+
+KEYWORDS = tuple(dict.fromkeys(
+    EMERGENCY_ANY + SAFE + ("no injur", "load secure", "load not secure", "pod")
+    + UNLOADING + ARRIVED + DELAYED + POD_ACK
+    + RETELL_ARRIVED + RETELL_UNLOADING + RETELL_DELAYED
+    + RETELL_ACCIDENT + RETELL_BREAKDOWN + RETELL_MEDICAL
+))
+
+# ---- value patterns (compiled once; text is lowercased before matching) ----
+
+_ROAD_RE = re.compile(r"i-\d+|us-\d+|hwy\s*\d+")
+_EMERGENCY_ROAD_RE = re.compile(r"i-\d+|us-\d+|mile\s*marker\s*\d+")
+# "<word>, <st>" – located from the comma, which is far rarer than letters.
+_CITY_STATE_TAIL_RE = re.compile(r",\s*[a-z]{2}")
+_ETA_RE = re.compile(r"\d{1,2}:\d{2}\s*(?:am|pm)?|\d+\s*(?:min|mins|minutes|hr|hrs|hours)")
+_DELAY_REASON_RE = re.compile(r"traffic|weather|construction|breakdown|accident|police|detour")
+_UNLOADING_RE = re.compile(r"door\s*\d+|in\s*door|waiting\s*for\s*lumper|detention|unloading")
+
+_LETTERS = frozenset("abcdefghijklmnopqrstuvwxyz")
+
+
+def _first_location(t: str, road_re: re.Pattern) -> Optional[str]:
+    """
+    Leftmost match of `road | [a-z]+,\\s*[a-z]{2}`. The city alternative is
+    resolved from each ", xx" tail back to the start of its letter run, which is
+    where a left-to-right regex scan would have started the match.
+    """
+    road = road_re.search(t)
+    limit = road.start() if road else len(t)
+    for m in _CITY_STATE_TAIL_RE.finditer(t):
+        comma = m.start()
+        if comma > limit:
+            break
+        start = comma
+        while start > 0 and t[start - 1] in _LETTERS:
+            start -= 1
+        if comma - start >= 2:
+            return t[start:m.end()]
+    return road.group(0) if road else None
+
+
+def _search(pattern: re.Pattern) -> Callable[[str], Optional[str]]:
+    def run(t: str) -> Optional[str]:
+        m = pattern.search(t)
+        return m.group(0) if m else None
+    return run
+
+
+VALUE_FINDERS: Dict[str, Callable[[str], Optional[str]]] = {
+    "current_location": lambda t: _first_location(t, _ROAD_RE),
+    "emergency_location": lambda t: _first_location(t, _EMERGENCY_ROAD_RE),
+    "eta": _search(_ETA_RE),
+    "delay_reason": _search(_DELAY_REASON_RE),
+    "unloading_status": _search(_UNLOADING_RE),
+}
+
+
+class Features:
+    """
+    Keyword hits and first pattern matches for one piece of transcript text.
+
+    Lookups are lazy and memoized. resolve() computes everything so the text can
+    be dropped, and merge() folds a later chunk in (keyword hits OR together,
+    first matches keep the earliest), which is what incremental callers use.
+    """
+
+    __slots__ = ("_low", "_hits", "_values")
+
+    def __init__(self, text: str = ""):
+        self._low: Optional[str] = (text or "").lower()
+        self._hits: Dict[str, bool] = {}
+        self._values: Dict[str, Optional[str]] = {}
+
+    def hit(self, keyword: str) -> bool:
+        found = self._hits.get(keyword)
+        if found is None:
+            found = self._hits[keyword] = keyword in (self._low or "")
+        return found
+
+    def has(self, *keywords: str) -> bool:
+        return any(self.hit(k) for k in keywords)
+
+    def first(self, name: str) -> Optional[str]:
+        if name not in self._values:
+            self._values[name] = VALUE_FINDERS[name](self._low or "")
+        return self._values[name]
+
+    def resolve(self) -> "Features":
+        for k in KEYWORDS:
+            self.hit(k)
+        for name in VALUE_FINDERS:
+            self.first(name)
+        self._low = None
+        return self
+
+    def merge(self, later: "Features") -> "Features":
+        self.resolve()
+        later.resolve()
+        for k, v in later._hits.items():
+            if v:
+                self._hits[k] = True
+        for name, v in later._values.items():
+            if self._values.get(name) is None and v is not None:
+                self._values[name] = v
+        return self
+
+
+# ---- per-utterance slot extractors (LLM websocket dialogue) ----
+# These run on the raw utterance: CITY_HWY_RE is case-sensitive on purpose
+# ("Dallas, TX"), the others use re.I.
+
+TIME_RE = re.compile(r"\b(?:at\s*)?(\d{1,2}:\d{2}\s*(?:am|pm)?)\b|\b(?:in\s*)?(\d+)\s*(?:min|mins|minutes|hr|hrs|hours)\b", re.I)
+CITY_HWY_RE = re.compile(r"\b(?:i-\d{1,3}|us-\d{1,3}|hwy\s*\d+|highway\s*\d+|[A-Z][a-z]+(?:,\s*[A-Z]{2})?)\b")
+REASON_RE = re.compile(r"\b(traffic|weather|accident|construction|breakdown|tire|blowout|police|road\s*closure|detour)\b", re.I)
+UNLOAD_RE = re.compile(r"\b(door\s*\d+|in\s*door|waiting\s*for\s*lumper|lumper|detention|unloading|checked\s*in)\b", re.I)
+
+
+def extract_eta(text: str) -> Optional[str]:
+    m = TIME_RE.search(text or "")
+    return m.group(0) if m else None
+
+
+def extract_location(text: str) -> Optional[str]:
+    m = CITY_HWY_RE.search(text or "")
+    return m.group(0) if m else None
+
+
+def extract_delay_reason(text: str) -> Optional[str]:
+    m = REASON_RE.search(text or "")
+    return m.group(1).title() if m else None
+
+
+def extract_unloading(text: str) -> Optional[str]:
+    m = UNLOAD_RE.search(text or "")
+    if not m: return None
+    val = m.group(0).strip().title()
+    return "In Door" if val.lower().startswith("in door") else val
+
+
+def _title(s: Optional[str]) -> Optional[str]:
+    return s.title() if s else None
+
+
+def summarize(f: Features) -> dict:
+    """structured_payload for a call (see postprocess.summarize_transcript)."""
+    if f.has(*EMERGENCY_ANY):
+        return {
+            "call_outcome": "Emergency Escalation",
+            "emergency_type": ("Accident" if f.has(*EMERGENCY_ACCIDENT) else
+                               "Breakdown" if f.has(*EMERGENCY_BREAKDOWN) else
+                               "Medical" if f.hit("medical") else "Other"),
+            "safety_status": "Driver confirmed safe" if f.has(*SAFE) else "Unknown",
+            "injury_status": "No injuries reported" if f.hit("no injur") else "Unknown",
+            "emergency_location": f.first("emergency_location"),
+            "load_secure": "true" if f.hit("load secure") else "false" if f.hit("load not secure") else "unknown",
+            "escalation_status": "Connected to Human Dispatcher",
+        }
+
+    status = ("Unloading" if f.has(*UNLOADING) else
+              "Arrived" if f.has(*ARRIVED) else
+              "Delayed" if f.has(*DELAYED) else "Driving")
+
+    return {
+        "call_outcome": "Arrival Confirmation" if status in ("Arrived", "Unloading") else "In-Transit Update",
+        "driver_status": status,
+        "current_location": f.first("current_location"),
+        "eta": f.first("eta"),
+        "delay_reason": _title(f.first("delay_reason")) or "None",
+        "unloading_status": _title(f.first("unloading_status")) or "N/A",
+        "pod_reminder_acknowledged": "true" if f.hit("pod") and f.has(*POD_ACK) else "false",
+    }
+
+
+def classify_status(f: Features) -> str:
+    if f.has(*RETELL_ARRIVED):   return "Arrived"
+    if f.has(*RETELL_UNLOADING): return "Unloading"
+    if f.has(*RETELL_DELAYED):   return "Delayed"
+    return "Driving"
+
+
+def detect_emergency(f: Features) -> Optional[str]:
+    if f.has(*RETELL_ACCIDENT):  return "Accident"
+    if f.has(*RETELL_BREAKDOWN): return "Breakdown"
+    if f.has(*RETELL_MEDICAL):   return "Medical"
+    return None
@@ -0,0 +1,449 @@
+# app/services/fake_postgrest.py
+"""
+In-process PostgREST stand-in for offline benchmarks and tests.
+
+FakePostgrestTransport is an httpx.AsyncBaseTransport, so SupabaseClient (and
+every repo on top of it) runs unchanged against an in-memory FakeStore when
+SUPABASE_BACKEND=fake. It implements the slice of PostgREST this backend uses:
+
+  * filters: eq/neq/gt/gte/lt/lte/like/ilike/in/is, `not.` negation, `or=(...)`
+    with nested and(...), `col->>key` JSON paths and `embed.col` filters;
+  * select lists with `*` and embedded parents (`driver:driver_id(name)`,
+    `driver!inner(name)`), order (asc/desc, nullsfirst/last), limit, offset;
+  * Prefer: count=exact|planned|estimated (Content-Range), return=representation,
+    resolution=merge-duplicates|ignore-duplicates with ?on_conflict=;
+  * GET / answers a minimal OpenAPI document (definitions -> column names) for
+    app/services/schema.py;
+  * RPCs: exec_sql (recorded, not executed), the calllog extra RPCs from
+    migrations/003 and calllog_transcript_append (migrations/009). Anything else answers 404 like a missing function, so
+    callers take their fallback paths.
+
+Rows live in plain dicts; `id` and `created_at` are filled on insert. Latency
+(FAKE_POSTGREST_LATENCY_MS, optional jitter) is added per request.
+"""
+from __future__ import annotations
+import asyncio
+import datetime as dt
+import json
+import operator
+import random
+import re
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qsl
+
+import httpx
+
+DEFAULT_TABLES = ("agent", "driver", "calllog", "calllog_rollup")
+
+# Columns reported by the OpenAPI root; keys seen in inserted rows are added.
+DEFAULT_COLUMNS: Dict[str, Tuple[str, ...]] = {
+    "agent": ("id", "name", "language", "voice_type", "active", "created_at"),
+    "driver": ("id", "name", "phone_number", "created_at"),
+    "calllog": ("id", "created_at", "provider_call_id", "retell_call_id", "load_number", "status", "scenario",
+                "agent_id", "driver_id", "transcript", "structured_payload", "extra", "call_outcome",
+                "call_end_time", "conflicts", "transcript_seq"),
+    "calllog_rollup": ("bucket", "bucket_start", "vendor", "calls"),
+}
+
+Row = Dict[str, Any]
+
+
+class FakeStore:
+    """Tables of rows plus the RPC registry."""
+
+    def __init__(self, tables: Iterable[str] = DEFAULT_TABLES):
+        self.tables: Dict[str, List[Row]] = {t: [] for t in tables}
+        self.columns: Dict[str, set] = {t: set(DEFAULT_COLUMNS.get(t, ("id",))) for t in self.tables}
+        self._ids: Dict[str, int] = {t: 0 for t in self.tables}
+        self.rpcs: Dict[str, Callable[["FakeStore", Dict[str, Any]], Any]] = dict(RPCS)
+        self.executed_sql: List[str] = []
+        self.requests = 0
+
+    def reset(self) -> None:
+        for t in self.tables:
+            self.tables[t] = []
+            self._ids[t] = 0
+        self.executed_sql.clear()
+        self.requests = 0
+
+    def insert(self, table: str, rows: Iterable[Row]) -> List[Row]:
+        """Append rows directly (seeding); fills id/created_at like the real defaults."""
+        out = []
+        data = self.tables.setdefault(table, [])
+        cols = self.columns.setdefault(table, {"id"})
+        self._ids.setdefault(table, 0)
+        for row in rows:
+            row = dict(row)
+            if row.get("id") is None:
+                self._ids[table] += 1
+                row["id"] = self._ids[table]
+            elif isinstance(row["id"], int):
+                self._ids[table] = max(self._ids[table], row["id"])
+            row.setdefault("created_at", dt.datetime.now(dt.timezone.utc).isoformat())
+            cols.update(row)
+            data.append(row)
+            out.append(row)
+        return out
+
+
+# ---- RPCs --------------------------------------------------------------------
+
+def _rpc_exec_sql(store: FakeStore, args: Dict[str, Any]) -> None:
+    store.executed_sql.append(str(args.get("sql") or args.get("query") or ""))
+    return None
+
+
+def _apply_extra_item(store: FakeStore, item: Dict[str, Any]) -> bool:
+    hit = False
+    for row in store.tables.get("calllog", []):
+        if row.get("provider_call_id") != item.get("pid"):
+            continue
+        hit = True
+        extra = dict(row.get("extra") or {})
+        for k, delta in (item.get("incr") or {}).items():
+            extra[k] = (extra.get(k) or 0) + delta
+        if item.get("keywords"):
+            extra["keywords"] = list(extra.get("keywords") or []) + list(item["keywords"])
+        extra.update(item.get("set") or {})
+        row["extra"] = extra
+    return hit
+
+
+def _rpc_transcript_append(store: FakeStore, args: Dict[str, Any]) -> Optional[int]:
+    row = next((r for r in store.tables.get("calllog", []) if r.get("provider_call_id") == args.get("p_pid")), None)
+    if row is None:
+        return None
+    cur, seq, lines = row.get("transcript_seq") or 0, int(args.get("p_seq") or 0), list(args.get("p_lines") or [])
+    if seq > cur or seq + len(lines) <= cur:
+        return cur
+    fresh = lines[cur - seq:]
+    row["transcript"] = "\n".join(([row["transcript"]] if row.get("transcript") else []) + fresh)
+    row["transcript_seq"] = cur + len(fresh)
+    if args.get("p_summary") is not None:
+        row["structured_payload"] = args["p_summary"]
+    return row["transcript_seq"]
+
+
+RPCS: Dict[str, Callable[[FakeStore, Dict[str, Any]], Any]] = {
+    "exec_sql": _rpc_exec_sql,
+    "calllog_apply_extra": lambda s, a: sum(_apply_extra_item(s, i) for i in a.get("p_items") or []),
+    "calllog_incr_extra": lambda s, a: _apply_extra_item(s, {"pid": a.get("pid"), "incr": {a.get("field"): a.get("delta", 1)}}) and None,
+    "calllog_append_keywords": lambda s, a: _apply_extra_item(s, {"pid": a.get("pid"), "keywords": a.get("keywords") or []}) and None,
+    "calllog_transcript_append": _rpc_transcript_append,
+}
+
+
+# ---- query parsing -------------------------------------------------------------
+
+def _split_top(s: str, sep: str = ",") -> List[str]:
+    """Split on `sep` outside parentheses and double quotes."""
+    out, depth, quoted, cur = [], 0, False, []
+    for ch in s:
+        if ch == '"':
+            quoted = not quoted
+        elif not quoted and ch == "(":
+            depth += 1
+        elif not quoted and ch == ")":
+            depth -= 1
+        if ch == sep and depth == 0 and not quoted:
+            out.append("".join(cur))
+            cur = []
+        else:
+            cur.append(ch)
+    if cur:
+        out.append("".join(cur))
+    return [p.strip() for p in out if p.strip()]
+
+
+def _unquote(v: str) -> str:
+    return v[1:-1] if len(v) >= 2 and v[0] == v[-1] == '"' else v
+
+
+def _coerce(value: Any, raw: str) -> Any:
+    if isinstance(value, bool):
+        return raw.lower() == "true"
+    if isinstance(value, (int, float)):
+        try:
+            return type(value)(raw) if isinstance(value, int) and raw.lstrip("-").isdigit() else float(raw)
+        except ValueError:
+            return raw
+    return raw
+
+
+def _like(pattern: str, flags: int = 0) -> re.Pattern:
+    return re.compile("^" + ".*".join(re.escape(p) for p in pattern.replace("%", "*").split("*")) + "$", flags | re.S)
+
+
+def _get(row: Row, col: str) -> Any:
+    """`col`, `col->>key`, `col->key`, or `embed.col` (after embedding)."""
+    if "->" in col:
+        base, *path = re.split(r"->>?", col)
+        v: Any = row.get(base)
+        for key in path:
+            v = v.get(key) if isinstance(v, dict) else None
+        if "->>" in col and v is not None and not isinstance(v, str):
+            v = json.dumps(v) if isinstance(v, (dict, list)) else str(v)
+        return v
+    if "." in col:
+        embed, sub = col.split(".", 1)
+        v = row.get(embed)
+        return v.get(sub) if isinstance(v, dict) else None
+    return row.get(col)
+
+
+_OPS = {"eq": operator.eq, "neq": operator.ne, "gt": operator.gt,
+        "gte": operator.ge, "lt": operator.lt, "lte": operator.le}
+
+
+def _cmp(value: Any, op: str, raw: str) -> bool:
+    if op == "is":
+        want = {"null": None, "true": True, "false": False}.get(raw.lower(), raw)
+        return value is want if want is None or isinstance(want, bool) else value == want
+    if op == "in":
+        items = [_unquote(x) for x in _split_top(raw.strip("()"))]
+        return value is not None and value in [_coerce(value, x) for x in items]
+    if value is None:
+        return False
+    if op == "like":
+        return bool(_like(raw).match(str(value)))
+    if op == "ilike":
+        return bool(_like(raw, re.I).match(str(value)))
+    try:
+        return _OPS[op](value, _coerce(value, _unquote(raw)))
+    except TypeError:
+        return False
+
+
+Predicate = Callable[[Row], bool]
+
+
+def _condition(col: str, expr: str) -> Predicate:
+    negate = expr.startswith("not.")
+    if negate:
+        expr = expr[4:]
+    op, _, raw = expr.partition(".")
+    if op not in ("eq", "neq", "gt", "gte", "lt", "lte", "like", "ilike", "in", "is"):
+        raise ValueError(f"unsupported operator {op!r}")
+    return lambda row: _cmp(_get(row, col), op, raw) != negate
+
+
+def _logic(kind: str, body: str) -> Predicate:
+    """`or=(a.eq.1,and(b.gt.2,c.lt.3))` -> predicate."""
+    parts = []
+    for term in _split_top(body.strip()[1:-1]):
+        m = re.match(r"^(not\.)?(and|or)(\(.*\))$", term, re.S)
+        if m:
+            inner = _logic(m.group(2), m.group(3))
+            parts.append((lambda p: lambda row: not p(row))(inner) if m.group(1) else inner)
+        else:
+            col, _, expr = term.partition(".")
+            parts.append(_condition(col, expr))
+    combine = any if kind == "or" else all
+    return lambda row: combine(p(row) for p in parts)
+
+
+class _Embed:
+    def __init__(self, spec: str):
+        m = re.match(r"^(?:(\w+):)?(\w+)(!inner)?\((.*)\)$", spec, re.S)
+        if not m:
+            raise ValueError(f"bad embed {spec!r}")
+        alias, name, inner, cols = m.groups()
+        if name.endswith("_id"):
+            self.fk, self.table = name, alias or name[:-3]
+        else:
+            self.fk, self.table = f"{name}_id", name
+        self.alias = alias or name
+        self.inner = bool(inner)
+        self.cols = _split_top(cols) or ["*"]
+
+
+def _parse_select(select: Optional[str]) -> Tuple[List[str], List[_Embed]]:
+    cols, embeds = [], []
+    for part in _split_top(select or "*"):
+        if "(" in part:
+            embeds.append(_Embed(part))
+        else:
+            cols.append(part)
+    return cols, embeds
+
+
+def _project(row: Row, cols: List[str]) -> Row:
+    if "*" in cols:
+        return dict(row)
+    out = {}
+    for c in cols:
+        alias, _, src = c.partition(":") if ":" in c and "::" not in c else ("", "", c)
+        out[alias or src] = _get(row, src)
+    return out
+
+
+def _sort(rows: List[Row], order: str) -> List[Row]:
+    for term in reversed(_split_top(order)):
+        col, *mods = term.split(".")
+        desc = "desc" in mods
+        nulls_first = "nullsfirst" in mods or (desc and "nullslast" not in mods)
+        present = [r for r in rows if _get(r, col) is not None]
+        missing = [r for r in rows if _get(r, col) is None]
+        present.sort(key=lambda r: _get(r, col), reverse=desc)
+        rows = missing + present if nulls_first else present + missing
+    return rows
+
+
+def _prefer(request: httpx.Request) -> Dict[str, str]:
+    out = {}
+    for part in (request.headers.get("prefer") or "").split(","):
+        k, _, v = part.strip().partition("=")
+        if k:
+            out[k] = v
+    return out
+
+
+# ---- transport -------------------------------------------------------------------
+
+class FakePostgrestTransport(httpx.AsyncBaseTransport):
+    def __init__(self, store: FakeStore, latency: float = 0.0, jitter: float = 0.0, prefix: str = "/rest/v1"):
+        self.store = store
+        self.latency = latency
+        self.jitter = jitter
+        self.prefix = prefix
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.store.requests += 1
+        if self.latency or self.jitter:
+            await asyncio.sleep(max(0.0, self.latency + random.uniform(-self.jitter, self.jitter)))
+        await request.aread()
+        path = request.url.path
+        if path.startswith(self.prefix):
+            path = path[len(self.prefix):]
+        try:
+            return self._dispatch(request, path.strip("/"))
+        except ValueError as e:
+            return _json(400, {"code": "PGRST100", "message": str(e)})
+
+    def _dispatch(self, request: httpx.Request, path: str) -> httpx.Response:
+        params = parse_qsl(request.url.query.decode(), keep_blank_values=True)
+        body = json.loads(request.content) if request.content else None
+        prefer = _prefer(request)
+
+        if not path and request.method == "GET":
+            return _json(200, {
+                "swagger": "2.0",
+                "definitions": {t: {"properties": {c: {} for c in sorted(cols)}}
+                                for t, cols in self.store.columns.items() if t in self.store.tables},
+            })
+
+        if path.startswith("rpc/"):
+            fn = self.store.rpcs.get(path[4:])
+            if fn is None:
+                return _json(404, {"code": "PGRST202", "message": f"Could not find the function public.{path[4:]}"})
+            args = body if request.method == "POST" else dict(params)
+            return _json(200, fn(self.store, args or {}))
+
+        if path not in self.store.tables:
+            return _json(404, {"code": "42P01", "message": f'relation "public.{path}" does not exist'})
+        table = self.store.tables[path]
+
+        if request.method == "GET":
+            return self._select(path, table, params, prefer)
+        if request.method == "POST":
+            return self._insert(path, body, params, prefer)
+        if request.method == "PATCH":
+            rows = [r for r in table if self._matches(r, params)]
+            for r in rows:
+                r.update(body or {})
+            return self._written(rows, prefer, 200)
+        if request.method == "DELETE":
+            rows = [r for r in table if self._matches(r, params)]
+            gone = {id(r) for r in rows}
+            self.store.tables[path] = [r for r in table if id(r) not in gone]
+            return self._written(rows, prefer, 200)
+        return _json(405, {"message": f"{request.method} not supported"})
+
+    # -- helpers --
+
+    def _filters(self, params: List[Tuple[str, str]]) -> List[Predicate]:
+        preds = []
+        for k, v in params:
+            if k in ("select", "order", "limit", "offset", "on_conflict", "columns"):
+                continue
+            preds.append(_logic(k, v) if k in ("or", "and") else _condition(k, v))
+        return preds
+
+    def _matches(self, row: Row, params: List[Tuple[str, str]]) -> bool:
+        return all(p(row) for p in self._filters(params))
+
+    def _parents(self, e: _Embed) -> Dict[Any, Row]:
+        return {p.get("id"): p for p in self.store.tables.get(e.table, [])}
+
+    def _select(self, name: str, table: List[Row], params: List[Tuple[str, str]], prefer: Dict[str, str]) -> httpx.Response:
+        q = dict(params)
+        cols, embeds = _parse_select(q.get("select"))
+        parents = [(e, self._parents(e)) for e in embeds]
+        rows = []
+        for r in table:
+            joined = dict(r) if embeds else r
+            for e, by_id in parents:
+                parent = by_id.get(r.get(e.fk))
+                joined[e.alias] = _project(parent, e.cols) if parent is not None else None
+            rows.append(joined)
+
+        preds = self._filters(params)
+        out = []
+        for r in rows:
+            if any(e.inner and r.get(e.alias) is None for e in embeds):
+                continue
+            if all(p(r) for p in preds):
+                out.append(r)
+        if q.get("order"):
+            out = _sort(out, q["order"])
+
+        total = len(out)
+        offset = int(q.get("offset") or 0)
+        limit = int(q["limit"]) if q.get("limit") else None
+        page = out[offset:offset + limit if limit is not None else None]
+        body = [{**_project(r, cols), **{e.alias: r.get(e.alias) for e in embeds}} for r in page]
+
+        counted = prefer.get("count") in ("exact", "planned", "estimated")
+        span = f"{offset}-{offset + len(page) - 1}" if page else "*"
+        return _json(200, body, {"content-range": f"{span}/{total if counted else '*'}"})
+
+    def _insert(self, name: str, body: Any, params: List[Tuple[str, str]], prefer: Dict[str, str]) -> httpx.Response:
+        rows = body if isinstance(body, list) else [body or {}]
+        conflict = [c.strip() for c in dict(params).get("on_conflict", "").split(",") if c.strip()]
+        resolution = prefer.get("resolution")
+        written: List[Row] = []
+        fresh: List[Row] = []
+        for row in rows:
+            existing = None
+            if conflict:
+                key = tuple(row.get(c) for c in conflict)
+                existing = next((r for r in self.store.tables[name]
+                                 if None not in key and tuple(r.get(c) for c in conflict) == key), None)
+            if existing is not None:
+                if resolution == "merge-duplicates":
+                    existing.update(row)
+                    written.append(existing)
+                elif resolution == "ignore-duplicates":
+                    continue
+                else:
+                    return _json(409, {"code": "23505", "message": "duplicate key value violates unique constraint"})
+            else:
+                fresh.append(row)
+        written += self.store.insert(name, fresh)
+        return self._written(written, prefer, 201)
+
+    @staticmethod
+    def _written(rows: List[Row], prefer: Dict[str, str], status: int) -> httpx.Response:
+        if prefer.get("return") == "representation":
+            return _json(status, [dict(r) for r in rows])
+        return httpx.Response(204 if status == 200 else status)
+
+
+def _json(status: int, payload: Any, headers: Optional[Dict[str, str]] = None) -> httpx.Response:
+    return httpx.Response(status, content=json.dumps(payload, default=str).encode(),
+                          headers={"content-type": "application/json", **(headers or {})})
+
+
+# One store per process, shared by every SupabaseClient when SUPABASE_BACKEND=fake,
+# so benchmarks can seed it directly.
+store = FakeStore()
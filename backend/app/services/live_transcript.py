@@ -0,0 +1,133 @@
+# app/services/live_transcript.py
+"""
+Live, incrementally summarized transcripts for Pipecat calls.
+
+The bot streams each call's transcript while it happens as deltas
+{seq, lines}, where `seq` is the index of the delta's first line. append()
+stores only the lines past what calllog already holds, so a retried, replayed or
+overlapping delta is harmless, and a delta that starts past the end (lines went
+missing) is refused with the position to resend from.
+
+Each call's ConversationState lives in a TTL cache: a delta runs the extractor
+over its own lines only and folds them into the running summary, then one
+calllog_transcript_append() RPC (migrations/009) appends the text and stores the
+summary. A cold entry (restart, another worker) is rebuilt from calllog once.
+Without the migration the whole transcript is PATCHed instead. Calls without a
+calllog row are remembered briefly, so a sender that keeps retrying costs no
+query per request.
+"""
+from __future__ import annotations
+import asyncio
+from typing import Any, Dict, List
+
+import structlog
+
+from app.core.config import settings
+from app.services import schema
+from app.services.cache import AsyncTTLCache
+from app.services.calllog_repo import CallLogRepo
+from app.services.conversation_state import ConversationState
+from app.services.supabase import SupabaseClient
+
+logger = structlog.get_logger("live-transcript")
+
+
+class TranscriptGap(Exception):
+    """A delta starts past the stored end; the sender must resend from `expected`."""
+
+    def __init__(self, expected: int):
+        super().__init__(f"transcript delta starts past line {expected}")
+        self.expected = expected
+
+
+class LiveTranscript:
+    def __init__(self, lines: List[str], seq: int):
+        self.conv = ConversationState()
+        self.conv.extend(lines)
+        self.seq = seq
+        self.lock = asyncio.Lock()
+
+    def snapshot(self, since: int = 0) -> Dict[str, Any]:
+        return {
+            "seq": self.seq,
+            "lines": self.conv.lines[max(0, since):],
+            "summary": self.conv.summary,
+        }
+
+
+_live = AsyncTTLCache("live-transcripts", maxsize=settings.live_transcript_max_calls, ttl=settings.live_transcript_ttl)
+# provider_call_id -> True for calls that had no calllog row (negative cache, short TTL).
+_missing = AsyncTTLCache("live-transcripts-missing", maxsize=settings.live_transcript_max_calls, ttl=30.0)
+
+
+async def _load(pid: str) -> LiveTranscript:
+    with_seq = (await schema.current()).calllog_transcript_seq
+    async with SupabaseClient().client() as c:
+        r = await c.get("/calllog", params={
+            "select": "transcript,transcript_seq" if with_seq else "transcript",
+            "provider_call_id": f"eq.{pid}",
+            "limit": "1",
+        })
+        r.raise_for_status()
+        rows = r.json() or []
+    if not rows:
+        _missing.set(pid, True)
+        raise LookupError(f"no calllog row for provider_call_id={pid}")
+    lines = [ln for ln in (rows[0].get("transcript") or "").splitlines() if ln.strip()]
+    seq = rows[0].get("transcript_seq") if with_seq else None
+    return LiveTranscript(lines, len(lines) if seq is None else int(seq))
+
+
+async def get(pid: str) -> LiveTranscript:
+    """The call's live transcript (cached); LookupError when there is no calllog row."""
+    if _missing.get(pid):
+        raise LookupError(f"no calllog row for provider_call_id={pid}")
+    return await _live.get_or_load(pid, lambda: _load(pid))
+
+
+async def append(pid: str, seq: int, lines: List[str]) -> LiveTranscript:
+    """Append a delta whose first line is line `seq`; raises TranscriptGap if seq is past the end."""
+    live = await get(pid)
+    async with live.lock:
+        if seq > live.seq:
+            raise TranscriptGap(live.seq)
+        fresh = lines[live.seq - seq:]
+        if not fresh:
+            return live
+        # live.conv only takes the lines once they are stored: a failed write must not
+        # leave them behind for the next caller waiting on the lock.
+        folded = live.conv.fold(fresh)
+        summary = folded[1]
+        try:
+            if (await schema.current()).calllog_transcript_seq:
+                stored = await CallLogRepo.append_transcript(pid, live.seq, fresh, summary)
+                if stored is None:
+                    raise LookupError(f"no calllog row for provider_call_id={pid}")
+            else:
+                transcript = "\n".join(live.conv.lines + fresh).strip() or None
+                if not await CallLogRepo.patch_by_provider(
+                    pid, {"transcript": transcript, "structured_payload": summary}
+                ):
+                    raise RuntimeError("calllog transcript patch failed")
+                stored = live.seq + len(fresh)
+        except Exception:
+            _live.invalidate(pid)
+            raise
+        live.conv.extend(fresh, folded)
+        if stored != live.seq + len(fresh):
+            # Someone else appended (another worker, a legacy full write): rebuild on next use.
+            logger.warning("live transcript out of sync, reloading", provider_call_id=pid,
+                           expected=live.seq + len(fresh), stored=stored)
+            _live.invalidate(pid)
+        live.seq = stored
+    return live
+
+
+def forget(pid: str) -> None:
+    """Drop the cached state (and a cached miss), e.g. once the call is finalized or its row created."""
+    _live.invalidate(pid)
+    _missing.invalidate(pid)
+
+
+def stats() -> Dict[str, Any]:
+    return _live.stats()
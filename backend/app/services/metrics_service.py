@@ -1,39 +1,117 @@
+from __future__ import annotations
+from typing import Any, Dict, List, Optional, Tuple
 from app.services.supabase import SupabaseClient
+from app.services.rollup_repo import RollupRepo
 
-async def fetch_metrics():
-    async with SupabaseClient().client() as c:
-        r = await c.get("/calllog", params={"select": "*"})
+# Only the JSON keys the dashboard needs; never transcripts.
+_FALLBACK_SELECT = (
+    "id,"
+    "driver_status:structured_payload->>driver_status,"
+    "scenario:structured_payload->>scenario,"
+    "delay_minutes:structured_payload->>delay_minutes"
+)
+_FALLBACK_PAGE = 1000
+
+
+def _filters(since: Optional[str], until: Optional[str], vendor: Optional[str]) -> List[Tuple[str, str]]:
+    params: List[Tuple[str, str]] = []
+    if since:
+        params.append(("created_at", f"gte.{since}"))
+    if until:
+        params.append(("created_at", f"lte.{until}"))
+    if vendor:
+        params.append(("provider_call_id", f"like.{vendor}_*"))
+    return params
+
+
+async def _fetch_via_rpc(c, since, until, vendor) -> Optional[Dict[str, Any]]:
+    """Single round trip to the calllog_metrics() function (migrations/001). None if not installed."""
+    r = await c.post("/rpc/calllog_metrics", json={"p_from": since, "p_to": until, "p_vendor": vendor})
+    if r.status_code >= 400:
+        return None
+    data = r.json()
+    if isinstance(data, list):
+        data = data[0] if data else None
+    return data if isinstance(data, dict) else None
+
+
+async def _fetch_via_pages(c, since, until, vendor) -> Dict[str, Any]:
+    """Fallback: walk calllog by id in fixed-size pages, keeping only running counters."""
+    total_calls = arrivals = delays = emergencies = delay_sum = 0
+    last_id = None
+    while True:
+        params = [("select", _FALLBACK_SELECT), ("order", "id.asc"), ("limit", str(_FALLBACK_PAGE))]
+        params += _filters(since, until, vendor)
+        if last_id is not None:
+            params.append(("id", f"gt.{last_id}"))
+        r = await c.get("/calllog", params=params)
         r.raise_for_status()
-        data = r.json()
-
-    total_calls = len(data)
-
-    def get(d, *path, default=None):
-        cur = d
-        for k in path:
-            if isinstance(cur, dict) and k in cur:
-                cur = cur[k]
-            else:
-                return default
-        return cur
-
-    arrivals    = sum(1 for d in data if get(d, "structured_payload", "driver_status") == "Arrived")
-    delays      = sum(1 for d in data if get(d, "structured_payload", "driver_status") == "Delayed")
-    emergencies = sum(1 for d in data if get(d, "structured_payload", "scenario") == "Emergency")
-
-    delay_sum = 0
-    for d in data:
-        v = get(d, "structured_payload", "delay_minutes", default=0) or 0
-        try:
-            delay_sum += int(v)
-        except Exception:
-            pass
-    avg_delay = round(delay_sum / (delays or 1), 2)
+        rows = r.json() or []
+        for d in rows:
+            total_calls += 1
+            status = d.get("driver_status")
+            if status == "Arrived":
+                arrivals += 1
+            elif status == "Delayed":
+                delays += 1
+            if d.get("scenario") == "Emergency":
+                emergencies += 1
+            try:
+                delay_sum += int(d.get("delay_minutes") or 0)
+            except Exception:
+                pass
+        if len(rows) < _FALLBACK_PAGE:
+            break
+        last_id = rows[-1]["id"]
 
     return {
         "total_calls": total_calls,
         "arrivals": arrivals,
         "delays": delays,
         "emergencies": emergencies,
-        "avg_delay_minutes": avg_delay,
+        "avg_delay_minutes": round(delay_sum / (delays or 1), 2),
     }
+
+
+async def _fetch_via_rollup(since, until, vendor) -> Optional[Dict[str, Any]]:
+    """Sum day buckets from calllog_rollup (migrations/002). None if the table is missing."""
+    if since:
+        since = since[:10] + "T00:00:00Z"  # include the bucket that contains `since`
+    rows = await RollupRepo.read("day", since, until, vendor)
+    if rows is None:
+        return None
+    t = RollupRepo.totals(rows)
+    return {
+        "total_calls": t["calls"],
+        "arrivals": t["arrivals"],
+        "delays": t["delays"],
+        "emergencies": t["emergencies"],
+        "avg_delay_minutes": round(t["delay_minutes_sum"] / (t["delays"] or 1), 2),
+    }
+
+
+async def fetch_metrics(
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    vendor: Optional[str] = None,
+    source: str = "live",
+) -> Dict[str, Any]:
+    """
+    Dashboard counters for calllog, optionally filtered by created_at range and
+    vendor ('retell' | 'pipecat').
+
+    source="live" (the default) aggregates calllog itself, in Postgres when the
+    calllog_metrics() function exists, otherwise page by page. source="rollup"
+    reads the per-day rollup buckets instead: cheaper, but it only counts
+    finalized calls, by finalize day, with emergencies taken from call_outcome.
+    """
+    vendor = (vendor or "").strip().lower() or None
+    if source != "live":
+        data = await _fetch_via_rollup(since, until, vendor)
+        if data is not None:
+            return data
+    async with SupabaseClient().client() as c:
+        data = await _fetch_via_rpc(c, since, until, vendor)
+        if data is not None:
+            return data
+        return await _fetch_via_pages(c, since, until, vendor)
@@ -0,0 +1,184 @@
+# app/services/retell_client.py
+from __future__ import annotations
+import asyncio
+import email.utils
+import random
+import time
+from typing import Any, Dict, Optional
+
+import httpx
+import structlog
+
+from app.core.config import settings
+from app.services.call_persister import LatencySeries
+
+logger = structlog.get_logger("retell-client")
+
+# Only 429: Retell refused the request without acting on it. A 5xx may come back after
+# the call was already placed, and create-call is not idempotent, so it is not retried.
+RETRY_STATUSES = frozenset({429})
+# Errors raised before the request reached Retell; retrying cannot create a duplicate call.
+RETRY_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class EndpointStats:
+    """Per-endpoint latency (percentiles + fixed histogram buckets) and outcome counters."""
+
+    def __init__(self):
+        self.latency_ms = LatencySeries()
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+        self.statuses: Dict[str, int] = {}
+        self.retries = 0
+        self.errors = 0
+
+    def observe(self, ms: float, status: Optional[int]) -> None:
+        self.latency_ms.add(ms)
+        i = next((i for i, le in enumerate(BUCKETS_MS) if ms <= le), len(BUCKETS_MS))
+        self.buckets[i] += 1
+        key = str(status) if status is not None else "error"
+        self.statuses[key] = self.statuses.get(key, 0) + 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        labels = [f"le_{b}" for b in BUCKETS_MS] + ["inf"]
+        return {
+            "latency_ms": self.latency_ms.summary(),
+            "histogram_ms": dict(zip(labels, self.buckets)),
+            "statuses": dict(self.statuses),
+            "retries": self.retries,
+            "errors": self.errors,
+        }
+
+
+def _retry_after(response: httpx.Response) -> Optional[float]:
+    """Seconds from a Retry-After header (delta-seconds or HTTP-date), if present."""
+    value = (response.headers.get("retry-after") or "").strip()
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+        return max(0.0, when.timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RetellClient:
+    """
+    Retell REST client shared by every call-start path. One pooled
+    httpx.AsyncClient (keep-alive, short connect timeout) lives for the app
+    lifespan; a semaphore caps in-flight requests; 429s and connect failures
+    are retried with full-jitter backoff, honouring Retry-After (capped). The
+    final failure is raised as httpx.HTTPStatusError like raise_for_status().
+    """
+
+    _shared: httpx.AsyncClient | None = None
+    _sem: asyncio.Semaphore | None = None
+    endpoints: Dict[str, EndpointStats] = {}
+    _stats: Dict[str, int] = {"requests": 0, "in_flight": 0, "clients_opened": 0}
+
+    @classmethod
+    def _build(cls) -> httpx.AsyncClient:
+        cls._stats["clients_opened"] += 1
+        return httpx.AsyncClient(
+            base_url=settings.retell_base_url.rstrip("/") or "https://api.retellai.com",
+            headers={"Authorization": f"Bearer {settings.retell_api_key}", "Content-Type": "application/json"},
+            timeout=httpx.Timeout(
+                settings.retell_timeout,
+                connect=settings.retell_connect_timeout,
+                pool=settings.retell_pool_timeout,
+            ),
+            limits=httpx.Limits(
+                max_connections=settings.retell_pool_max_connections,
+                max_keepalive_connections=settings.retell_pool_max_connections,
+                keepalive_expiry=settings.retell_pool_keepalive_expiry,
+            ),
+        )
+
+    @classmethod
+    def shared(cls) -> httpx.AsyncClient:
+        if cls._shared is None or cls._shared.is_closed:
+            cls._shared = cls._build()
+        return cls._shared
+
+    @classmethod
+    async def shutdown(cls) -> None:
+        if cls._shared is not None and not cls._shared.is_closed:
+            await cls._shared.aclose()
+        cls._shared = None
+
+    @classmethod
+    def _limiter(cls) -> asyncio.Semaphore:
+        if cls._sem is None:
+            cls._sem = asyncio.Semaphore(max(1, settings.retell_max_concurrency))
+        return cls._sem
+
+    @staticmethod
+    def _backoff(attempt: int, response: Optional[httpx.Response]) -> float:
+        hinted = _retry_after(response) if response is not None else None
+        if hinted is not None:
+            return min(hinted, settings.retell_retry_max_wait)
+        cap = min(settings.retell_retry_max_wait, settings.retell_retry_backoff * (2 ** attempt))
+        return random.uniform(0, cap)
+
+    async def _send(self, endpoint: str, body: Dict[str, Any], stats: EndpointStats) -> httpx.Response:
+        """One attempt under the concurrency limit (released again while backing off)."""
+        async with self._limiter():
+            self._stats["requests"] += 1
+            self._stats["in_flight"] += 1
+            start = time.perf_counter()
+            status: Optional[int] = None
+            try:
+                response = await self.shared().post(endpoint, json=body)
+                status = response.status_code
+                return response
+            finally:
+                self._stats["in_flight"] -= 1
+                stats.observe((time.perf_counter() - start) * 1000, status)
+
+    async def post(self, endpoint: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        stats = self.endpoints.setdefault(endpoint, EndpointStats())
+        attempts = 1 + max(0, settings.retell_max_retries)
+        for attempt in range(attempts):
+            last = attempt + 1 >= attempts
+            try:
+                response = await self._send(endpoint, body, stats)
+            except RETRY_ERRORS as e:
+                if last:
+                    stats.errors += 1
+                    raise
+                logger.warning("retell request failed, retrying", endpoint=endpoint, attempt=attempt + 1, error=repr(e))
+                response = None
+            except httpx.HTTPError:
+                stats.errors += 1
+                raise
+            else:
+                if response.status_code not in RETRY_STATUSES or last:
+                    if response.status_code >= 400:
+                        stats.errors += 1
+                    response.raise_for_status()
+                    return response.json()
+                logger.warning("retell request rejected, retrying", endpoint=endpoint,
+                               attempt=attempt + 1, status=response.status_code)
+            stats.retries += 1
+            await asyncio.sleep(self._backoff(attempt, response))
+        raise AssertionError("unreachable")
+
+    async def create_web_call(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        return await self.post("/v2/create-web-call", body)
+
+    async def create_phone_call(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        return await self.post("/v2/create-phone-call", body)
+
+    @classmethod
+    def stats(cls) -> Dict[str, Any]:
+        return {
+            **cls._stats,
+            "open": cls._shared is not None and not cls._shared.is_closed,
+            "max_concurrency": settings.retell_max_concurrency,
+            "max_retries": settings.retell_max_retries,
+            "endpoints": {name: s.snapshot() for name, s in cls.endpoints.items()},
+        }
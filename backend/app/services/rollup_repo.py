@@ -0,0 +1,124 @@
+from __future__ import annotations
+from typing import Any, Dict, List, Optional, Tuple
+import datetime as dt
+import structlog
+from app.services.supabase import SupabaseClient
+
+logger = structlog.get_logger("rollup")
+
+COUNTERS = (
+    "calls", "arrivals", "delays", "unloading", "driving", "emergencies",
+    "arrival_confirmations", "in_transit_updates", "delay_minutes_sum",
+    "pipecat_sessions", "pipecat_duration_secs", "pipecat_tokens",
+)
+
+_STATUS_COUNTER = {"Arrived": "arrivals", "Delayed": "delays", "Unloading": "unloading", "Driving": "driving"}
+_OUTCOME_COUNTER = {
+    "Emergency Escalation": "emergencies",
+    "Arrival Confirmation": "arrival_confirmations",
+    "In-Transit Update": "in_transit_updates",
+}
+
+
+def vendor_of(call_key: str | None) -> str:
+    key = (call_key or "").lower()
+    if key.startswith("pipecat_"):
+        return "pipecat"
+    return "retell"
+
+
+def outcome_delta(summary: Dict[str, Any] | None) -> Dict[str, Any]:
+    """Counters contributed by one finished call's structured_payload."""
+    summary = summary or {}
+    delta: Dict[str, Any] = {"calls": 1}
+    status_key = _STATUS_COUNTER.get(summary.get("driver_status") or "")
+    if status_key:
+        delta[status_key] = 1
+    outcome_key = _OUTCOME_COUNTER.get(summary.get("call_outcome") or "")
+    if outcome_key:
+        delta[outcome_key] = 1
+    try:
+        delta["delay_minutes_sum"] = int(summary.get("delay_minutes") or 0)
+    except Exception:
+        pass
+    return delta
+
+
+def pipecat_delta(duration_secs: Any, tokens: Any) -> Dict[str, Any]:
+    """Counters contributed by one Pipecat session's final metrics."""
+    delta: Dict[str, Any] = {"pipecat_sessions": 1}
+    try:
+        delta["pipecat_duration_secs"] = float(duration_secs or 0)
+    except Exception:
+        pass
+    try:
+        delta["pipecat_tokens"] = int(tokens or 0)
+    except Exception:
+        pass
+    return delta
+
+
+class RollupRepo:
+    @staticmethod
+    async def apply(call_key: str, kind: str, delta: Dict[str, Any],
+                    vendor: str | None = None, at: dt.datetime | None = None, replace: bool = False) -> bool:
+        """
+        Fold `delta` into the hour/day buckets once per (call_key, kind); with
+        replace=True a delta already applied for the pair is swapped for this one.
+        Returns False when already applied (or unchanged) or on failure; never
+        raises so the caller's final write is not affected.
+        """
+        if not call_key or call_key == "unknown":
+            return False
+        at = at or dt.datetime.now(dt.timezone.utc)
+        body = {
+            "p_call_key": call_key,
+            "p_kind": kind,
+            "p_vendor": vendor or vendor_of(call_key),
+            "p_at": at.isoformat(),
+            "p_delta": delta,
+        }
+        if replace:
+            body["p_replace"] = True
+        try:
+            async with SupabaseClient().client() as c:
+                r = await c.post("/rpc/calllog_rollup_apply", json=body)
+            if r.status_code >= 400:
+                logger.warning("Rollup apply failed", call_key=call_key, kind=kind, status=r.status_code)
+                return False
+            return bool(r.json())
+        except Exception as e:
+            logger.warning("Rollup apply failed", call_key=call_key, kind=kind, error=str(e))
+            return False
+
+    @staticmethod
+    async def read(bucket: str = "day", since: Optional[str] = None, until: Optional[str] = None,
+                   vendor: Optional[str] = None) -> Optional[List[Dict[str, Any]]]:
+        """Bucket rows for a range; None when the rollup table is unavailable."""
+        params: List[Tuple[str, str]] = [
+            ("select", "bucket_start,vendor," + ",".join(COUNTERS)),
+            ("bucket", f"eq.{bucket}"),
+            ("order", "bucket_start.asc"),
+        ]
+        if since:
+            params.append(("bucket_start", f"gte.{since}"))
+        if until:
+            params.append(("bucket_start", f"lte.{until}"))
+        if vendor:
+            params.append(("vendor", f"eq.{vendor}"))
+        async with SupabaseClient().client() as c:
+            r = await c.get("/calllog_rollup", params=params)
+        if r.status_code >= 400:
+            return None
+        return r.json() or []
+
+    @staticmethod
+    def totals(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+        out: Dict[str, Any] = {k: 0 for k in COUNTERS}
+        for row in rows:
+            for k in COUNTERS:
+                try:
+                    out[k] += float(row.get(k) or 0) if k == "pipecat_duration_secs" else int(row.get(k) or 0)
+                except Exception:
+                    pass
+        return out
@@ -0,0 +1,252 @@
+# app/services/rtvi_ingest.py
+from __future__ import annotations
+import asyncio
+import json
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+import structlog
+
+logger = structlog.get_logger("rtvi-ingest")
+
+# event -> {field: (accepted types, required)}; provider_call_id (or session_id) is always required.
+EVENT_FIELDS: Dict[str, Dict[str, Tuple[tuple, bool]]] = {
+    "call_started": {},
+    "interrupt_detected": {"count": ((int,), False)},
+    "keyword_detected": {"keyword": ((str,), True)},
+    "sentiment_update": {"sentiment": ((str, type(None)), True)},
+    "metrics_final": {"metrics": ((dict,), True)},
+    "transcript_final": {"transcript": ((str,), True)},
+}
+
+
+def validate_event(event: Any) -> Optional[str]:
+    """None when `event` matches EVENT_FIELDS, otherwise a short reason."""
+    if not isinstance(event, dict):
+        return "not an object"
+    pid = event.get("provider_call_id") or event.get("session_id")
+    if not isinstance(pid, str) or not pid:
+        return "missing provider_call_id"
+    spec = EVENT_FIELDS.get(event.get("event"))
+    if spec is None:
+        return f"unknown event {event.get('event')!r}"
+    for name, (types, required) in spec.items():
+        if name not in event:
+            if required:
+                return f"missing {name}"
+        elif not isinstance(event[name], types) or isinstance(event[name], bool):
+            return f"bad type for {name}"
+    return None
+
+
+def parse_events(raw: bytes, content_type: str = "") -> Tuple[List[Any], List[Dict[str, Any]]]:
+    """
+    A JSON array or NDJSON (one event per line) -> (events, errors). NDJSON is
+    used when the content type says so or the body does not start with '['; a
+    line that is not JSON becomes an error for that index only.
+    """
+    text = raw.decode("utf-8", errors="replace").strip()
+    if not text:
+        return [], []
+    if "ndjson" not in content_type and text[0] == "[":
+        try:
+            events = json.loads(text)
+        except ValueError as e:
+            return [], [{"index": None, "error": f"invalid JSON: {e}"}]
+        return (events, []) if isinstance(events, list) else ([], [{"index": None, "error": "expected an array"}])
+    events: List[Any] = []
+    errors: List[Dict[str, Any]] = []
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        try:
+            events.append(json.loads(line))
+        except ValueError:
+            errors.append({"index": len(events), "error": "invalid JSON line"})
+            events.append(None)
+    return events, errors
+
+
+@dataclass
+class RtviBatch:
+    """Everything received for one provider_call_id within one coalescing window."""
+    provider_call_id: str
+    first_seen: float = field(default_factory=time.monotonic)
+    events: int = 0
+    interruptions: int = 0
+    keywords: List[str] = field(default_factory=list)
+    sentiment: Optional[str] = None
+    # Events that are not simple counters (metrics_final, transcript_final, ...) in arrival order.
+    passthrough: List[Dict[str, Any]] = field(default_factory=list)
+
+    def add(self, payload: Dict[str, Any]) -> None:
+        self.events += 1
+        event = payload.get("event")
+        if event == "interrupt_detected":
+            self.interruptions += int(payload.get("count") or 1)
+        elif event == "keyword_detected":
+            kw = payload.get("keyword")
+            if kw:
+                self.keywords.append(str(kw))
+        elif event == "sentiment_update":
+            self.sentiment = payload.get("sentiment")
+        else:
+            self.passthrough.append(payload)
+
+    @property
+    def has_counters(self) -> bool:
+        return bool(self.interruptions or self.keywords or self.sentiment is not None)
+
+
+FlushFn = Callable[[List[RtviBatch]], Awaitable[None]]
+
+
+class RtviIngestQueue:
+    """
+    Bounded write-behind queue for RTVI events.
+
+    offer() is non-blocking and returns False when the queue is full (callers
+    answer 429). A collector task groups events per provider_call_id for
+    `window` seconds; a pool of workers then hands the merged batches to
+    `flush`, up to `flush_max` calls at a time, so a burst of N events for M
+    calls becomes one counter write instead of N.
+    """
+
+    def __init__(self, flush: FlushFn, maxsize: int = 10000, workers: int = 4, window: float = 0.25,
+                 flush_max: int = 200):
+        self._flush = flush
+        self._window = window
+        self._flush_max = max(1, flush_max)
+        self._workers_n = max(1, workers)
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self._ready: asyncio.Queue = asyncio.Queue()
+        self._pending: Dict[str, RtviBatch] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._closing = False
+        self._stats = {
+            "accepted": 0, "rejected": 0, "flushes": 0, "batches_flushed": 0, "events_flushed": 0,
+            "flush_errors": 0, "max_depth": 0,
+            "flush_ms_last": 0.0, "flush_ms_max": 0.0, "flush_ms_total": 0.0,
+        }
+
+    # -- producer side -----------------------------------------------------
+
+    def offer(self, payload: Dict[str, Any]) -> bool:
+        if self._closing or not self._tasks:
+            return False
+        try:
+            self._queue.put_nowait(payload)
+        except asyncio.QueueFull:
+            self._stats["rejected"] += 1
+            return False
+        self._stats["accepted"] += 1
+        self._stats["max_depth"] = max(self._stats["max_depth"], self._queue.qsize())
+        return True
+
+    def offer_many(self, payloads: List[Dict[str, Any]]) -> bool:
+        """Queue all payloads or none of them: False (nothing queued) when they do not all fit."""
+        if self._closing or not self._tasks:
+            return False
+        free = self._queue.maxsize - self._queue.qsize() if self._queue.maxsize > 0 else len(payloads)
+        if free < len(payloads):
+            self._stats["rejected"] += len(payloads)
+            return False
+        for payload in payloads:
+            self.offer(payload)  # cannot fail: nothing awaits between the check and the puts
+        return True
+
+    # -- lifecycle ---------------------------------------------------------
+
+    async def start(self) -> None:
+        if self._tasks:
+            return
+        self._closing = False
+        self._tasks.append(asyncio.create_task(self._collect(), name="rtvi-collector"))
+        for i in range(self._workers_n):
+            self._tasks.append(asyncio.create_task(self._work(), name=f"rtvi-worker-{i}"))
+
+    async def stop(self) -> None:
+        """Stop accepting, flush everything still queued or pending, then stop workers."""
+        if not self._tasks:
+            return
+        self._closing = True
+        await self._queue.join()
+        collector, workers = self._tasks[0], self._tasks[1:]
+        collector.cancel()
+        await asyncio.gather(collector, return_exceptions=True)
+        for batch in self._pending.values():
+            self._ready.put_nowait(batch)
+        self._pending.clear()
+        await self._ready.join()
+        for t in workers:
+            t.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        self._tasks = []
+
+    # -- internals ---------------------------------------------------------
+
+    def _release_due(self, now: float) -> None:
+        # Batches that would fall due within the next fraction of a window go out
+        # together with the due ones, so calls that arrived in one burst share a flush.
+        if not any(now - b.first_seen >= self._window for b in self._pending.values()):
+            return
+        cutoff = self._window * 0.8
+        for pid in [p for p, b in self._pending.items() if now - b.first_seen >= cutoff]:
+            self._ready.put_nowait(self._pending.pop(pid))
+
+    def _add(self, payload: Dict[str, Any]) -> None:
+        pid = payload.get("provider_call_id") or payload.get("session_id") or "unknown"
+        batch = self._pending.get(pid)
+        if batch is None:
+            batch = self._pending[pid] = RtviBatch(provider_call_id=pid)
+        batch.add(payload)
+        self._queue.task_done()
+
+    async def _collect(self) -> None:
+        while True:
+            timeout = self._window
+            if self._pending:
+                oldest = min(b.first_seen for b in self._pending.values())
+                timeout = max(0.0, self._window - (time.monotonic() - oldest))
+            try:
+                payload = await asyncio.wait_for(self._queue.get(), timeout=timeout)
+            except asyncio.TimeoutError:
+                payload = None
+            if payload is not None:
+                self._add(payload)
+                # Take everything already queued before looking at deadlines again.
+                while not self._queue.empty():
+                    self._add(self._queue.get_nowait())
+            self._release_due(time.monotonic())
+
+    async def _work(self) -> None:
+        while True:
+            batches: List[RtviBatch] = [await self._ready.get()]
+            while len(batches) < self._flush_max and not self._ready.empty():
+                batches.append(self._ready.get_nowait())
+            start = time.perf_counter()
+            try:
+                await self._flush(batches)
+            except Exception as e:
+                self._stats["flush_errors"] += 1
+                logger.error("RTVI batch flush failed", calls=len(batches), error=str(e))
+            finally:
+                ms = (time.perf_counter() - start) * 1000
+                self._stats["flushes"] += 1
+                self._stats["batches_flushed"] += len(batches)
+                self._stats["events_flushed"] += sum(b.events for b in batches)
+                self._stats["flush_ms_last"] = round(ms, 2)
+                self._stats["flush_ms_max"] = round(max(self._stats["flush_ms_max"], ms), 2)
+                self._stats["flush_ms_total"] += ms
+                for _ in batches:
+                    self._ready.task_done()
+
+    def stats(self) -> Dict[str, Any]:
+        s = dict(self._stats)
+        flushed = s.pop("flush_ms_total")
+        s["flush_ms_avg"] = round(flushed / (s["flushes"] or 1), 2)
+        s["depth"] = self._queue.qsize()
+        s["pending_calls"] = len(self._pending)
+        s["ready_batches"] = self._ready.qsize()
+        s["running"] = bool(self._tasks) and not self._closing
+        return s
@@ -0,0 +1,139 @@
+# app/services/schema.py
+"""
+PostgREST schema introspection, done once per process.
+
+PostgREST describes every exposed table and its columns in the OpenAPI document
+at the API root (GET /rest/v1/). load() reads it in the FastAPI lifespan, so
+request paths answer "which driver table?" or "does calllog have extra?" from
+memory instead of probing (or parsing error text) on the first requests after a
+deploy. When the root is unavailable (e.g. openapi-mode=disabled) it falls back
+to one probe per candidate driver table and assumes the optional columns exist.
+"""
+from __future__ import annotations
+import asyncio
+from typing import Any, Dict, FrozenSet, Optional, Tuple
+
+import structlog
+
+from app.services.supabase import SupabaseClient
+
+logger = structlog.get_logger("schema")
+
+DRIVER_TABLES = ("drivers", "driver")
+
+
+class Schema:
+    """Tables -> columns as exposed by PostgREST (None when introspection was unavailable)."""
+
+    def __init__(self, tables: Optional[Dict[str, FrozenSet[str]]], driver_table: Optional[str], source: str):
+        self.tables = tables
+        self.driver_table = driver_table
+        self.source = source
+
+    @property
+    def driver_path(self) -> str:
+        if not self.driver_table:
+            raise RuntimeError("Neither table 'driver' nor 'drivers' exists.")
+        return f"/{self.driver_table}"
+
+    def has_column(self, table: str, column: str) -> bool:
+        """Unknown schema (fallback mode) answers True: callers behave as before introspection."""
+        if self.tables is None:
+            return True
+        return column in self.tables.get(table, ())
+
+    @property
+    def driver_phone_number(self) -> bool:
+        return bool(self.driver_table) and self.has_column(self.driver_table, "phone_number")
+
+    @property
+    def calllog_extra(self) -> bool:
+        return self.has_column("calllog", "extra")
+
+    @property
+    def calllog_retell_call_id(self) -> bool:
+        return self.has_column("calllog", "retell_call_id")
+
+    @property
+    def calllog_transcript_seq(self) -> bool:
+        return self.has_column("calllog", "transcript_seq")
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "source": self.source,
+            "driver_table": self.driver_table,
+            "driver_phone_number": self.driver_phone_number,
+            "calllog_extra": self.calllog_extra,
+            "calllog_retell_call_id": self.calllog_retell_call_id,
+            "calllog_transcript_seq": self.calllog_transcript_seq,
+            "tables": sorted(self.tables) if self.tables is not None else None,
+        }
+
+
+_current: Optional[Schema] = None
+_lock = asyncio.Lock()
+
+
+def _parse_openapi(doc: Dict[str, Any]) -> Dict[str, FrozenSet[str]]:
+    defs = doc.get("definitions") or (doc.get("components") or {}).get("schemas") or {}
+    return {name: frozenset((d.get("properties") or {}).keys()) for name, d in defs.items()}
+
+
+async def _introspect() -> Tuple[Schema, bool]:
+    """(schema, conclusive); an answer built on failed probes (401, 5xx, network) is not final."""
+    async with SupabaseClient().client() as c:
+        try:
+            r = await c.get("/", headers={"Accept": "application/openapi+json"})
+            if r.status_code < 400:
+                tables = _parse_openapi(r.json())
+                if tables:
+                    driver = next((t for t in DRIVER_TABLES if t in tables), None)
+                    return Schema(tables, driver, "openapi"), True
+        except Exception as e:
+            logger.warning("openapi introspection failed", error=str(e))
+
+        conclusive = True
+        guess: Optional[str] = None
+        for t in DRIVER_TABLES:
+            try:
+                r = await c.get(f"/{t}", params={"select": "id", "limit": "1"})
+                status: Optional[int] = r.status_code
+            except Exception as e:
+                logger.warning("schema probe failed", table=t, error=str(e))
+                status = None
+            if status is not None and 200 <= status < 300:
+                return Schema(None, t, "probe"), conclusive
+            if status != 404:
+                # Neither present nor absent: keep it as a guess, but do not settle on it.
+                conclusive = False
+                guess = guess or t
+        return Schema(None, guess, "probe"), conclusive
+
+
+async def load(force: bool = False) -> Schema:
+    """
+    Introspect once (concurrent callers share the load); force=True re-reads.
+    A result built on failed probes is returned but not kept, so the next call retries.
+    """
+    global _current
+    if _current is not None and not force:
+        return _current
+    async with _lock:
+        if _current is None or force:
+            found, conclusive = await _introspect()
+            if not conclusive:
+                logger.warning("schema probe inconclusive, not cached", **found.snapshot())
+                return found
+            _current = found
+            logger.info("schema loaded", **_current.snapshot())
+    return _current
+
+
+async def current() -> Schema:
+    """The loaded schema; loads lazily when running outside the app lifespan (scripts)."""
+    return _current if _current is not None else await load()
+
+
+def reset() -> None:
+    global _current
+    _current = None
@@ -0,0 +1,261 @@
+# app/services/spool.py
+"""
+Append-only on-disk spool for writes that failed while the database (or the
+backend) was unreachable.
+
+Records are JSON lines {"k": idempotency key, "t": kind, "b": body, "ts"} in
+numbered segment files (000000000001.seg, ...). append() is synchronous but
+only writes to the page cache; a background task fsyncs the active segment
+every `fsync_interval` seconds (off the event loop), so a burst of failures
+costs one fsync, not one per record. Segments roll at `segment_bytes`; when the
+spool would exceed `max_bytes` the oldest sealed segment is dropped (and
+counted), so an outage delays writes but cannot fill the disk.
+
+The replayer seals the active segment and feeds records, oldest first, to the
+handler registered for their kind. A handler that raises stops the pass (the
+target is presumably still down) and the record is retried on the next one,
+unless it raises PermanentError: that record can never be applied (rejected
+payload, missing column), so it is logged, counted and skipped. Progress is
+persisted in a `cursor` file after each record, so a restart resumes where it
+stopped instead of re-applying a whole segment. Delivery is still at least
+once: a crash between a handler and its cursor write applies that record again.
+"""
+from __future__ import annotations
+import asyncio
+import json
+import os
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, IO, List, Optional, Tuple
+
+import structlog
+
+logger = structlog.get_logger("spool")
+
+Handler = Callable[[Any, str], Awaitable[None]]
+
+SUFFIX = ".seg"
+
+
+class PermanentError(Exception):
+    """Raised by a handler for a record that will fail the same way on every retry."""
+
+
+class Spool:
+    def __init__(
+        self,
+        directory: str,
+        segment_bytes: int = 4 * 1024 * 1024,
+        max_bytes: int = 256 * 1024 * 1024,
+        fsync_interval: float = 0.2,
+        replay_interval: float = 5.0,
+        name: str = "spool",
+    ):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.max_bytes = max_bytes
+        self.fsync_interval = fsync_interval
+        self.replay_interval = replay_interval
+        self.name = name
+        self._handlers: Dict[str, Handler] = {}
+        self._sealed: List[str] = []
+        self._sizes: Dict[str, int] = {}
+        self._seq = 0
+        self._active: Optional[IO[bytes]] = None
+        self._active_path: Optional[str] = None
+        self._dirty = False
+        self._tasks: List[asyncio.Task] = []
+        self._replay_lock = asyncio.Lock()
+        self._stats = {
+            "appended": 0, "rejected": 0, "replayed": 0, "replay_errors": 0, "permanent_errors": 0, "skipped": 0,
+            "dropped_segments": 0, "dropped_bytes": 0, "fsyncs": 0,
+        }
+        self._scan()
+
+    # -- files ---------------------------------------------------------------
+
+    def _scan(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        names = sorted(n for n in os.listdir(self.directory) if n.endswith(SUFFIX))
+        self._sealed = [os.path.join(self.directory, n) for n in names]
+        self._sizes = {p: os.path.getsize(p) for p in self._sealed}
+        self._seq = max((int(n[: -len(SUFFIX)]) for n in names if n[: -len(SUFFIX)].isdigit()), default=0)
+
+    @property
+    def _cursor_path(self) -> str:
+        return os.path.join(self.directory, "cursor")
+
+    def _read_cursor(self) -> Tuple[Optional[str], int]:
+        try:
+            with open(self._cursor_path) as f:
+                name, _, line = f.read().strip().partition(" ")
+                return name, int(line or 0)
+        except (OSError, ValueError):
+            return None, 0
+
+    def _write_cursor(self, path: Optional[str], line: int) -> None:
+        tmp = self._cursor_path + ".tmp"
+        with open(tmp, "w") as f:
+            f.write(f"{os.path.basename(path) if path else ''} {line}")
+        os.replace(tmp, self._cursor_path)
+
+    def _seal(self) -> None:
+        if self._active is None:
+            return
+        self._active.flush()
+        os.fsync(self._active.fileno())
+        self._active.close()
+        self._sealed.append(self._active_path)
+        self._active = None
+        self._active_path = None
+        self._dirty = False
+
+    def _drop_oldest(self) -> bool:
+        if not self._sealed:
+            return False
+        path = self._sealed.pop(0)
+        size = self._sizes.pop(path, 0)
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+        if self._read_cursor()[0] == os.path.basename(path):
+            self._write_cursor(None, 0)
+        self._stats["dropped_segments"] += 1
+        self._stats["dropped_bytes"] += size
+        logger.error("spool full, dropped oldest segment", spool=self.name, segment=os.path.basename(path), bytes=size)
+        return True
+
+    @property
+    def size(self) -> int:
+        return sum(self._sizes.values())
+
+    # -- producer ------------------------------------------------------------
+
+    def append(self, kind: str, body: Any, key: str | None = None) -> bool:
+        """Spool one record; False only if it cannot fit even after dropping old segments."""
+        line = (json.dumps({"k": key or uuid.uuid4().hex, "t": kind, "b": body, "ts": time.time()},
+                           separators=(",", ":"), default=str) + "\n").encode()
+        while self.size + len(line) > self.max_bytes and self._drop_oldest():
+            pass
+        if self.size + len(line) > self.max_bytes:
+            self._stats["rejected"] += 1
+            return False
+        if self._active is None:
+            self._seq += 1
+            self._active_path = os.path.join(self.directory, f"{self._seq:012d}{SUFFIX}")
+            self._active = open(self._active_path, "ab")
+            self._sizes[self._active_path] = 0
+        self._active.write(line)
+        self._sizes[self._active_path] += len(line)
+        self._dirty = True
+        self._stats["appended"] += 1
+        if self._sizes[self._active_path] >= self.segment_bytes:
+            self._seal()
+        return True
+
+    # -- lifecycle -----------------------------------------------------------
+
+    def register(self, kind: str, handler: Handler) -> None:
+        self._handlers[kind] = handler
+
+    async def start(self) -> None:
+        if self._tasks:
+            return
+        self._tasks = [
+            asyncio.create_task(self._fsync_loop(), name=f"{self.name}-fsync"),
+            asyncio.create_task(self._replay_loop(), name=f"{self.name}-replay"),
+        ]
+
+    async def stop(self) -> None:
+        for t in self._tasks:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._seal()
+
+    async def _fsync_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.fsync_interval)
+            if self._dirty and self._active is not None:
+                self._dirty = False
+                self._active.flush()
+                try:
+                    await asyncio.to_thread(os.fsync, self._active.fileno())
+                except (OSError, ValueError):
+                    pass  # sealed (and fsynced) by append() meanwhile
+                self._stats["fsyncs"] += 1
+
+    async def _replay_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.replay_interval)
+            try:
+                await self.replay()
+            except Exception as e:
+                logger.error("spool replay pass failed", spool=self.name, error=str(e))
+
+    # -- replay --------------------------------------------------------------
+
+    @property
+    def pending(self) -> bool:
+        return bool(self._sealed) or (self._active_path is not None and self._sizes.get(self._active_path, 0) > 0)
+
+    async def replay(self) -> int:
+        """Deliver spooled records oldest first; returns how many were delivered this pass."""
+        async with self._replay_lock:
+            if not self.pending:
+                return 0
+            self._seal()
+            delivered = 0
+            while self._sealed:
+                path = self._sealed[0]
+                name, start = self._read_cursor()
+                if name != os.path.basename(path):
+                    start = 0
+                with open(path, "rb") as f:
+                    lines = f.read().splitlines()
+                for i in range(start, len(lines)):
+                    try:
+                        rec = json.loads(lines[i])
+                    except ValueError:
+                        self._stats["skipped"] += 1  # torn write at a crash
+                        continue
+                    handler = self._handlers.get(rec.get("t"))
+                    if handler is None:
+                        self._stats["skipped"] += 1
+                        logger.warning("spool record without handler", spool=self.name, kind=rec.get("t"))
+                    else:
+                        try:
+                            await handler(rec.get("b"), rec.get("k"))
+                        except PermanentError as e:
+                            self._stats["permanent_errors"] += 1
+                            logger.error("spool record rejected, skipped", spool=self.name, kind=rec.get("t"),
+                                         key=rec.get("k"), error=str(e))
+                            self._write_cursor(path, i + 1)
+                            continue
+                        except Exception as e:
+                            self._stats["replay_errors"] += 1
+                            self._write_cursor(path, i)
+                            logger.warning("spool replay paused", spool=self.name, error=str(e), remaining=len(lines) - i)
+                            return delivered
+                        delivered += 1
+                        self._stats["replayed"] += 1
+                    self._write_cursor(path, i + 1)
+                # The segment may have been dropped for space while its records were being sent.
+                if path in self._sealed:
+                    self._sealed.remove(path)
+                    self._sizes.pop(path, None)
+                    os.unlink(path)
+                self._write_cursor(None, 0)
+            if delivered:
+                logger.info("spool replayed", spool=self.name, records=delivered)
+            return delivered
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "segments": len(self._sealed) + (1 if self._active is not None else 0),
+            "bytes": self.size,
+            "max_bytes": self.max_bytes,
+            "running": bool(self._tasks),
+        }
@@ -2,9 +2,26 @@
 from __future__ import annotations
 import httpx
 from contextlib import asynccontextmanager
+from typing import Any, Dict
 from app.core.config import settings
 
+try:
+    import h2  # noqa: F401  (httpx only speaks HTTP/2 when the h2 package is installed)
+    _HTTP2_AVAILABLE = True
+except ImportError:
+    _HTTP2_AVAILABLE = False
+
+
 class SupabaseClient:
+    """
+    Thin PostgREST helper. All instances share one pooled httpx.AsyncClient
+    (keep-alive, optional HTTP/2) that lives for the app lifespan, so repo calls
+    reuse warm connections instead of paying a TCP+TLS handshake each time.
+    """
+
+    _shared: httpx.AsyncClient | None = None
+    _stats: Dict[str, int] = {"requests": 0, "errors": 0, "clients_opened": 0}
+
     def __init__(self):
         self.base_url = settings.supabase_url.rstrip("/") + "/rest/v1"
         self.headers = {
@@ -12,13 +29,92 @@ class SupabaseClient:
             "Authorization": f"Bearer {settings.supabase_service_key}",
             "Content-Type": "application/json",
             "Accept": "application/json",
-            
+
             "Prefer": "return=representation",
         }
 
+    @classmethod
+    def _build(cls) -> httpx.AsyncClient:
+        cfg = cls()
+        limits = httpx.Limits(
+            max_connections=settings.supabase_pool_max_connections,
+            max_keepalive_connections=settings.supabase_pool_max_keepalive,
+            keepalive_expiry=settings.supabase_pool_keepalive_expiry,
+        )
+        timeout = httpx.Timeout(
+            settings.supabase_timeout,
+            connect=settings.supabase_connect_timeout,
+            pool=settings.supabase_pool_timeout,
+        )
+
+        async def _on_request(request: httpx.Request) -> None:
+            cls._stats["requests"] += 1
+
+        async def _on_response(response: httpx.Response) -> None:
+            if response.status_code >= 400:
+                cls._stats["errors"] += 1
+
+        cls._stats["clients_opened"] += 1
+        transport = None
+        if settings.supabase_backend == "fake":
+            from app.services import fake_postgrest
+            transport = fake_postgrest.FakePostgrestTransport(
+                fake_postgrest.store,
+                latency=settings.fake_postgrest_latency_ms / 1000,
+                jitter=settings.fake_postgrest_jitter_ms / 1000,
+            )
+        return httpx.AsyncClient(
+            base_url=cfg.base_url,
+            headers=cfg.headers,
+            timeout=timeout,
+            limits=limits,
+            http2=settings.supabase_http2 and _HTTP2_AVAILABLE,
+            transport=transport,
+            event_hooks={"request": [_on_request], "response": [_on_response]},
+        )
+
+    @classmethod
+    async def startup(cls) -> None:
+        """Open the shared client (called from the FastAPI lifespan)."""
+        if cls._shared is None or cls._shared.is_closed:
+            cls._shared = cls._build()
+
+    @classmethod
+    async def shutdown(cls) -> None:
+        """Close the shared client and drop pooled connections."""
+        if cls._shared is not None and not cls._shared.is_closed:
+            await cls._shared.aclose()
+        cls._shared = None
+
+    @classmethod
+    def shared(cls) -> httpx.AsyncClient:
+        # Lazily created so scripts and tests work without the app lifespan.
+        if cls._shared is None or cls._shared.is_closed:
+            cls._shared = cls._build()
+        return cls._shared
+
+    @classmethod
+    def stats(cls) -> Dict[str, Any]:
+        """Request counters plus the pool configuration and current connection count."""
+        out: Dict[str, Any] = dict(cls._stats)
+        out.update({
+            "max_connections": settings.supabase_pool_max_connections,
+            "max_keepalive": settings.supabase_pool_max_keepalive,
+            "http2": settings.supabase_http2 and _HTTP2_AVAILABLE,
+            "open": cls._shared is not None and not cls._shared.is_closed,
+            "backend": settings.supabase_backend,
+        })
+        try:
+            # httpcore internals; best-effort only.
+            pool = cls._shared._transport._pool  # type: ignore[union-attr]
+            conns = list(pool.connections)
+            out["connections"] = len(conns)
+            out["busy_connections"] = sum(1 for x in conns if not x.is_idle())
+        except Exception:
+            out["connections"] = None
+        return out
+
     @asynccontextmanager
     async def client(self):
-        async with httpx.AsyncClient(
-            base_url=self.base_url, headers=self.headers, timeout=30.0
-        ) as c:
-            yield c
+        # The shared client is borrowed, not closed, when the block exits.
+        yield self.shared()
@@ -1,12 +1,32 @@
 from __future__ import annotations
-from typing import Tuple, Mapping, Any
+from typing import Tuple, Mapping, Any, Dict
 from abc import ABC, abstractmethod
+import time
+import uuid
 
 class VoiceVendor(ABC):
+    name: str = ""
+    # When True a failed calllog write fails the start (the call cannot be finalized without its row).
+    requires_calllog: bool = False
+
+    def new_call_id(self) -> str:
+        # Random suffix: two starts in the same millisecond must not share a calllog row.
+        return f"{self.name}_{int(time.time() * 1000)}_{uuid.uuid4().hex[:8]}"
+
     @abstractmethod
+    async def create_session(self, payload: Mapping[str, Any], provider_call_id: str) -> Dict[str, Any]:
+        """
+        Provider-side work only (no Supabase): returns {"connect_url": ...} plus
+        optional "calllog_link" columns to attach to the calllog row afterwards.
+        Runs concurrently with the calllog write in services.call_start.
+        """
+        ...
+
     async def start(self, payload: Mapping[str, Any]) -> Tuple[str, str]:
         """
         Return (connect_url, provider_call_id)
         connect_url is what the frontend opens.
         """
-        ...
+        from app.services.call_start import start_call
+        started = await start_call(self, payload)
+        return started.connect_url, started.provider_call_id
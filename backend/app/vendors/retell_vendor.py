@@ -1,13 +1,24 @@
 from __future__ import annotations
-from typing import Tuple, Mapping, Any
-from app.api.v1.routers.calls import retell_headers, CREATE_WEB_CALL_URL, CREATE_PHONE_CALL_URL, \
-    RETELL_AGENT_ID, RETELL_AGENT_VERSION
-import httpx, time
-
-class RetellVendor:
-    async def start(self, payload: Mapping[str, Any]) -> Tuple[str, str]:
-       
-        provider_call_id = f"retell_{int(time.time() * 1000)}"
+from typing import Mapping, Any, Dict
+from app.core.config import settings
+from app.services.retell_client import RetellClient
+from app.vendors.base import VoiceVendor
+
+RETELL_API_KEY       = settings.retell_api_key
+RETELL_BASE          = settings.retell_base_url.rstrip("/") or "https://api.retellai.com"
+RETELL_AGENT_ID      = settings.retell_agent_id
+RETELL_AGENT_VERSION = settings.retell_agent_version or 1
+
+CREATE_WEB_CALL_URL   = f"{RETELL_BASE}/v2/create-web-call"
+CREATE_PHONE_CALL_URL = f"{RETELL_BASE}/v2/create-phone-call"
+
+def retell_headers() -> dict:
+    return {"Authorization": f"Bearer {RETELL_API_KEY}", "Content-Type": "application/json"}
+
+class RetellVendor(VoiceVendor):
+    name = "retell"
+
+    async def create_session(self, payload: Mapping[str, Any], provider_call_id: str) -> Dict[str, Any]:
         dyn_vars = {
             "driver_name": payload.get("driver_name"),
             "load_number": payload.get("load_number"),
@@ -17,23 +28,23 @@ class RetellVendor:
 
         metadata = {"load_number": payload.get("load_number"), "provider_call_id": provider_call_id}
 
-        is_phone = (payload.get("call_type","web").lower() == "phone")
+        is_phone = ((payload.get("call_type") or "web").lower() == "phone")
         req_body = {
             "agent_id": RETELL_AGENT_ID,
             "agent_version": RETELL_AGENT_VERSION,
             "metadata": metadata,
             "retell_llm_dynamic_variables": dyn_vars,
         }
-        url = CREATE_PHONE_CALL_URL if is_phone else CREATE_WEB_CALL_URL
+        client = RetellClient()
         if is_phone:
             req_body["to_number"] = payload["driver_phone"]
             req_body["from_number"] = payload["from_number"]
+            call = await client.create_phone_call(req_body)
+        else:
+            call = await client.create_web_call(req_body)
 
-        async with httpx.AsyncClient(headers=retell_headers(), timeout=30.0) as rc:
-            r = await rc.post(url, json=req_body)
-            r.raise_for_status()
-            call = r.json()
-
-        
-        connect_url = call.get("web_call_url") or ""
-        return connect_url, provider_call_id
+        return {
+            "connect_url": call.get("web_call_url") or "",
+            "call": call,
+            "calllog_link": {"retell_call_id": call["call_id"]} if call.get("call_id") else {},
+        }
@@ -0,0 +1,222 @@
+"""
+draft_reply benchmark: the hand-written branch chain vs the compiled dialogue
+policy (app/services/dialogue_policy.py).
+
+Replays fuzzed multi-turn conversations through both, asserts they produce the
+same reply / end_call / state on every turn, then reports per-turn latency.
+Target: p99 well under 1 ms per turn.
+
+    cd backend && python benchmarks/bench_dialogue_policy.py --conversations 2000
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from typing import Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.services import dialogue_policy  # noqa: E402
+from app.services.extraction import (  # noqa: E402
+    extract_delay_reason, extract_eta, extract_location, extract_unloading,
+)
+
+
+# ---- reference: the pre-policy implementation, verbatim ----
+
+def classify_status(text: str) -> str:
+    t = (text or "").lower()
+    if any(k in t for k in ["arrived", "checked in", "docked", "at dock", "in door"]): return "Arrived"
+    if any(k in t for k in ["unloading", "lumper", "detention", "in door"]):        return "Unloading"
+    if any(k in t for k in ["delay", "late", "behind", "traffic", "weather", "stuck"]): return "Delayed"
+    return "Driving"
+
+def detect_emergency(text: str) -> str | None:
+    t = (text or "").lower()
+    if any(k in t for k in ["accident", "crash", "collision"]):        return "Accident"
+    if any(k in t for k in ["blowout", "breakdown", "flat", "engine"]): return "Breakdown"
+    if any(k in t for k in ["medical", "injur", "bleeding", "faint"]): return "Medical"
+    return None
+
+def is_noisy(text: str) -> bool:
+    return len((text or "").strip()) < 3 or "??" in (text or "")
+
+def is_uncoop(text: str) -> bool:
+    return (text or "").strip().lower() in {"yes","no","ok","k","fine","later"}
+
+def _confirm_wrap(state: dict) -> Tuple[str, bool, dict]:
+    status = state.get("driver_status") or "Driving"
+    loc = state.get("current_location") or "N/A"
+    eta = state.get("eta") or "N/A"
+    reason = state.get("delay_reason") or "None"
+    unload = state.get("unloading_status") or "N/A"
+
+    if status in ("Arrived","Unloading"):
+        outcome = "Arrival Confirmation"
+    else:
+        outcome = "In-Transit Update"
+    state["call_outcome"] = outcome
+
+    msg = f"Thanks. Logging your status: {status}. Location: {loc}. ETA: {eta}. Delay reason: {reason}. Unloading: {unload}. I’ll update dispatch now."
+    return msg, True, state
+
+def draft_reply(latest_user_text: str, state: dict) -> tuple[str, bool, dict]:
+    emerg = detect_emergency(latest_user_text)
+    if emerg:
+        state.update({"scenario":"Emergency","emergency_type":emerg})
+        return (
+            "I’m sorry to hear that. Are you safe? Any injuries? Please share exact location and whether the load is secure. I’m connecting you to a dispatcher now.",
+            False,
+            state
+        )
+
+    if is_noisy(latest_user_text):
+        n = int(state.get("noisy_count", 0)) + 1
+        state["noisy_count"] = n
+        if n >= 2:
+            return "Still too much noise. I’ll escalate to a dispatcher now.", True, state
+        return "I’m getting a lot of noise—could you repeat that clearly once more?", False, state
+
+    if is_uncoop(latest_user_text):
+        s = int(state.get("short_count", 0)) + 1
+        state["short_count"] = s
+        if s >= 3:
+            return "I’ll let you go and follow up later. Drive safe.", True, state
+        return "Could you share your current location and ETA for this load?", False, state
+
+    status = classify_status(latest_user_text)
+    if status and status != state.get("driver_status"):
+        state["driver_status"] = status
+
+    if "current_location" not in state:
+        loc = extract_location(latest_user_text)
+        if loc: state["current_location"] = loc
+
+    if "eta" not in state:
+        eta = extract_eta(latest_user_text)
+        if eta: state["eta"] = eta
+
+    if status in ("Driving","Delayed"):
+        if status == "Delayed" and "delay_reason" not in state:
+            dr = extract_delay_reason(latest_user_text)
+            if dr: state["delay_reason"] = dr
+
+        if "current_location" not in state:
+            return "Thanks. What’s your current location? (highway and nearest city)", False, state
+        if "eta" not in state:
+            ask_count = int(state.get("eta_ask_count", 0)) + 1
+            state["eta_ask_count"] = ask_count
+            if ask_count >= 2:
+                state["eta"] = "Unknown"
+                return _confirm_wrap(state)
+            return "Got it. What’s your ETA to destination?", False, state
+        if status == "Delayed" and "delay_reason" not in state:
+            return "Understood. What’s causing the delay—traffic, weather, or something else?", False, state
+
+        return _confirm_wrap(state)
+
+    if status in ("Arrived","Unloading"):
+        if "unloading_status" not in state:
+            us = extract_unloading(latest_user_text)
+            if us: state["unloading_status"] = us
+        if "pod_ack" not in state:
+            state["pod_ack"] = False
+
+        if "unloading_status" not in state:
+            return "Thanks for the arrival update. What’s the unloading status (door number / waiting for lumper / detention)?", False, state
+        if not state.get("pod_ack"):
+            state["pod_ack"] = True
+            return "Please remember to capture the POD after unload. A acknowledged?", False, state
+
+        return _confirm_wrap(state)
+
+    if not state.get("opened"):
+        state["opened"] = True
+        return "Hi, this is Dispatch checking on your load. Could you give me a quick status update?", False, state
+
+    return "Thanks. Anything else I should record?", False, state
+
+
+legacy_draft_reply = draft_reply
+
+
+# ---- corpus ----
+
+UTTERANCES = (
+    "", "??", "ok", "yes", "later", "hi", "Hi there", "I'm driving on I-40 near Amarillo, TX",
+    "rolling down US-287", "hwy 5 northbound", "about 45 minutes out", "ETA 3:45 pm",
+    "in 2 hrs", "running late, traffic is bad", "stuck behind construction", "weather delay",
+    "arrived and checked in", "at dock now", "in door 7", "waiting for lumper", "detention again",
+    "unloading at door 12", "got it, POD will do", "had an accident", "tire blowout on I-35",
+    "engine trouble", "feeling faint", "all good, no issues", "Dallas, TX by 5:00 pm",
+    "police detour on highway 9", "not sure", "yeah the load is fine", "fire in the trailer",
+)
+
+
+def conversations(n: int, seed: int = 3):
+    rng = random.Random(seed)
+    for _ in range(n):
+        yield [rng.choice(UTTERANCES) for _ in range(rng.randint(1, 8))]
+
+
+def check_equivalence(n: int) -> int:
+    turns = 0
+    for conv in conversations(n, seed=11):
+        old_state, new_state = {}, {}
+        for text in conv:
+            old = legacy_draft_reply(text, old_state)
+            new = dialogue_policy.DEFAULT.step(text, new_state)
+            turns += 1
+            if old != new:
+                raise SystemExit(f"mismatch on {conv!r} at {text!r}:\nlegacy={old}\npolicy={new}")
+            old_state, new_state = old[2], new[2]
+            if old[1]:
+                break
+    return turns
+
+
+def _latencies(fn, convs) -> list:
+    out = []
+    for conv in convs:
+        state: dict = {}
+        for text in conv:
+            start = time.perf_counter()
+            _, end, state = fn(text, state)
+            out.append((time.perf_counter() - start) * 1000)
+            if end:
+                break
+    return out
+
+
+def _summary(samples: list) -> dict:
+    s = sorted(samples)
+    pick = lambda q: round(s[min(len(s) - 1, int(q * len(s)))], 4)
+    return {"turns": len(s), "p50_ms": pick(0.5), "p95_ms": pick(0.95), "p99_ms": pick(0.99), "max_ms": round(s[-1], 4)}
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--conversations", type=int, default=2000)
+    ap.add_argument("--out", default=None, help="write results JSON here")
+    args = ap.parse_args()
+
+    checked = check_equivalence(args.conversations)
+    convs = list(conversations(args.conversations))
+    custom = dialogue_policy.policy_for({"dialogue_policy": {"noise": {"max_retries": 3}}}, ["fire", "jackknife:Accident"])
+    results = {
+        "equivalence_turns_checked": checked,
+        "legacy": _summary(_latencies(legacy_draft_reply, convs)),
+        "policy_default": _summary(_latencies(dialogue_policy.DEFAULT.step, convs)),
+        "policy_custom_agent": _summary(_latencies(custom.step, convs)),
+    }
+    print(json.dumps(results, indent=2))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+summarize_transcript benchmark: the original multi-scan implementation vs the
+shared extraction engine (app/services/extraction.py).
+
+Also cross-checks that both produce the same structured payload on a fuzzed
+corpus before timing anything.
+
+    cd backend && python benchmarks/bench_extraction.py --turns 200,2000,10000
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.services.extraction import Features, summarize  # noqa: E402
+
+
+# ---- reference: the pre-engine implementation, verbatim ----
+
+def legacy_summarize_transcript(text: str) -> dict:
+    t = (text or "").lower()
+
+    if any(k in t for k in ["accident","crash","collision","blowout","breakdown","medical"]):
+        return {
+            "call_outcome": "Emergency Escalation",
+            "emergency_type": ("Accident" if "accident" in t or "crash" in t else
+                               "Breakdown" if "blowout" in t or "breakdown" in t else
+                               "Medical" if "medical" in t else "Other"),
+            "safety_status": "Driver confirmed safe" if "i'm safe" in t or "i am safe" in t else "Unknown",
+            "injury_status": "No injuries reported" if "no injur" in t else "Unknown",
+            "emergency_location": _legacy_first(r"(i-\d+|us-\d+|mile\s*marker\s*\d+|[A-Z][a-z]+,\s*[A-Z]{2})", t),
+            "load_secure": "true" if "load secure" in t else "false" if "load not secure" in t else "unknown",
+            "escalation_status": "Connected to Human Dispatcher",
+        }
+
+    status = ("Unloading" if "unloading" in t or "lumper" in t or "detention" in t else
+              "Arrived" if "arrived" in t or "checked in" in t or "in door" in t else
+              "Delayed" if "delay" in t or "late" in t else "Driving")
+
+    return {
+        "call_outcome": "Arrival Confirmation" if status in ("Arrived","Unloading") else "In-Transit Update",
+        "driver_status": status,
+        "current_location": _legacy_first(r"(i-\d+|us-\d+|hwy\s*\d+|[A-Z][a-z]+,\s*[A-Z]{2})", t),
+        "eta": _legacy_first(r"(\d{1,2}:\d{2}\s*(?:am|pm)?)|(\d+\s*(?:min|mins|minutes|hr|hrs|hours))", t),
+        "delay_reason": _legacy_first(r"(traffic|weather|construction|breakdown|accident|police|detour)", t, title=True) or "None",
+        "unloading_status": _legacy_first(r"(door\s*\d+|in\s*door|waiting\s*for\s*lumper|detention|unloading)", t, title=True) or "N/A",
+        "pod_reminder_acknowledged": "true" if "pod" in t and ("ok" in t or "will do" in t) else "false",
+    }
+
+
+def _legacy_first(pattern: str, text: str, title: bool = False):
+    m = re.search(pattern, text, re.I)
+    if not m: return None
+    s = m.group(0)
+    return s.title() if title else s
+
+
+# ---- corpus ----
+
+FILLER = ("the", "load", "is", "on", "schedule", "copy", "that", "thanks", "roger", "yeah",
+          "driving", "now", "about", "north", "exit", "fuel", "stop", "and", "then", "route")
+SIGNAL = ("I-40", "US-287", "hwy 5", "Dallas, TX", "Tulsa,OK", "mile marker 112", "3:45 PM",
+          "45 minutes", "2 hrs", "traffic", "weather", "construction", "police", "detour",
+          "door 7", "in door", "waiting for lumper", "detention", "unloading", "arrived",
+          "checked in", "delayed", "running late", "POD", "ok", "will do", "accident",
+          "blowout", "medical", "I'm safe", "no injuries", "load secure", "load not secure",
+          ",", ", ", "x, y", "a,bc")
+
+
+def make_transcript(turns: int, rng: random.Random, signal_rate: float) -> str:
+    lines = []
+    for i in range(turns):
+        words = [rng.choice(SIGNAL) if rng.random() < signal_rate else rng.choice(FILLER)
+                 for _ in range(rng.randint(4, 18))]
+        lines.append(("Driver: " if i % 2 else "Agent: ") + " ".join(words))
+    return "\n".join(lines)
+
+
+def check_equivalence(samples: int = 3000) -> None:
+    rng = random.Random(7)
+    for i in range(samples):
+        text = make_transcript(rng.randint(1, 12), rng, rng.choice((0.0, 0.02, 0.1, 0.4)))
+        old, new = legacy_summarize_transcript(text), summarize(Features(text))
+        if old != new:
+            raise SystemExit(f"mismatch on sample {i}:\n{text}\nlegacy={old}\nengine={new}")
+
+
+def _bench(fn, text: str, repeats: int) -> float:
+    fn(text)
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn(text)
+    return (time.perf_counter() - start) / repeats * 1000
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--turns", default="200,2000,10000")
+    ap.add_argument("--repeats", type=int, default=20)
+    ap.add_argument("--out", default=None, help="write results JSON here")
+    args = ap.parse_args()
+
+    check_equivalence()
+    rng = random.Random(1)
+    results = {}
+    for turns in [int(x) for x in args.turns.split(",") if x]:
+        # Sparse signal: the realistic worst case, where most scans run to the end.
+        text = make_transcript(turns, rng, 0.002)
+        legacy = _bench(legacy_summarize_transcript, text, args.repeats)
+        engine = _bench(lambda t: summarize(Features(t)), text, args.repeats)
+        results[str(turns)] = {
+            "chars": len(text),
+            "legacy_ms": round(legacy, 3),
+            "engine_ms": round(engine, 3),
+            "speedup": round(legacy / engine, 2) if engine else None,
+        }
+        print(json.dumps({"turns": turns, **results[str(turns)]}))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
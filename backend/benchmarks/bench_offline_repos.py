@@ -0,0 +1,123 @@
+"""
+Offline repo/router benchmark on the fake PostgREST (SUPABASE_BACKEND=fake).
+
+Seeds the in-process store with N drivers/calls, then times the real code paths:
+conversations list (offset and cursor pages, substring search), the metrics
+page-walk fallback, and CallLogRepo / DriversRepo round trips. --latency-ms
+adds a fixed per-request delay to model a remote database. The fake scans rows
+linearly, so compare runs against each other (and postgrest_requests), not
+against production latencies.
+
+    cd backend && python benchmarks/bench_offline_repos.py --rows 50000 --latency-ms 5
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import datetime as dt
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+STATUSES = ("Driving", "Delayed", "Arrived", "Unloading")
+PHRASES = ("stuck in traffic on I-40", "arrived and checked in", "waiting for lumper",
+           "tire blowout near Tulsa, OK", "about 45 minutes out", "weather delay")
+
+
+def seed(store, rows: int, drivers: int, rng: random.Random) -> None:
+    store.reset()
+    store.insert("agent", [{"name": "Bench agent"}])
+    store.insert("driver", [{"name": f"Driver {i}", "phone_number": f"+1555{i:07d}"} for i in range(drivers)])
+    start = dt.datetime(2026, 1, 1, tzinfo=dt.timezone.utc)
+    store.insert("calllog", [{
+        "created_at": (start + dt.timedelta(minutes=i)).isoformat(),
+        "provider_call_id": f"{rng.choice(('retell', 'pipecat'))}_{i}",
+        "driver_id": rng.randint(1, drivers),
+        "load_number": f"LOAD-{i % 500}",
+        "status": "ended",
+        "scenario": "Dispatch",
+        "transcript": "Driver: " + " ".join(rng.sample(PHRASES, 2)),
+        "structured_payload": {"driver_status": rng.choice(STATUSES), "delay_minutes": rng.randint(0, 60)},
+    } for i in range(rows)])
+
+
+async def _time(label: str, fn, repeats: int) -> dict:
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        await fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    out = {"median_ms": round(statistics.median(samples), 2), "max_ms": round(max(samples), 2)}
+    print(json.dumps({label: out}))
+    return out
+
+
+async def run(opts) -> dict:
+    os.environ.update({
+        "SUPABASE_BACKEND": "fake", "FAKE_POSTGREST_LATENCY_MS": str(opts.latency_ms),
+        "SUPABASE_URL": "http://fake", "SUPABASE_SERVICE_KEY": "bench",
+        "RETELL_API_KEY": "bench", "RETELL_AGENT_ID": "bench",
+    })
+    from app.services import fake_postgrest
+    from app.services.calllog_repo import CallLogRepo
+    from app.services.drivers_repo import DriversRepo
+    from app.services.metrics_service import fetch_metrics
+    from app.api.v1.routers.conversations import _fetch_conversations
+
+    rng = random.Random(5)
+    seed(fake_postgrest.store, opts.rows, opts.drivers, rng)
+    first_page = {}
+
+    async def list_offset():
+        rows, _, cur = await _fetch_conversations(None, None, None, None, None, None, page=5, limit=50)
+        first_page["cursor"] = cur
+
+    async def list_cursor():
+        await _fetch_conversations(None, None, None, None, None, None, page=1, limit=50,
+                                   cursor=first_page["cursor"], count="none")
+
+    async def search():
+        await _fetch_conversations("lumper", None, None, "Arrived", None, None, page=1, limit=50)
+
+    async def metrics():
+        await fetch_metrics(None, None, None, source="live")
+
+    async def patch():
+        await CallLogRepo.patch_by_provider(f"retell_{rng.randrange(opts.rows)}", {"status": "updated"})
+
+    async def driver():
+        DriversRepo.invalidate()
+        await DriversRepo.ensure_driver_id(None, f"+1555{rng.randrange(opts.drivers):07d}")
+
+    results = {"rows": opts.rows, "latency_ms": opts.latency_ms}
+    results["conversations_offset_page"] = await _time("conversations_offset_page", list_offset, opts.repeats)
+    results["conversations_cursor_page"] = await _time("conversations_cursor_page", list_cursor, opts.repeats)
+    results["conversations_search"] = await _time("conversations_search", search, opts.repeats)
+    results["metrics_page_walk"] = await _time("metrics_page_walk", metrics, max(1, opts.repeats // 5))
+    results["calllog_patch"] = await _time("calllog_patch", patch, opts.repeats)
+    results["driver_lookup_uncached"] = await _time("driver_lookup_uncached", driver, opts.repeats)
+    results["postgrest_requests"] = fake_postgrest.store.requests
+    return results
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--rows", type=int, default=50000)
+    ap.add_argument("--drivers", type=int, default=2000)
+    ap.add_argument("--latency-ms", type=float, default=0.0)
+    ap.add_argument("--repeats", type=int, default=10)
+    ap.add_argument("--out", default=None, help="write results JSON here")
+    opts = ap.parse_args()
+
+    results = asyncio.run(run(opts))
+    if opts.out:
+        with open(opts.out, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
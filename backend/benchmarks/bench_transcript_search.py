@@ -0,0 +1,112 @@
+"""
+Transcript search benchmark: ilike substring scan vs tsvector/GIN full-text search.
+
+Seeds a scratch copy of the calllog transcript shape (same generated column and
+GIN index as migrations/006) at each size, then times both query paths with
+EXPLAIN ANALYZE. Needs a disposable Postgres reachable via DATABASE_URL.
+
+    python benchmarks/bench_transcript_search.py --sizes 10000,100000,1000000 --out search.json
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import statistics
+
+import psycopg
+
+TABLE = "bench_calllog_search"
+
+# Synthetic dispatch transcripts assembled from phrase pools inside Postgres, so
+# seeding 1M rows is a single INSERT ... SELECT.
+SEED_SQL = f"""
+insert into {TABLE} (created_at, transcript)
+select
+  now() - (g || ' minutes')::interval,
+  'Agent: Hi, this is Dispatch checking on load ' || g || E'.\\n'
+  || 'Driver: ' || (array['I am on I-' || (g %% 99) || ' near Dallas, TX',
+                          'Stuck in traffic on US-' || (g %% 70),
+                          'Arrived and checked in at door ' || (g %% 40),
+                          'Had a blowout, waiting for roadside service',
+                          'Running late because of weather and construction'])[1 + g %% 5]
+  || E'.\\nAgent: What is your ETA?\\n'
+  || 'Driver: About ' || (g %% 90) || ' minutes, waiting for lumper after that.'
+from generate_series(1, %(n)s) g;
+"""
+
+QUERIES = ["blowout", "lumper", "weather construction", "checked in"]
+
+
+def _setup(cur, n: int) -> None:
+    cur.execute(f"drop table if exists {TABLE}")
+    cur.execute(f"""
+        create table {TABLE} (
+          id bigserial primary key,
+          created_at timestamptz not null default now(),
+          transcript text,
+          transcript_tsv tsvector generated always as (to_tsvector('english', coalesce(transcript, ''))) stored
+        )
+    """)
+    cur.execute(SEED_SQL, {"n": n})
+    cur.execute(f"create index on {TABLE} using gin (transcript_tsv)")
+    cur.execute(f"analyze {TABLE}")
+
+
+def _exec_ms(cur, sql: str, params: dict) -> float:
+    cur.execute("explain (analyze, format json) " + sql, params)
+    plan = cur.fetchone()[0]
+    return float(plan[0]["Execution Time"])
+
+
+def _time(cur, sql: str, params: dict, repeats: int) -> dict:
+    _exec_ms(cur, sql, params)  # warm the cache
+    samples = [_exec_ms(cur, sql, params) for _ in range(repeats)]
+    return {"median_ms": round(statistics.median(samples), 3), "max_ms": round(max(samples), 3)}
+
+
+def run(dsn: str, sizes: list[int], repeats: int) -> dict:
+    results: dict = {"queries": QUERIES, "sizes": {}}
+    with psycopg.connect(dsn, autocommit=True) as conn, conn.cursor() as cur:
+        for n in sizes:
+            _setup(cur, n)
+            per_query = {}
+            for q in QUERIES:
+                ilike = _time(
+                    cur,
+                    f"select id, created_at from {TABLE} where transcript ilike %(p)s "
+                    "order by created_at desc limit 20",
+                    {"p": f"%{q}%"}, repeats,
+                )
+                fts = _time(
+                    cur,
+                    f"select id, ts_rank_cd(transcript_tsv, q) as rank, "
+                    "ts_headline('english', transcript, q) as snippet "
+                    f"from {TABLE}, websearch_to_tsquery('english', %(q)s) q "
+                    "where transcript_tsv @@ q order by rank desc limit 20",
+                    {"q": q}, repeats,
+                )
+                per_query[q] = {"ilike": ilike, "fts": fts}
+            results["sizes"][str(n)] = per_query
+            print(json.dumps({"rows": n, **per_query}))
+        cur.execute(f"drop table if exists {TABLE}")
+    return results
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--dsn", default=os.getenv("DATABASE_URL", "").replace("postgresql+psycopg://", "postgresql://"))
+    ap.add_argument("--sizes", default="10000,100000,1000000")
+    ap.add_argument("--repeats", type=int, default=5)
+    ap.add_argument("--out", default=None, help="write results JSON here")
+    args = ap.parse_args()
+    if not args.dsn:
+        raise SystemExit("DATABASE_URL (or --dsn) is required")
+
+    results = run(args.dsn, [int(x) for x in args.sizes.split(",") if x], args.repeats)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+"""
+Replay load test for the Retell-facing endpoints.
+
+Starts the FastAPI app in-process (uvicorn on a loopback port) against a local
+PostgREST stand-in, then replays conversations at a fixed concurrency:
+
+  * each call opens /api/v1/retell/llm-webhook/{call_id}, sends one
+    response_required frame per driver turn (optionally with update_only /
+    ping_pong frames in between) and times each reply;
+  * when the conversation ends it posts call_ended to /api/v1/retell/webhook.
+
+--postgrest fake (default) uses SUPABASE_BACKEND=fake, the in-process store from
+app/services/fake_postgrest.py; --postgrest stub serves a canned-response ASGI app
+on its own port so the pooled HTTP client path is exercised too.
+
+Reports turn and webhook latency percentiles, throughput and event-loop lag, and
+writes everything as JSON so runs can be diffed between commits.
+
+    cd backend && python benchmarks/loadtest_retell.py --calls 200 --concurrency 50 --out before.json
+    python benchmarks/loadtest_retell.py --replay calls.jsonl --db-latency-ms 20 --out after.json
+
+--replay takes JSONL: one conversation per line, either a list of
+{"role", "content"} utterances or a Retell call object with transcript_object.
+Only the "user" utterances are replayed; agent lines come from the backend.
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+DRIVER_TURNS = (
+    "Hi, I'm rolling on I-40 near Amarillo, TX", "about 45 minutes out", "running late, traffic is bad",
+    "stuck behind construction", "ETA 3:45 pm", "arrived and checked in", "in door 7",
+    "waiting for lumper", "got it, POD will do", "all good", "US-287 northbound", "weather delay",
+)
+
+
+# ---- stub PostgREST -------------------------------------------------------
+
+class StubPostgrest:
+    """
+    Minimal ASGI PostgREST stand-in: every read returns a single-row result,
+    every write echoes a row back, rpc calls return 1. `latency` adds a fixed
+    delay per request to mimic a remote database.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.requests = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            while True:
+                msg = await receive()
+                if msg["type"] == "lifespan.startup":
+                    await send({"type": "lifespan.startup.complete"})
+                elif msg["type"] == "lifespan.shutdown":
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+        self.requests += 1
+        more = True
+        while more:
+            more = (await receive()).get("more_body", False)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        path = scope["path"]
+        body = b"1" if "/rpc/" in path else b'[{"id": 1}]'
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-type", b"application/json"), (b"content-range", b"0-0/1")]})
+        await send({"type": "http.response.body", "body": body})
+
+
+# ---- measurement helpers --------------------------------------------------
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _pct(samples: List[float]) -> Dict[str, Any]:
+    if not samples:
+        return {"count": 0}
+    s = sorted(samples)
+    pick = lambda q: round(s[min(len(s) - 1, int(q * len(s)))], 3)
+    return {"count": len(s), "p50": pick(0.5), "p95": pick(0.95), "p99": pick(0.99),
+            "max": round(s[-1], 3), "mean": round(statistics.fmean(s), 3)}
+
+
+async def _loop_lag(samples: List[float], stop: asyncio.Event, interval: float = 0.01) -> None:
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(max(0.0, (time.perf_counter() - start - interval) * 1000))
+
+
+def _git_rev() -> str | None:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return None
+
+
+# ---- conversations ---------------------------------------------------------
+
+def load_conversations(path: str | None, calls: int, seed: int) -> List[List[str]]:
+    if path:
+        convs = []
+        with open(path) as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                obj = json.loads(line)
+                utts = obj if isinstance(obj, list) else (obj.get("transcript_object") or [])
+                turns = [u.get("content", "") for u in utts if (u.get("role") or "").lower() == "user"]
+                if turns:
+                    convs.append(turns)
+        if not convs:
+            raise SystemExit(f"no conversations in {path}")
+        return [convs[i % len(convs)] for i in range(calls)]
+    rng = random.Random(seed)
+    return [[rng.choice(DRIVER_TURNS) for _ in range(rng.randint(3, 8))] for _ in range(calls)]
+
+
+# ---- one simulated call -----------------------------------------------------
+
+async def run_call(base: str, http, turns: List[str], opts, out: Dict[str, List[float]], errors: List[str]) -> None:
+    import websockets
+
+    call_id = f"load-{uuid.uuid4().hex[:12]}"
+    transcript: List[Dict[str, str]] = []
+    try:
+        async with websockets.connect(f"{base.replace('http', 'ws', 1)}/api/v1/retell/llm-webhook/{call_id}") as ws:
+            await ws.recv()  # config
+            greeting = json.loads(await ws.recv())
+            transcript.append({"role": "agent", "content": greeting.get("content", "")})
+            for i, text in enumerate(turns, start=1):
+                transcript.append({"role": "user", "content": text})
+                for _ in range(opts.updates_per_turn):
+                    await ws.send(json.dumps({"interaction_type": "update_only", "transcript": transcript}))
+                start = time.perf_counter()
+                await ws.send(json.dumps({"interaction_type": "response_required", "response_id": i,
+                                          "transcript": transcript}))
+                while True:
+                    msg = json.loads(await ws.recv())
+                    if msg.get("response_id") == i:
+                        break
+                out["turn_ms"].append((time.perf_counter() - start) * 1000)
+                transcript.append({"role": "agent", "content": msg.get("content", "")})
+                if msg.get("end_call"):
+                    break
+                if opts.think_ms:
+                    await asyncio.sleep(opts.think_ms / 1000)
+    except Exception as e:
+        errors.append(f"ws {call_id}: {e!r}")
+        return
+
+    payload = {"event": "call_ended", "call": {
+        "call_id": call_id, "transcript_object": transcript,
+        "metadata": {"provider_call_id": call_id, "load_number": "LOAD-1"},
+        "retell_llm_dynamic_variables": {"driver_name": "Load Test", "driver_phone": "+15550000000"},
+    }}
+    start = time.perf_counter()
+    try:
+        r = await http.post(f"{base}/api/v1/retell/webhook", json=payload)
+        if r.status_code >= 400:
+            errors.append(f"webhook {call_id}: HTTP {r.status_code}")
+    except Exception as e:
+        errors.append(f"webhook {call_id}: {e!r}")
+    out["webhook_ms"].append((time.perf_counter() - start) * 1000)
+
+
+# ---- driver -------------------------------------------------------------------
+
+async def _serve(app, port: int):
+    import uvicorn
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", lifespan="on"))
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+    return server, task
+
+
+async def run(opts) -> Dict[str, Any]:
+    import httpx
+
+    stub = StubPostgrest(latency=opts.db_latency_ms / 1000)
+    stub_port, app_port = _free_port(), _free_port()
+    os.environ.update({
+        "SUPABASE_URL": f"http://127.0.0.1:{stub_port}", "SUPABASE_SERVICE_KEY": "loadtest",
+        "RETELL_API_KEY": "loadtest", "RETELL_AGENT_ID": "loadtest", "RETELL_WEBHOOK_SECRET": "",
+        "SUPABASE_BACKEND": "fake" if opts.postgrest == "fake" else "http",
+        "FAKE_POSTGREST_LATENCY_MS": str(opts.db_latency_ms),
+    })
+    from app.main import app  # imported after env so settings pick up the stand-in
+    from app.services import fake_postgrest
+
+    servers = []
+    if opts.postgrest == "stub":
+        servers.append(await _serve(stub, stub_port))
+    else:
+        fake_postgrest.store.reset()
+        fake_postgrest.store.insert("agent", [{"name": "Load test agent"}])
+    servers.insert(0, await _serve(app, app_port))
+    base = f"http://127.0.0.1:{app_port}"
+
+    convs = load_conversations(opts.replay, opts.calls, opts.seed)
+    out: Dict[str, List[float]] = {"turn_ms": [], "webhook_ms": []}
+    lag: List[float] = []
+    errors: List[str] = []
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(_loop_lag(lag, stop))
+    sem = asyncio.Semaphore(opts.concurrency)
+
+    async with httpx.AsyncClient(timeout=30) as http:
+        async def one(turns):
+            async with sem:
+                await run_call(base, http, turns, opts, out, errors)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(t) for t in convs))
+        elapsed = time.perf_counter() - started
+        server_stats = (await http.get(f"{base}/api/v1/retell/llm-webhook/stats")).json()
+
+    stop.set()
+    await lag_task
+    for server, task in servers:
+        server.should_exit = True
+        await task
+
+    return {
+        "commit": _git_rev(),
+        "config": {k: v for k, v in vars(opts).items() if k != "out"},
+        "elapsed_s": round(elapsed, 3),
+        "calls": len(convs),
+        "turns": len(out["turn_ms"]),
+        "throughput": {"turns_per_s": round(len(out["turn_ms"]) / elapsed, 2),
+                       "calls_per_s": round(len(convs) / elapsed, 2)},
+        "turn_latency_ms": _pct(out["turn_ms"]),
+        "webhook_latency_ms": _pct(out["webhook_ms"]),
+        "event_loop_lag_ms": _pct(lag),
+        "postgrest_requests": stub.requests if opts.postgrest == "stub" else fake_postgrest.store.requests,
+        "server_stats": server_stats,
+        "errors": len(errors),
+        "error_samples": errors[:10],
+    }
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--calls", type=int, default=200)
+    ap.add_argument("--concurrency", type=int, default=50)
+    ap.add_argument("--replay", default=None, help="JSONL of recorded conversations")
+    ap.add_argument("--updates-per-turn", type=int, default=1, help="update_only frames before each turn")
+    ap.add_argument("--think-ms", type=int, default=0, help="pause between turns")
+    ap.add_argument("--postgrest", choices=("fake", "stub"), default="fake")
+    ap.add_argument("--db-latency-ms", type=float, default=0.0, help="added latency per PostgREST request")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--out", default=None, help="write results JSON here")
+    opts = ap.parse_args()
+
+    results = asyncio.run(run(opts))
+    print(json.dumps(results, indent=2))
+    if opts.out:
+        with open(opts.out, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+-- Server-side aggregation for GET /api/v1/metrics.
+-- Counts and averages are computed in Postgres so the API never pulls raw calllog rows.
+
+create index if not exists ix_calllog_created_at on public.calllog (created_at);
+create index if not exists ix_calllog_provider_call_id on public.calllog (provider_call_id text_pattern_ops);
+
+create or replace function public.calllog_metrics(
+  p_from   timestamptz default null,
+  p_to     timestamptz default null,
+  p_vendor text        default null   -- 'retell' | 'pipecat' | null (all)
+) returns json
+language sql stable
+as $$
+  with base as (
+    select
+      structured_payload->>'driver_status' as driver_status,
+      structured_payload->>'scenario'      as scenario,
+      case when structured_payload->>'delay_minutes' ~ '^-?\d+$'
+           then (structured_payload->>'delay_minutes')::int else 0 end as delay_minutes
+    from public.calllog
+    where (p_from is null or created_at >= p_from)
+      and (p_to   is null or created_at <= p_to)
+      and (p_vendor is null or provider_call_id like p_vendor || '\_%')
+  ), agg as (
+    select
+      count(*)                                             as total_calls,
+      count(*) filter (where driver_status = 'Arrived')    as arrivals,
+      count(*) filter (where driver_status = 'Delayed')    as delays,
+      count(*) filter (where scenario = 'Emergency')       as emergencies,
+      coalesce(sum(delay_minutes), 0)                      as delay_sum
+    from base
+  )
+  select json_build_object(
+    'total_calls',       total_calls,
+    'arrivals',          arrivals,
+    'delays',            delays,
+    'emergencies',       emergencies,
+    'avg_delay_minutes', round(delay_sum::numeric / greatest(delays, 1), 2)
+  )
+  from agg;
+$$;
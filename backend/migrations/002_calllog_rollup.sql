@@ -0,0 +1,184 @@
+-- Incrementally maintained per-hour / per-day metrics rollups.
+-- Writers call calllog_rollup_apply() when a call reaches a final state; readers
+-- sum O(buckets) rows instead of scanning calllog.
+
+create table if not exists public.calllog_rollup (
+  bucket                 text        not null check (bucket in ('hour', 'day')),
+  bucket_start           timestamptz not null,
+  vendor                 text        not null,
+  calls                  bigint      not null default 0,
+  arrivals               bigint      not null default 0,
+  delays                 bigint      not null default 0,
+  unloading              bigint      not null default 0,
+  driving                bigint      not null default 0,
+  emergencies            bigint      not null default 0,
+  arrival_confirmations  bigint      not null default 0,
+  in_transit_updates     bigint      not null default 0,
+  delay_minutes_sum      bigint      not null default 0,
+  pipecat_sessions       bigint      not null default 0,
+  pipecat_duration_secs  numeric     not null default 0,
+  pipecat_tokens         bigint      not null default 0,
+  primary key (bucket, bucket_start, vendor)
+);
+
+-- One row per (call, kind) already folded into the rollups; makes retried
+-- webhooks / duplicate finalize calls no-ops. The applied delta and its bucket
+-- are kept so a later, better outcome for the same call can replace it.
+create table if not exists public.calllog_rollup_applied (
+  call_key   text        not null,
+  kind       text        not null,
+  applied_at timestamptz not null default now(),
+  primary key (call_key, kind)
+);
+alter table public.calllog_rollup_applied
+  add column if not exists vendor text,
+  add column if not exists at     timestamptz,
+  add column if not exists delta  jsonb;
+
+-- Add p_sign * p_delta to the hour and day buckets containing p_at.
+create or replace function public.calllog_rollup_add(
+  p_vendor text,
+  p_at     timestamptz,
+  p_delta  jsonb,
+  p_sign   integer default 1
+) returns void
+language plpgsql
+as $$
+declare
+  b text;
+begin
+  foreach b in array array['hour', 'day'] loop
+    insert into public.calllog_rollup as r (
+      bucket, bucket_start, vendor,
+      calls, arrivals, delays, unloading, driving, emergencies,
+      arrival_confirmations, in_transit_updates, delay_minutes_sum,
+      pipecat_sessions, pipecat_duration_secs, pipecat_tokens
+    ) values (
+      b, date_trunc(b, coalesce(p_at, now())), p_vendor,
+      p_sign * coalesce((p_delta->>'calls')::bigint, 0),
+      p_sign * coalesce((p_delta->>'arrivals')::bigint, 0),
+      p_sign * coalesce((p_delta->>'delays')::bigint, 0),
+      p_sign * coalesce((p_delta->>'unloading')::bigint, 0),
+      p_sign * coalesce((p_delta->>'driving')::bigint, 0),
+      p_sign * coalesce((p_delta->>'emergencies')::bigint, 0),
+      p_sign * coalesce((p_delta->>'arrival_confirmations')::bigint, 0),
+      p_sign * coalesce((p_delta->>'in_transit_updates')::bigint, 0),
+      p_sign * coalesce((p_delta->>'delay_minutes_sum')::bigint, 0),
+      p_sign * coalesce((p_delta->>'pipecat_sessions')::bigint, 0),
+      p_sign * coalesce((p_delta->>'pipecat_duration_secs')::numeric, 0),
+      p_sign * coalesce((p_delta->>'pipecat_tokens')::bigint, 0)
+    )
+    on conflict (bucket, bucket_start, vendor) do update set
+      calls                 = r.calls                 + excluded.calls,
+      arrivals              = r.arrivals              + excluded.arrivals,
+      delays                = r.delays                + excluded.delays,
+      unloading             = r.unloading             + excluded.unloading,
+      driving               = r.driving               + excluded.driving,
+      emergencies           = r.emergencies           + excluded.emergencies,
+      arrival_confirmations = r.arrival_confirmations + excluded.arrival_confirmations,
+      in_transit_updates    = r.in_transit_updates    + excluded.in_transit_updates,
+      delay_minutes_sum     = r.delay_minutes_sum     + excluded.delay_minutes_sum,
+      pipecat_sessions      = r.pipecat_sessions      + excluded.pipecat_sessions,
+      pipecat_duration_secs = r.pipecat_duration_secs + excluded.pipecat_duration_secs,
+      pipecat_tokens        = r.pipecat_tokens        + excluded.pipecat_tokens;
+  end loop;
+end;
+$$;
+
+-- Fold p_delta in once per (call, kind); true when the rollups changed. With
+-- p_replace an already applied delta is swapped for this one in its original
+-- buckets (Retell's call_analyzed refining call_ended), still counting the call once.
+drop function if exists public.calllog_rollup_apply(text, text, text, timestamptz, jsonb);
+create or replace function public.calllog_rollup_apply(
+  p_call_key text,
+  p_kind     text,
+  p_vendor   text,
+  p_at       timestamptz,
+  p_delta    jsonb,
+  p_replace  boolean default false
+) returns boolean
+language plpgsql
+as $$
+declare
+  prev public.calllog_rollup_applied;
+begin
+  insert into public.calllog_rollup_applied (call_key, kind, vendor, at, delta)
+  values (p_call_key, p_kind, p_vendor, coalesce(p_at, now()), p_delta)
+  on conflict do nothing;
+  if found then
+    perform public.calllog_rollup_add(p_vendor, coalesce(p_at, now()), p_delta);
+    return true;
+  end if;
+  if not p_replace then
+    return false;
+  end if;
+
+  select * into prev from public.calllog_rollup_applied
+   where call_key = p_call_key and kind = p_kind
+   for update;
+  -- Rows written before the delta was recorded cannot be undone; keep them.
+  if prev.delta is null or prev.delta = p_delta then
+    return false;
+  end if;
+  perform public.calllog_rollup_add(prev.vendor, prev.at, prev.delta, -1);
+  perform public.calllog_rollup_add(prev.vendor, prev.at, p_delta);
+  update public.calllog_rollup_applied
+     set delta = p_delta, applied_at = now()
+   where call_key = p_call_key and kind = p_kind;
+  return true;
+end;
+$$;
+
+-- Backfill: fold calls that ended before the rollups existed, through
+-- calllog_rollup_apply() itself, so the (call, kind) ledger makes re-running this
+-- file - or a later finalize of the same call - a no-op. Rows are read as jsonb so
+-- optional columns (extra) may be missing. Buckets use call_end_time (else created_at).
+do $$
+declare
+  c     record;
+  sp    jsonb;
+  ex    jsonb;
+  vend  text;
+  delta jsonb;
+begin
+  for c in
+    select j->>'provider_call_id' as call_key,
+           coalesce(nullif(j->>'call_end_time', '')::timestamptz, (j->>'created_at')::timestamptz) as at,
+           coalesce(j->'structured_payload', '{}'::jsonb) as payload,
+           coalesce(j->'extra', '{}'::jsonb) as metrics
+      from (select to_jsonb(cl) as j from public.calllog cl) t
+     where j->>'status' = 'ended'
+       and coalesce(j->>'provider_call_id', '') <> ''
+  loop
+    sp := case when jsonb_typeof(c.payload) = 'object' then c.payload else '{}'::jsonb end;
+    ex := case when jsonb_typeof(c.metrics) = 'object' then c.metrics else '{}'::jsonb end;
+    vend := case when lower(c.call_key) like 'pipecat\_%' then 'pipecat' else 'retell' end;
+
+    delta := jsonb_build_object('calls', 1)
+      || case sp->>'driver_status'
+           when 'Arrived'   then '{"arrivals": 1}'::jsonb
+           when 'Delayed'   then '{"delays": 1}'::jsonb
+           when 'Unloading' then '{"unloading": 1}'::jsonb
+           when 'Driving'   then '{"driving": 1}'::jsonb
+           else '{}'::jsonb end
+      || case sp->>'call_outcome'
+           when 'Emergency Escalation' then '{"emergencies": 1}'::jsonb
+           when 'Arrival Confirmation' then '{"arrival_confirmations": 1}'::jsonb
+           when 'In-Transit Update'    then '{"in_transit_updates": 1}'::jsonb
+           else '{}'::jsonb end
+      || case when sp->>'delay_minutes' ~ '^\d+$'
+              then jsonb_build_object('delay_minutes_sum', (sp->>'delay_minutes')::bigint)
+              else '{}'::jsonb end;
+    perform public.calllog_rollup_apply(c.call_key, 'outcome', vend, c.at, delta);
+
+    if vend = 'pipecat' and ex->>'duration_secs' ~ '^\d+(\.\d+)?$' then
+      perform public.calllog_rollup_apply(c.call_key, 'pipecat_metrics', vend, c.at, jsonb_build_object(
+        'pipecat_sessions', 1,
+        'pipecat_duration_secs', (ex->>'duration_secs')::numeric,
+        'pipecat_tokens', case when coalesce(ex->>'tokens_used', ex->>'tokens_estimated') ~ '^\d+$'
+                               then coalesce(ex->>'tokens_used', ex->>'tokens_estimated')::bigint else 0 end
+      ));
+    end if;
+  end loop;
+end;
+$$;
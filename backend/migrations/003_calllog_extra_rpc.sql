@@ -0,0 +1,55 @@
+-- Parameterized, atomic updates of calllog.extra for RTVI counters.
+-- Replaces string-built exec_sql calls: arguments are bound, plans are cached,
+-- and each update is a single in-row statement (no read-modify-write).
+
+create or replace function public.calllog_incr_extra(pid text, field text, delta integer default 1)
+returns void
+language sql
+as $$
+  update public.calllog
+     set extra = coalesce(extra, '{}'::jsonb)
+              || jsonb_build_object(field, coalesce((extra->>field)::numeric, 0) + delta)
+   where provider_call_id = pid;
+$$;
+
+create or replace function public.calllog_append_keywords(pid text, keywords text[])
+returns void
+language sql
+as $$
+  update public.calllog
+     set extra = coalesce(extra, '{}'::jsonb)
+              || jsonb_build_object('keywords', coalesce(extra->'keywords', '[]'::jsonb) || to_jsonb(keywords))
+   where provider_call_id = pid
+     and cardinality(keywords) > 0;
+$$;
+
+-- Bulk form: p_items is a JSON array of
+--   {"pid": "...", "incr": {"interruptions": 3}, "keywords": ["police"], "set": {"sentiment": "negative"}}
+-- All items are applied in one transaction; returns the number of calllog rows updated.
+create or replace function public.calllog_apply_extra(p_items jsonb)
+returns integer
+language plpgsql
+as $$
+declare
+  item jsonb;
+  n    integer := 0;
+begin
+  for item in select value from jsonb_array_elements(p_items) loop
+    update public.calllog c
+       set extra = coalesce(c.extra, '{}'::jsonb)
+                || coalesce((
+                     select jsonb_object_agg(e.key, coalesce((c.extra->>e.key)::numeric, 0) + e.value::numeric)
+                       from jsonb_each_text(coalesce(item->'incr', '{}'::jsonb)) e
+                   ), '{}'::jsonb)
+                || case when jsonb_array_length(coalesce(item->'keywords', '[]'::jsonb)) > 0
+                        then jsonb_build_object('keywords', coalesce(c.extra->'keywords', '[]'::jsonb) || (item->'keywords'))
+                        else '{}'::jsonb end
+                || coalesce(item->'set', '{}'::jsonb)
+     where c.provider_call_id = item->>'pid';
+    if found then
+      n := n + 1;
+    end if;
+  end loop;
+  return n;
+end;
+$$;
@@ -0,0 +1,2 @@
+-- Supports keyset pagination on (created_at, id) for /api/v1/conversations.
+create index if not exists ix_calllog_created_at_id on public.calllog (created_at desc, id desc);
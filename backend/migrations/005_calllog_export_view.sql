@@ -0,0 +1,31 @@
+-- Flat, export-ready projection of calllog for GET /api/v1/conversations/export.csv.
+-- The transcript snippet is computed here so full transcripts never leave the database.
+-- The driver table is `drivers` or `driver` depending on the deployment (the API
+-- prefers `drivers`, see app/services/schema.py); without either, the driver
+-- columns are null.
+do $do$
+declare
+  drv text := coalesce(
+    case when to_regclass('public.drivers') is not null then 'drivers' end,
+    case when to_regclass('public.driver') is not null then 'driver' end
+  );
+begin
+  execute format($view$
+    create or replace view public.calllog_export as
+    select
+      c.id,
+      c.created_at,
+      %s                                                       as driver_name,
+      %s                                                       as driver_phone,
+      c.load_number,
+      c.structured_payload->>'driver_status'                   as driver_status,
+      c.scenario,
+      left(btrim(replace(coalesce(c.transcript, ''), E'\n', ' ')), 500) as transcript_snippet,
+      c.transcript                                             -- filter-only (q); never selected by the API
+    from public.calllog c
+    %s
+  $view$,
+    case when drv is null then 'null::text' else 'd.name' end,
+    case when drv is null then 'null::text' else 'd.phone_number' end,
+    case when drv is null then '' else format('left join public.%I d on d.id = c.driver_id', drv) end);
+end $do$;
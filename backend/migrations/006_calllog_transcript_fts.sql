@@ -0,0 +1,58 @@
+-- Full-text transcript search for /api/v1/conversations?search_mode=fts.
+
+alter table public.calllog
+  add column if not exists transcript_tsv tsvector
+  generated always as (to_tsvector('english', coalesce(transcript, ''))) stored;
+
+create index if not exists ix_calllog_transcript_tsv on public.calllog using gin (transcript_tsv);
+
+-- Ranked matches with highlighted snippets. PostgREST applies the remaining
+-- filters, ordering and limit on top of the returned set. The driver table is
+-- resolved like in 005 (`drivers`, else `driver`, else no driver columns).
+do $do$
+declare
+  drv text := coalesce(
+    case when to_regclass('public.drivers') is not null then 'drivers' end,
+    case when to_regclass('public.driver') is not null then 'driver' end
+  );
+begin
+  execute format($fn$
+    create or replace function public.calllog_search(p_query text)
+    returns table (
+      id                 bigint,
+      created_at         timestamptz,
+      load_number        text,
+      status             text,
+      scenario           text,
+      structured_payload jsonb,
+      driver_name        text,
+      driver_phone       text,
+      driver_status      text,
+      rank               real,
+      snippet            text
+    )
+    language sql stable
+    as $body$
+      select
+        c.id::bigint,
+        c.created_at,
+        c.load_number::text,
+        c.status::text,
+        c.scenario::text,
+        c.structured_payload::jsonb,
+        %s,
+        %s,
+        c.structured_payload->>'driver_status',
+        ts_rank_cd(c.transcript_tsv, q),
+        ts_headline('english', coalesce(c.transcript, ''), q,
+                    'StartSel=<mark>, StopSel=</mark>, MaxFragments=2, MaxWords=18, MinWords=6')
+      from public.calllog c
+      cross join websearch_to_tsquery('english', p_query) q
+      %s
+      where c.transcript_tsv @@ q;
+    $body$
+  $fn$,
+    case when drv is null then 'null::text' else 'd.name::text' end,
+    case when drv is null then 'null::text' else 'd.phone_number::text' end,
+    case when drv is null then '' else format('left join public.%I d on d.id = c.driver_id', drv) end);
+end $do$;
@@ -0,0 +1,10 @@
+-- Unique provider_call_id so call start can upsert the calllog row
+-- (POST /calllog?on_conflict=provider_call_id, Prefer: resolution=merge-duplicates)
+-- instead of insert-then-patch. NULLs stay allowed (and distinct).
+--
+-- If this fails on existing duplicates, list them first:
+--   select provider_call_id, count(*) from public.calllog
+--    where provider_call_id is not null group by 1 having count(*) > 1;
+
+create unique index if not exists calllog_provider_call_id_key
+  on public.calllog (provider_call_id);
@@ -0,0 +1,18 @@
+-- Unique phone_number so DriversRepo can upsert drivers in bulk
+-- (POST /driver?on_conflict=phone_number, Prefer: resolution=merge-duplicates)
+-- instead of select-by-phone, select-by-name, insert. NULLs stay allowed (and distinct).
+-- Works for either table name the repo accepts (driver or drivers).
+--
+-- If this fails on existing duplicates, list them first:
+--   select phone_number, count(*) from public.driver
+--    where phone_number is not null group by 1 having count(*) > 1;
+
+do $$
+begin
+  if to_regclass('public.driver') is not null then
+    create unique index if not exists driver_phone_number_key on public.driver (phone_number);
+  end if;
+  if to_regclass('public.drivers') is not null then
+    create unique index if not exists drivers_phone_number_key on public.drivers (phone_number);
+  end if;
+end $$;
@@ -0,0 +1,42 @@
+-- Incremental transcripts for Pipecat calls. The bot streams transcript lines
+-- as they happen; each delta carries `p_seq`, the index of its first line in the
+-- call's transcript. transcript_seq is the number of lines stored so far.
+--
+-- calllog_transcript_append() appends only the lines past transcript_seq, so a
+-- retried or replayed delta is a no-op, and sets structured_payload when given.
+-- Returns the row's transcript_seq afterwards (null when there is no row); a
+-- value below p_seq means lines are missing and the caller must resend from it.
+
+alter table public.calllog
+  add column if not exists transcript_seq integer not null default 0;
+
+create or replace function public.calllog_transcript_append(
+  p_pid text, p_seq integer, p_lines text[], p_summary jsonb default null
+)
+returns integer
+language plpgsql
+as $$
+declare
+  cur   integer;
+  fresh text[];
+begin
+  select transcript_seq into cur
+    from public.calllog
+   where provider_call_id = p_pid
+     for update;
+  if not found then
+    return null;
+  end if;
+  if p_seq > cur or p_seq + coalesce(cardinality(p_lines), 0) <= cur then
+    return cur;
+  end if;
+  fresh := p_lines[(cur - p_seq + 1):];
+  update public.calllog
+     set transcript = case when coalesce(transcript, '') = '' then array_to_string(fresh, E'\n')
+                           else transcript || E'\n' || array_to_string(fresh, E'\n') end,
+         transcript_seq = cur + cardinality(fresh),
+         structured_payload = coalesce(p_summary, structured_payload)
+   where provider_call_id = p_pid;
+  return cur + cardinality(fresh);
+end;
+$$;
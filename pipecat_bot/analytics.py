@@ -0,0 +1,111 @@
+# pipecat_bot/analytics.py
+"""
+Call analytics for finalize: keyword hits, driver/agent turns, estimated
+interruptions and a token estimate, computed in one pass over the transcript.
+
+KeywordMatcher compiles the keyword list once into a single alternation
+`\\b(?:kw1|kw2|...)\\b` and counts every keyword with one scan per line. Two
+keywords that could overlap in text (one contains the other, or one ends with
+the start of the other) would hide each other's matches inside one alternation,
+so those go into separate patterns; each keyword is still counted exactly as a
+standalone `\\b<kw>\\b` search would. The default list compiles to one pattern.
+
+CallAnalytics is incremental: feed() takes new transcript text (a turn, or a
+whole transcript) and only that text is scanned, so the bot can keep the
+analytics current during the call and finalize just reads snapshot().
+"""
+import re
+
+
+_WORD = re.compile(r"\w")
+
+
+def _boundary(s, i):
+    """Whether `\\b` can hold at offset i of s (always possible at the ends: it depends on the neighbours)."""
+    if i <= 0 or i >= len(s):
+        return True
+    return bool(_WORD.match(s[i - 1])) != bool(_WORD.match(s[i]))
+
+
+def _overlaps(a, b):
+    """True if `\\ba\\b` and `\\bb\\b` matches could share characters in some text."""
+    for outer, inner in ((a, b), (b, a)):
+        k = outer.find(inner)
+        while k != -1:
+            if _boundary(outer, k) and _boundary(outer, k + len(inner)):
+                return True
+            k = outer.find(inner, k + 1)
+    for first, second in ((a, b), (b, a)):
+        for i in range(1, min(len(first), len(second))):
+            # `second` starting inside `first`, sharing i characters.
+            if first.endswith(second[:i]) and _boundary(first, len(first) - i) and _boundary(second, i):
+                return True
+    return False
+
+
+class KeywordMatcher:
+    def __init__(self, keywords):
+        self.keywords = list(dict.fromkeys(k.lower() for k in keywords if k))
+        groups = []
+        for kw in self.keywords:
+            group = next((g for g in groups if not any(_overlaps(kw, other) for other in g)), None)
+            if group is None:
+                groups.append([kw])
+            else:
+                group.append(kw)
+        # Longest first so the alternation never stops at a shorter alternative.
+        self.patterns = [
+            re.compile(r"\b(?:" + "|".join(re.escape(k) for k in sorted(g, key=len, reverse=True)) + r")\b")
+            for g in groups
+        ]
+
+    def count(self, text, hits):
+        """Add keyword occurrences in already lowercased `text` to the `hits` dict."""
+        for pattern in self.patterns:
+            for kw in pattern.findall(text):
+                hits[kw] += 1
+
+
+class CallAnalytics:
+    def __init__(self, matcher):
+        self.matcher = matcher
+        self.keyword_hits = {kw: 0 for kw in matcher.keywords}
+        self.driver_turns = 0
+        self.agent_turns = 0
+        self.interruptions_est = 0
+        self.chars = 0
+        self._prev = None
+
+    def feed(self, text):
+        """Account for `text` appended to the transcript (joined with a newline, like the bot does)."""
+        if not text:
+            return
+        self.chars += len(text) + (1 if self.chars else 0)
+        for line in text.splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            self.matcher.count(line.lower(), self.keyword_hits)
+            if line.startswith("Driver:"):
+                self.driver_turns += 1
+                if self._prev == "Agent":
+                    self.interruptions_est += 1
+                self._prev = "Driver"
+            elif line.startswith("Agent:"):
+                self.agent_turns += 1
+                self._prev = "Agent"
+
+    def snapshot(self):
+        return {
+            "keyword_hits": dict(self.keyword_hits),
+            "driver_turns": self.driver_turns,
+            "agent_turns": self.agent_turns,
+            "interruptions_est": self.interruptions_est,
+            "tokens_estimated": int(self.chars / 4),
+        }
+
+
+def analytics_from_transcript(transcript, matcher):
+    analytics = CallAnalytics(matcher)
+    analytics.feed(transcript or "")
+    return analytics.snapshot()
@@ -0,0 +1,151 @@
+"""
+Finalize analytics benchmark: the per-keyword regex implementation that lived in
+bot.py vs the compiled one-pass analytics (pipecat_bot/analytics.py).
+
+The reference is the bot.py original with its `rf"\\\\b..."` bug fixed (it matched
+a literal backslash-b, so every count was 0). Both are cross-checked on a
+fuzzed corpus, including overlapping keyword lists, before timing. Then, per
+transcript size: one full pass each, plus the per-turn cost of feeding the
+same transcript incrementally, as the bot does during a call.
+
+    cd pipecat_bot && python benchmarks/bench_analytics.py --turns 1000,5000,20000
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from analytics import CallAnalytics, KeywordMatcher, analytics_from_transcript  # noqa: E402
+
+KW_DEFAULT = ["emergency", "breakdown", "accident", "police", "hospital"]
+
+
+# ---- reference: bot.py's _analytics_from_transcript, `\b` fixed ----
+
+def legacy_analytics(transcript, keywords):
+    low = (transcript or "").lower()
+    kw_hits = {kw: len(re.findall(rf"\b{re.escape(kw)}\b", low)) for kw in keywords}
+    lines = [ln.strip() for ln in (transcript or "").splitlines() if ln.strip()]
+    driver_turns = agent_turns = interruptions_est = 0
+    prev = None
+    for ln in lines:
+        if ln.startswith("Driver:"):
+            driver_turns += 1
+            if prev == "Agent":
+                interruptions_est += 1
+            prev = "Driver"
+        elif ln.startswith("Agent:"):
+            agent_turns += 1
+            prev = "Agent"
+
+    return {
+        "keyword_hits": kw_hits,
+        "driver_turns": driver_turns,
+        "agent_turns": agent_turns,
+        "interruptions_est": interruptions_est,
+        "tokens_estimated": int(len(transcript) / 4) if transcript else 0,
+    }
+
+
+# ---- corpus ----
+
+FILLER = ("the", "load", "is", "on", "schedule", "copy", "that", "thanks", "roger", "yeah",
+          "driving", "now", "about", "north", "exit", "fuel", "stop", "and", "then", "route")
+SIGNAL = ("emergency", "Emergency!", "breakdown", "break down", "accident", "car accident", "accidental",
+          "police", "police car", "policeman", "hospital", "ha ha ha", "9-1-1", "911", "x-ray", "police-car")
+KEYWORD_SETS = (
+    KW_DEFAULT,
+    KW_DEFAULT + ["car accident", "police car", "break"],
+    ["ha ha", "ha", "9-1-1", "1-9", "car", "car accident", "accident", "x-ray", "ray"],
+)
+
+
+def make_lines(turns, rng, signal_rate):
+    lines = []
+    for i in range(turns):
+        words = [rng.choice(SIGNAL) if rng.random() < signal_rate else rng.choice(FILLER)
+                 for _ in range(rng.randint(4, 18))]
+        who = rng.choice(("Driver: ", "Agent: ", "")) if rng.random() < 0.1 else ("Driver: " if i % 2 else "Agent: ")
+        lines.append(who + " ".join(words))
+    return lines
+
+
+def check_equivalence(samples=3000):
+    rng = random.Random(7)
+    for i in range(samples):
+        keywords = rng.choice(KEYWORD_SETS)
+        matcher = KeywordMatcher(keywords)
+        lines = make_lines(rng.randint(0, 12), rng, rng.choice((0.0, 0.05, 0.3)))
+        text = "\n".join(lines)
+        old = legacy_analytics(text, keywords)
+        whole = analytics_from_transcript(text, matcher)
+        incremental = CallAnalytics(matcher)
+        for line in lines:
+            incremental.feed(line)
+        if not old == whole == incremental.snapshot():
+            raise SystemExit(f"mismatch on sample {i} ({keywords}):\n{text}\n"
+                             f"legacy={old}\nwhole={whole}\nincremental={incremental.snapshot()}")
+
+
+def _bench(fn, repeats):
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) / repeats * 1000
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--turns", default="1000,5000,20000")
+    ap.add_argument("--keywords", type=int, default=len(KW_DEFAULT),
+                    help="keyword list size (defaults first, then generated words)")
+    ap.add_argument("--repeats", type=int, default=10)
+    ap.add_argument("--out", default=None, help="write results JSON here")
+    args = ap.parse_args()
+
+    check_equivalence()
+    keywords = (KW_DEFAULT + [f"kw{i}word" for i in range(max(0, args.keywords - len(KW_DEFAULT)))])[:args.keywords]
+    start = time.perf_counter()
+    matcher = KeywordMatcher(keywords)
+    compile_ms = (time.perf_counter() - start) * 1000
+
+    rng = random.Random(1)
+    results = {}
+    for turns in [int(x) for x in args.turns.split(",") if x]:
+        lines = make_lines(turns, rng, 0.01)
+        text = "\n".join(lines)
+        legacy = _bench(lambda: legacy_analytics(text, keywords), args.repeats)
+        compiled = _bench(lambda: analytics_from_transcript(text, matcher), args.repeats)
+
+        analytics = CallAnalytics(matcher)
+        per_turn = []
+        for line in lines:
+            t0 = time.perf_counter()
+            analytics.feed(line)
+            per_turn.append((time.perf_counter() - t0) * 1e6)
+        per_turn.sort()
+        results[str(turns)] = {
+            "chars": len(text),
+            "keywords": len(keywords),
+            "patterns": len(matcher.patterns),
+            "compile_ms": round(compile_ms, 3),
+            "legacy_ms": round(legacy, 3),
+            "compiled_ms": round(compiled, 3),
+            "speedup": round(legacy / compiled, 2) if compiled else None,
+            "incremental_us_per_turn_p50": round(per_turn[len(per_turn) // 2], 2),
+            "incremental_us_per_turn_p99": round(per_turn[int(len(per_turn) * 0.99)], 2),
+        }
+        print(json.dumps({"turns": turns, **results[str(turns)]}))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
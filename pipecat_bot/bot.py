@@ -1,9 +1,7 @@
 # pipecat_bot/bot.py
 import os
-import re
 import math
 import datetime as dt
-import httpx
 from dotenv import load_dotenv
 from loguru import logger
 
@@ -33,6 +31,12 @@ except Exception:
 # ENV & CONFIG
 load_dotenv(override=True)
 
+# Local modules read their settings (RTVI_PUBLISH_*, SPOOL_*, ...) at import, so after .env.
+from analytics import CallAnalytics, KeywordMatcher, analytics_from_transcript  # noqa: E402
+from publisher import RtviPublisher  # noqa: E402
+from spool import Spool  # noqa: E402
+from transcript_stream import TranscriptStream  # noqa: E402
+
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 DEEPGRAM_API_KEY = os.getenv("DEEPGRAM_API_KEY")
 CARTESIA_API_KEY = os.getenv("CARTESIA_API_KEY")
@@ -46,6 +50,29 @@ SYSTEM_PROMPT = os.getenv(
 
 KW_DEFAULT = ["emergency", "breakdown", "accident", "police", "hospital"]
 KEYWORDS = [k.strip().lower() for k in os.getenv("PIPECAT_KEYWORDS", ",".join(KW_DEFAULT)).split(",") if k.strip()]
+KEYWORD_MATCHER = KeywordMatcher(KEYWORDS)  # compiled once, shared by every call
+
+# One per process: pooled client + batched, non-blocking RTVI events (see publisher.py).
+# What cannot be delivered goes to the on-disk spool and is replayed later (see spool.py).
+spool = Spool()
+publisher = RtviPublisher(BACKEND_BASE, on_failed=lambda batch, key: spool.append("rtvi_batch", batch, key=key))
+
+
+async def _replay_rtvi_batch(batch, key):
+    if not await publisher.post_batch(batch, key):
+        raise RuntimeError("backend unavailable")
+
+
+async def _replay_finalize(payload, key):
+    r = await publisher.client().post("/api/v1/pipecat/finalize", json=payload, timeout=20.0,
+                                      headers={"Idempotency-Key": key})
+    if r.status_code >= 500 or r.status_code == 429:
+        raise RuntimeError(f"finalize replay failed: {r.status_code}")
+    if r.status_code >= 400:
+        logger.error(f"Spooled finalize rejected, dropping: {r.status_code} {r.text}")
+
+
+spool.handlers.update({"rtvi_batch": _replay_rtvi_batch, "finalize": _replay_finalize})
 
 
 
@@ -54,60 +81,23 @@ def _utcnow():
     return dt.datetime.now(dt.timezone.utc)
 
 
-def _format_transcript(messages):
-    lines = []
-    for m in messages or []:
-        role = (m.get("role") or "").lower()
-        content = (m.get("content") or "").strip()
-        if not content:
-            continue
-        who = "Driver" if role == "user" else "Agent"
-        lines.append(f"{who}: {content}")
-    return "\n".join(lines)
-
-
-def _analytics_from_transcript(transcript: str) -> dict:
-    low = (transcript or "").lower()
-    kw_hits = {kw: len(re.findall(rf"\\b{re.escape(kw)}\\b", low)) for kw in KEYWORDS}
-    lines = [ln.strip() for ln in (transcript or "").splitlines() if ln.strip()]
-    driver_turns = agent_turns = interruptions_est = 0
-    prev = None
-    for ln in lines:
-        if ln.startswith("Driver:"):
-            driver_turns += 1
-            if prev == "Agent":
-                interruptions_est += 1
-            prev = "Driver"
-        elif ln.startswith("Agent:"):
-            agent_turns += 1
-            prev = "Agent"
-
-    return {
-        "keyword_hits": kw_hits,
-        "driver_turns": driver_turns,
-        "agent_turns": agent_turns,
-        "interruptions_est": interruptions_est,
-        "tokens_estimated": int(len(transcript) / 4) if transcript else 0,
-    }
+def _conv_id(runner_args):
+    """The provider_call_id the backend started this session under (?conv=, forwarded in the start body)."""
+    body = getattr(runner_args, "body", None)
+    if isinstance(body, dict):
+        return body.get("conv") or body.get("provider_call_id")
+    return None
 
 
-async def _post_rtvi_event(call_id, event, data):
-    """Send real-time RTVI events to backend analytics."""
-    try:
-        async with httpx.AsyncClient(timeout=8.0) as rc:
-            await rc.post(f"{BACKEND_BASE}/api/v1/pipecat/rtvi", json={
-                "provider_call_id": call_id,
-                "event": event,
-                **data
-            })
-        logger.info(f"RTVI event sent: {event}")
-    except Exception as e:
-        logger.warning(f"RTVI event post failed: {e}")
+def _post_rtvi_event(call_id, event, data):
+    """Queue a real-time RTVI event for backend analytics (sent in the background)."""
+    if publisher.publish(call_id, event, data):
+        logger.debug(f"RTVI event queued: {event}")
 
 
-async def _finalize(provider_call_id: str | None, transcript: str | None, started_at: dt.datetime | None):
-    """Finalize transcript and send analytics summary."""
-    if not provider_call_id:
+async def _finalize(provider_call_id: str | None, stream: TranscriptStream | None, started_at: dt.datetime | None):
+    """Finalize the call: send the transcript lines not yet checkpointed plus the analytics summary."""
+    if not provider_call_id or stream is None:
         logger.warning("No provider_call_id; skipping finalize POST.")
         return
 
@@ -115,24 +105,40 @@ async def _finalize(provider_call_id: str | None, transcript: str | None, starte
     if started_at:
         duration = max(0.0, (_utcnow() - started_at).total_seconds())
 
-    analytics = _analytics_from_transcript(transcript or "")
+    transcript = stream.transcript
+    # Kept up to date turn by turn as the stream picked up new lines.
+    if stream.analytics is not None:
+        analytics = stream.analytics.snapshot()
+    else:
+        analytics = analytics_from_transcript(transcript, KEYWORD_MATCHER)
     analytics["duration_secs"] = round(duration, 2)
 
+    seq, tail = stream.tail()
     payload = {
         "provider_call_id": provider_call_id,
-        "transcript": transcript,
+        "transcript_seq": seq,
+        "transcript_tail": tail,
         "extra": analytics,
     }
+    # Self-contained form for the retry paths: the full transcript, no dependency on checkpoints.
+    full = {"provider_call_id": provider_call_id, "transcript": transcript, "extra": analytics}
 
     try:
-        async with httpx.AsyncClient(timeout=20.0) as rc:
-            r = await rc.post(f"{BACKEND_BASE}/api/v1/pipecat/finalize", json=payload)
-            if r.status_code < 400:
-                logger.info("Finalized transcript + analytics to backend.")
-            else:
-                logger.error(f"Finalize failed: {r.status_code} {r.text}")
+        r = await publisher.client().post("/api/v1/pipecat/finalize", json=payload, timeout=20.0)
+        if r.status_code == 409:
+            logger.warning("Backend is missing checkpointed lines; finalizing with the full transcript.")
+            r = await publisher.client().post("/api/v1/pipecat/finalize", json=full, timeout=20.0)
+        if r.status_code < 400:
+            logger.info(f"Finalized transcript ({len(tail)} tail lines) + analytics to backend.")
+            return
+        logger.error(f"Finalize failed: {r.status_code} {r.text}")
+        if r.status_code < 500 and r.status_code != 429:
+            return
     except Exception as e:
         logger.exception(f"Finalize call failed: {e}")
+    # Backend down or overloaded: keep the transcript + analytics and retry from disk.
+    if spool.append("finalize", full, key=f"finalize:{provider_call_id}"):
+        logger.warning(f"Finalize spooled for replay: {provider_call_id}")
 
 
 async def run_bot(transport: BaseTransport, runner_args: RunnerArguments):
@@ -168,25 +174,36 @@ async def run_bot(transport: BaseTransport, runner_args: RunnerArguments):
         observers=observers,
     )
 
-    state = {"started_at": None, "provider_call_id": None}
+    state = {"started_at": None, "provider_call_id": None, "transcript": None}
+
+    def _messages():
+        return context.to_universal_messages() if hasattr(context, "to_universal_messages") else []
 
     @transport.event_handler("on_client_connected")
     async def _on_client_connected(t, client):
         from random import randint
+        spool.start()
         state["started_at"] = _utcnow()
-        state["provider_call_id"] = f"pipecat_{randint(1000000, 9999999)}"
+        # Reuse the id (and calllog row) from the backend's call start; otherwise make one and seed its row.
+        conv = _conv_id(runner_args)
+        state["provider_call_id"] = conv or f"pipecat_{randint(1000000, 9999999)}"
         logger.info(f"Client connected. provider_call_id={state['provider_call_id']}")
-        await _post_rtvi_event(state["provider_call_id"], "call_started", {"time": str(_utcnow())})
+        # Checkpoint the transcript while the call runs; finalize then only sends the tail.
+        state["transcript"] = TranscriptStream(publisher.client(), state["provider_call_id"], _messages,
+                                               analytics=CallAnalytics(KEYWORD_MATCHER), create_row=not conv)
+        state["transcript"].start()
+        _post_rtvi_event(state["provider_call_id"], "call_started", {"time": str(_utcnow())})
         await task.queue_frames([LLMRunFrame()])
 
     @transport.event_handler("on_client_disconnected")
     async def _on_client_disconnected(t, client):
         logger.info("Client disconnected")
         try:
-            messages = context.to_universal_messages() if hasattr(context, "to_universal_messages") else []
-            transcript_text = _format_transcript(messages)
-            await _post_rtvi_event(state["provider_call_id"], "transcript_final", {"transcript": transcript_text})
-            await _finalize(state["provider_call_id"], transcript_text, state["started_at"])
+            if state["transcript"] is not None:
+                await state["transcript"].stop()
+            # Send this call's queued events first so they are not racing the finalize write.
+            await publisher.drain()
+            await _finalize(state["provider_call_id"], state["transcript"], state["started_at"])
         finally:
             await task.cancel()
 
@@ -195,20 +212,20 @@ async def run_bot(transport: BaseTransport, runner_args: RunnerArguments):
     # -------------------------------------------------------------------------
     @rtvi.event_handler("interrupt_detected")
     async def _on_interrupt(event):
-        await _post_rtvi_event(state["provider_call_id"], "interrupt_detected", {"at": str(_utcnow())})
+        _post_rtvi_event(state["provider_call_id"], "interrupt_detected", {"at": str(_utcnow())})
 
     @rtvi.event_handler("sentiment_update")
     async def _on_sentiment(event):
-        await _post_rtvi_event(state["provider_call_id"], "sentiment_update", {"sentiment": event.get("sentiment")})
+        _post_rtvi_event(state["provider_call_id"], "sentiment_update", {"sentiment": event.get("sentiment")})
 
     @rtvi.event_handler("keyword_detected")
     async def _on_keyword(event):
         kw = event.get("keyword")
-        await _post_rtvi_event(state["provider_call_id"], "keyword_detected", {"keyword": kw})
+        _post_rtvi_event(state["provider_call_id"], "keyword_detected", {"keyword": kw})
 
     @rtvi.event_handler("metrics_final")
     async def _on_metrics(event):
-        await _post_rtvi_event(state["provider_call_id"], "metrics_final", {
+        _post_rtvi_event(state["provider_call_id"], "metrics_final", {
             "metrics": {
                 "duration_secs": event.get("duration_secs"),
                 "tokens_used": event.get("tokens_used"),
@@ -0,0 +1,151 @@
+# pipecat_bot/publisher.py
+"""
+Fire-and-forget RTVI event publisher for the bot process.
+
+publish() only appends to a bounded in-memory queue, so event handlers (and the
+first LLMRunFrame) never wait on the backend. One background task drains the
+queue in batches - up to BATCH_SIZE events or whatever arrived within
+FLUSH_INTERVAL - and POSTs each batch as a JSON array to
+/api/v1/pipecat/rtvi/batch over a single pooled httpx client. drain() flushes
+what is queued (used on client disconnect, before finalize).
+
+Every batch carries an Idempotency-Key so a retried POST is applied once.
+When the queue is full the newest event is dropped and counted; a batch that
+still fails after a few retries is handed to `on_failed` (bot.py spools it to
+disk, see spool.py) or dropped. A slow or down backend never blocks audio.
+"""
+import asyncio
+import os
+import random
+import uuid
+
+import httpx
+from loguru import logger
+
+QUEUE_MAX = int(os.getenv("RTVI_PUBLISH_QUEUE_MAX", "5000"))
+BATCH_SIZE = int(os.getenv("RTVI_PUBLISH_BATCH_SIZE", "100"))
+FLUSH_INTERVAL = float(os.getenv("RTVI_PUBLISH_FLUSH_MS", "200")) / 1000
+POST_RETRIES = int(os.getenv("RTVI_PUBLISH_RETRIES", "3"))
+
+
+class RtviPublisher:
+    def __init__(self, base_url, queue_max=QUEUE_MAX, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL,
+                 timeout=8.0, on_failed=None):
+        self.base_url = base_url.rstrip("/")
+        self.on_failed = on_failed
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.timeout = timeout
+        self._queue_max = queue_max
+        self._queue = None
+        self._client = None
+        self._task = None
+        self.stats = {"published": 0, "dropped": 0, "sent": 0, "batches": 0, "failed": 0, "spooled": 0}
+
+    # -- shared client --
+
+    def client(self):
+        """The pooled client (also used for finalize so every backend POST reuses connections)."""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=httpx.Timeout(self.timeout, connect=2.0),
+                limits=httpx.Limits(max_connections=10, max_keepalive_connections=5),
+            )
+        return self._client
+
+    # -- producer side --
+
+    def publish(self, call_id, event, data=None):
+        """Queue one event without waiting; returns False when it had to be dropped."""
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self._queue_max)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="rtvi-publisher")
+        try:
+            self._queue.put_nowait({"provider_call_id": call_id, "event": event, **(data or {})})
+        except asyncio.QueueFull:
+            self.stats["dropped"] += 1
+            logger.warning(f"RTVI queue full; dropped {event}")
+            return False
+        self.stats["published"] += 1
+        return True
+
+    async def drain(self, timeout=10.0):
+        """Wait until everything queued so far has been sent (or given up on)."""
+        if self._queue is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"RTVI drain timed out with {self._queue.qsize()} events queued")
+
+    async def aclose(self):
+        await self.drain()
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    # -- sender --
+
+    async def _next_batch(self):
+        batch = [await self._queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.flush_interval
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def post_batch(self, batch, key):
+        """One POST; True when delivered or permanently rejected (4xx), False when worth retrying."""
+        try:
+            r = await self.client().post("/api/v1/pipecat/rtvi/batch", json=batch, headers={"Idempotency-Key": key})
+        except httpx.HTTPError as e:
+            logger.warning(f"RTVI batch post failed: {e!r}")
+            return False
+        if r.status_code >= 500 or r.status_code == 429:
+            return False
+        if r.status_code >= 400:
+            logger.warning(f"RTVI batch rejected: {r.status_code} {r.text[:200]}")
+        return True
+
+    async def _send(self, batch, key):
+        for attempt in range(POST_RETRIES + 1):
+            if await self.post_batch(batch, key):
+                return True
+            if attempt < POST_RETRIES:
+                await asyncio.sleep(random.uniform(0, min(5.0, 0.25 * 2 ** attempt)))
+        return False
+
+    async def _run(self):
+        while True:
+            batch = await self._next_batch()
+            key = uuid.uuid4().hex
+            try:
+                ok = await self._send(batch, key)
+                self.stats["batches"] += 1
+                if ok:
+                    self.stats["sent"] += len(batch)
+                elif self.on_failed is not None and self.on_failed(batch, key):
+                    self.stats["spooled"] += len(batch)
+                else:
+                    self.stats["failed"] += len(batch)
+                    logger.error(f"RTVI batch of {len(batch)} events dropped")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
@@ -0,0 +1,189 @@
+# pipecat_bot/spool.py
+"""
+Durable local spool for backend POSTs that could not be delivered
+(finalize payloads, RTVI batches) - the bot-side twin of
+backend/app/services/spool.py, kept dependency-free so the bot deploys alone.
+
+append() writes one JSON line {"k", "t", "b", "ts"} to the active segment file
+and returns; a background task fsyncs it every SPOOL_FSYNC_MS in a worker
+thread, so the audio pipeline never waits on the disk. Segments roll at
+SPOOL_SEGMENT_KB and the whole spool is capped at SPOOL_MAX_MB (oldest segment
+dropped first). The replayer re-sends records oldest first through the handler
+registered for their kind, with the record's key as Idempotency-Key; a handler
+that raises pauses replay until the next pass. A `cursor` file records progress
+so a restarted bot resumes instead of re-sending whole segments.
+"""
+import asyncio
+import json
+import os
+import time
+import uuid
+
+from loguru import logger
+
+SPOOL_DIR = os.getenv("SPOOL_DIR", ".spool")
+SPOOL_MAX_MB = int(os.getenv("SPOOL_MAX_MB", "128"))
+SPOOL_SEGMENT_KB = int(os.getenv("SPOOL_SEGMENT_KB", "1024"))
+SPOOL_FSYNC_MS = int(os.getenv("SPOOL_FSYNC_MS", "200"))
+SPOOL_REPLAY_SECS = float(os.getenv("SPOOL_REPLAY_SECS", "5"))
+
+SUFFIX = ".seg"
+
+
+class Spool:
+    def __init__(self, directory=SPOOL_DIR, max_bytes=SPOOL_MAX_MB * 1024 * 1024,
+                 segment_bytes=SPOOL_SEGMENT_KB * 1024, fsync_interval=SPOOL_FSYNC_MS / 1000,
+                 replay_interval=SPOOL_REPLAY_SECS):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.segment_bytes = segment_bytes
+        self.fsync_interval = fsync_interval
+        self.replay_interval = replay_interval
+        self.handlers = {}
+        self.stats = {"appended": 0, "replayed": 0, "dropped_segments": 0, "rejected": 0}
+        self._active = None
+        self._active_path = None
+        self._dirty = False
+        self._tasks = []
+        self._lock = None
+
+        os.makedirs(directory, exist_ok=True)
+        names = sorted(n for n in os.listdir(directory) if n.endswith(SUFFIX))
+        self._sealed = [os.path.join(directory, n) for n in names]
+        self._sizes = {p: os.path.getsize(p) for p in self._sealed}
+        self._seq = max((int(n[:-len(SUFFIX)]) for n in names if n[:-len(SUFFIX)].isdigit()), default=0)
+
+    # -- files --
+
+    def _cursor(self):
+        try:
+            with open(os.path.join(self.directory, "cursor")) as f:
+                name, _, line = f.read().strip().partition(" ")
+                return name, int(line or 0)
+        except (OSError, ValueError):
+            return None, 0
+
+    def _set_cursor(self, path, line):
+        target = os.path.join(self.directory, "cursor")
+        with open(target + ".tmp", "w") as f:
+            f.write(f"{os.path.basename(path) if path else ''} {line}")
+        os.replace(target + ".tmp", target)
+
+    def _seal(self):
+        if self._active is None:
+            return
+        self._active.flush()
+        os.fsync(self._active.fileno())
+        self._active.close()
+        self._sealed.append(self._active_path)
+        self._active = self._active_path = None
+        self._dirty = False
+
+    def _drop_oldest(self):
+        if not self._sealed:
+            return False
+        path = self._sealed.pop(0)
+        size = self._sizes.pop(path, 0)
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+        self.stats["dropped_segments"] += 1
+        logger.error(f"Spool full; dropped {os.path.basename(path)} ({size} bytes)")
+        return True
+
+    # -- producer --
+
+    def append(self, kind, body, key=None):
+        line = (json.dumps({"k": key or uuid.uuid4().hex, "t": kind, "b": body, "ts": time.time()},
+                           separators=(",", ":"), default=str) + "\n").encode()
+        while sum(self._sizes.values()) + len(line) > self.max_bytes and self._drop_oldest():
+            pass
+        if sum(self._sizes.values()) + len(line) > self.max_bytes:
+            self.stats["rejected"] += 1
+            return False
+        if self._active is None:
+            self._seq += 1
+            self._active_path = os.path.join(self.directory, f"{self._seq:012d}{SUFFIX}")
+            self._active = open(self._active_path, "ab")
+            self._sizes[self._active_path] = 0
+        self._active.write(line)
+        self._sizes[self._active_path] += len(line)
+        self._dirty = True
+        self.stats["appended"] += 1
+        if self._sizes[self._active_path] >= self.segment_bytes:
+            self._seal()
+        return True
+
+    # -- background --
+
+    def start(self):
+        """Start the fsync and replay tasks (idempotent; needs a running loop)."""
+        if self._tasks:
+            return
+        self._lock = asyncio.Lock()
+        self._tasks = [asyncio.create_task(self._fsync_loop()), asyncio.create_task(self._replay_loop())]
+
+    async def _fsync_loop(self):
+        while True:
+            await asyncio.sleep(self.fsync_interval)
+            if self._dirty and self._active is not None:
+                self._dirty = False
+                self._active.flush()
+                try:
+                    await asyncio.to_thread(os.fsync, self._active.fileno())
+                except (OSError, ValueError):
+                    pass
+
+    async def _replay_loop(self):
+        while True:
+            await asyncio.sleep(self.replay_interval)
+            try:
+                await self.replay()
+            except Exception as e:
+                logger.error(f"Spool replay failed: {e!r}")
+
+    async def replay(self):
+        async with self._lock:
+            if not self._sealed and not self._active_path:
+                return 0
+            self._seal()
+            sent = 0
+            while self._sealed:
+                path = self._sealed[0]
+                name, start = self._cursor()
+                if name != os.path.basename(path):
+                    start = 0
+                with open(path, "rb") as f:
+                    lines = f.read().splitlines()
+                for i in range(start, len(lines)):
+                    try:
+                        rec = json.loads(lines[i])
+                    except ValueError:
+                        continue
+                    handler = self.handlers.get(rec.get("t"))
+                    if handler is not None:
+                        try:
+                            await handler(rec.get("b"), rec.get("k"))
+                        except Exception as e:
+                            self._set_cursor(path, i)
+                            logger.warning(f"Spool replay paused ({len(lines) - i} left in segment): {e!r}")
+                            return sent
+                        sent += 1
+                        self.stats["replayed"] += 1
+                    self._set_cursor(path, i + 1)
+                if path in self._sealed:
+                    self._sealed.remove(path)
+                    self._sizes.pop(path, None)
+                    os.unlink(path)
+                self._set_cursor(None, 0)
+            if sent:
+                logger.info(f"Spool replayed {sent} records")
+            return sent
+
+    async def aclose(self):
+        for t in self._tasks:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._seal()
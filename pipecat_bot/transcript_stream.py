@@ -0,0 +1,136 @@
+# pipecat_bot/transcript_stream.py
+"""
+Per-turn transcript checkpoints for one call.
+
+While the call runs, a background task looks at the LLM context every
+TRANSCRIPT_CHECKPOINT_MS and formats only the messages it has not seen yet.
+When there are new lines it POSTs them to /api/v1/pipecat/transcript/append as
+{provider_call_id, seq, lines}, where seq is the index of the first line. The
+backend answers with next_seq (on 200 and on a 409 gap alike), which becomes the
+new acknowledged position. A failed POST changes nothing: the next checkpoint
+resends from the same seq with whatever was added meanwhile, and the backend
+skips lines it already has.
+
+So the backend holds the transcript up to the last checkpoint even if the bot
+dies, and finalize only sends tail(): the lines after the acknowledged seq.
+The call's calllog row must exist: it is created by the backend's call start
+(the id arrives as `conv`), or with create_row=True the stream seeds it through
+/api/v1/pipecat/seed before the first checkpoint. A 404 stops checkpointing for
+the rest of the call; finalize then sends everything still unacknowledged.
+New lines are also fed to `analytics` (analytics.CallAnalytics) as they arrive,
+so the call's analytics are ready at disconnect without rescanning.
+"""
+import asyncio
+import os
+
+import httpx
+from loguru import logger
+
+CHECKPOINT_INTERVAL = float(os.getenv("TRANSCRIPT_CHECKPOINT_MS", "2000")) / 1000
+
+
+def format_line(message):
+    """'Driver: ...' / 'Agent: ...' for one context message, or None when it has no text."""
+    role = (message.get("role") or "").lower()
+    content = (message.get("content") or "").strip()
+    if not content:
+        return None
+    return f"{'Driver' if role == 'user' else 'Agent'}: {content}"
+
+
+class TranscriptStream:
+    def __init__(self, client, provider_call_id, get_messages, analytics=None, interval=CHECKPOINT_INTERVAL,
+                 create_row=False):
+        self.client = client
+        self.provider_call_id = provider_call_id
+        self.get_messages = get_messages
+        self.analytics = analytics
+        self.interval = interval
+        self.create_row = create_row
+        self.disabled = False
+        self.lines = []
+        self.acked = 0
+        self._seen = 0
+        self._task = None
+        self.stats = {"checkpoints": 0, "lines_sent": 0, "failures": 0}
+
+    @property
+    def transcript(self):
+        return "\n".join(self.lines)
+
+    def sync(self):
+        """Format context messages added since the last call; returns how many lines were added."""
+        messages = self.get_messages() or []
+        before = len(self.lines)
+        for m in messages[self._seen:]:
+            line = format_line(m)
+            if line:
+                self.lines.append(line)
+                if self.analytics is not None:
+                    self.analytics.feed(line)
+        self._seen = len(messages)
+        return len(self.lines) - before
+
+    def tail(self):
+        """(seq, lines) not yet acknowledged by the backend - what finalize still has to send."""
+        return self.acked, self.lines[self.acked:]
+
+    async def checkpoint(self):
+        """Send unacknowledged lines once; True when the backend is up to date."""
+        self.sync()
+        seq, lines = self.tail()
+        if not lines:
+            return True
+        try:
+            r = await self.client.post("/api/v1/pipecat/transcript/append", json={
+                "provider_call_id": self.provider_call_id, "seq": seq, "lines": lines,
+            })
+        except httpx.HTTPError as e:
+            self.stats["failures"] += 1
+            logger.warning(f"Transcript checkpoint failed: {e!r}")
+            return False
+        if r.status_code == 404:
+            self.disabled = True
+            logger.warning(f"No calllog row for {self.provider_call_id}; transcript checkpoints stopped.")
+            return False
+        if r.status_code in (200, 409):
+            next_seq = r.json().get("next_seq")
+            if isinstance(next_seq, int):
+                self.acked = max(0, min(next_seq, len(self.lines)))
+        else:
+            self.stats["failures"] += 1
+            logger.warning(f"Transcript checkpoint rejected: {r.status_code} {r.text[:200]}")
+            return False
+        self.stats["checkpoints"] += 1
+        self.stats["lines_sent"] += len(lines)
+        return self.acked == len(self.lines)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name=f"transcript-{self.provider_call_id}")
+
+    async def stop(self):
+        """Stop checkpointing and pick up the last messages (finalize sends them)."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self.sync()
+
+    async def _seed(self):
+        try:
+            r = await self.client.post("/api/v1/pipecat/seed", json={"provider_call_id": self.provider_call_id})
+            if r.status_code >= 400:
+                logger.warning(f"Calllog seed failed: {r.status_code} {r.text[:200]}")
+        except httpx.HTTPError as e:
+            logger.warning(f"Calllog seed failed: {e!r}")
+
+    async def _run(self):
+        if self.create_row:
+            await self._seed()
+        while not self.disabled:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.checkpoint()
+            except Exception as e:
+                logger.warning(f"Transcript checkpoint error: {e!r}")